@@ -314,12 +314,17 @@ class APIView(views.APIView):
         return (getattr(request, 'version', None), getattr(request, 'versioning_scheme', None))
 
     def dispatch(self, request, *args, **kwargs):
+        from awx.main.signals import buffer_activity_stream
+
         if self.versioning_class is not None:
             scheme = self.versioning_class()
             request.version, request.versioning_scheme = (scheme.determine_version(request, *args, **kwargs), scheme)
             if 'version' in kwargs:
                 kwargs.pop('version')
-        return super(APIView, self).dispatch(request, *args, **kwargs)
+        # the view runs in the request transaction (ATOMIC_REQUESTS), write
+        # the activity stream entries of the whole request at its end
+        with buffer_activity_stream():
+            return super(APIView, self).dispatch(request, *args, **kwargs)
 
     def check_permissions(self, request):
         if request.method not in ('GET', 'OPTIONS', 'HEAD'):
@@ -774,7 +779,13 @@ class SubDetailAPIView(ParentMixin, generics.RetrieveAPIView, GenericAPIView):
 
 
 class RetrieveAPIView(generics.RetrieveAPIView, GenericAPIView):
-    pass
+    def get_queryset(self):
+        qs = super(RetrieveAPIView, self).get_queryset()
+        node = settings.NAMED_URL_GRAPH.get(self.model)
+        if self.queryset is None and node is not None and node.related_paths:
+            # detail views render the named url of the object
+            qs = qs.select_related(*node.related_paths)
+        return qs
 
 
 class RetrieveUpdateAPIView(RetrieveAPIView, generics.RetrieveUpdateAPIView):
@@ -1,12 +1,16 @@
 # Copyright (c) 2015 Ansible, Inc.
 # All Rights Reserved.
 
+import base64
+import json
 from collections import OrderedDict
 
 # Django REST Framework
 from django.conf import settings
 from django.core.paginator import Paginator as DjangoPaginator
+from django.db.models import Q
 from rest_framework import pagination
+from rest_framework.exceptions import NotFound, ParseError
 from rest_framework.response import Response
 from rest_framework.utils.urls import replace_query_param
 from rest_framework.settings import api_settings
@@ -103,31 +107,175 @@ class LimitPagination(pagination.BasePagination):
         return self.default_limit
 
 
+class KeysetPagination(pagination.BasePagination):
+    """
+    Paginate by the position of the last row seen instead of by page number.
+
+    Rows are ordered by the view's `cursor_ordering` fields and each page is
+    selected with a WHERE clause on those fields, so no OFFSET scan or COUNT(*)
+    is needed and the cost of a page does not depend on how deep it is.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    approximate_count_query_param = 'approximate_count'
+    max_page_size = settings.MAX_PAGE_SIZE
+    default_cursor_ordering = ('counter', 'id')
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.view = view
+        self.page_size = self.get_page_size(request)
+        self.ordering = getattr(view, 'cursor_ordering', self.default_cursor_ordering)
+        self.descending = self.get_descending(request)
+        self.position, self.reverse = self.decode_cursor(request)
+
+        # reverse (previous page) queries walk the ordering backwards
+        backwards = self.descending != self.reverse
+        queryset = queryset.order_by(*[('-' if backwards else '') + field for field in self.ordering])
+        if self.position is not None:
+            queryset = queryset.filter(self.keyset_filter(self.position, backwards))
+
+        results = list(queryset[0 : self.page_size + 1])
+        self.has_more = len(results) > self.page_size
+        results = results[: self.page_size]
+        if self.reverse:
+            results.reverse()
+        self.page = results
+        return results
+
+    def get_page_size(self, request):
+        try:
+            return pagination._positive_int(request.query_params[self.page_size_query_param], strict=True, cutoff=self.max_page_size)
+        except (KeyError, ValueError):
+            return api_settings.PAGE_SIZE
+
+    def get_descending(self, request):
+        order_by = request.query_params.get('order_by', request.query_params.get('order'))
+        if not order_by:
+            return False
+        fields = tuple(order_by.split(','))
+        if fields == tuple(self.ordering[: len(fields)]):
+            return False
+        if fields == tuple('-' + field for field in self.ordering[: len(fields)]):
+            return True
+        raise ParseError(_('Cursor pagination only supports ordering by {}.').format(', '.join(self.ordering)))
+
+    def keyset_filter(self, position, backwards):
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y)
+        lookup = 'lt' if backwards else 'gt'
+        condition = Q()
+        for i, field in enumerate(self.ordering):
+            clause = Q(**{'{}__{}'.format(field, lookup): position[i]})
+            for prior_field, prior_value in zip(self.ordering[:i], position[:i]):
+                clause &= Q(**{prior_field: prior_value})
+            condition |= clause
+        return condition
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('ascii'))
+            position = [int(value) for value in data['p']]
+            reverse = bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, AttributeError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, obj, reverse):
+        data = {'p': [getattr(obj, field) for field in self.ordering]}
+        if reverse:
+            data['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode('ascii')).decode('ascii')
+        return replace_query_param(self.request.get_full_path(), self.cursor_query_param, encoded)
+
+    def get_next_link(self):
+        if not self.page:
+            if self.reverse:
+                # walked back past the first row; start over from the top
+                return replace_query_param(self.request.get_full_path(), self.cursor_query_param, '')
+            return None
+        if self.reverse or self.has_more:
+            return self.encode_cursor(self.page[-1], reverse=False)
+        return None
+
+    def get_previous_link(self):
+        if not self.page:
+            return None
+        if (self.reverse and self.has_more) or (not self.reverse and self.position is not None):
+            return self.encode_cursor(self.page[0], reverse=True)
+        return None
+
+    def get_approximate_count(self):
+        # the number of events a finished job emitted is recorded on the job
+        # itself; this avoids a COUNT(*) over the job's event partition
+        get_parent_object = getattr(self.view, 'get_parent_object', None)
+        if get_parent_object is None:
+            return None
+        return getattr(get_parent_object(), 'emitted_events', None) or None
+
+    def get_paginated_response(self, data):
+        response = OrderedDict()
+        if self.approximate_count_query_param in self.request.query_params:
+            response['count'] = self.get_approximate_count()
+        response['next'] = self.get_next_link()
+        response['previous'] = self.get_previous_link()
+        response['results'] = data
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'count': {'type': 'integer', 'nullable': True},
+                'next': {'type': 'string', 'nullable': True},
+                'previous': {'type': 'string', 'nullable': True},
+                'results': schema,
+            },
+        }
+
+
 class UnifiedJobEventPagination(Pagination):
     """
     By default, use Pagination for all operations.
     If `limit` query parameter specified use LimitPagination
+    If `cursor` query parameter specified use KeysetPagination
     """
 
     def __init__(self, *args, **kwargs):
         self.use_limit_paginator = False
+        self.use_keyset_paginator = False
         self.limit_pagination = LimitPagination()
+        self.keyset_pagination = KeysetPagination()
         return super().__init__(*args, **kwargs)
 
     def paginate_queryset(self, queryset, request, view=None):
-        if 'limit' in request.query_params:
+        if 'cursor' in request.query_params:
+            self.use_keyset_paginator = True
+        elif 'limit' in request.query_params:
             self.use_limit_paginator = True
 
+        if self.use_keyset_paginator:
+            return self.keyset_pagination.paginate_queryset(queryset, request, view=view)
         if self.use_limit_paginator:
             return self.limit_pagination.paginate_queryset(queryset, request, view=view)
         return super().paginate_queryset(queryset, request, view=view)
 
     def get_paginated_response(self, data):
+        if self.use_keyset_paginator:
+            return self.keyset_pagination.get_paginated_response(data)
         if self.use_limit_paginator:
             return self.limit_pagination.get_paginated_response(data)
         return super().get_paginated_response(data)
 
     def get_paginated_response_schema(self, schema):
+        if self.use_keyset_paginator:
+            return self.keyset_pagination.get_paginated_response_schema(schema)
         if self.use_limit_paginator:
             return self.limit_pagination.get_paginated_response_schema(schema)
         return super().get_paginated_response_schema(schema)
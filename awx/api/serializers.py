@@ -5,9 +5,11 @@
 import copy
 import json
 import logging
+import operator
 import re
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict
 from datetime import timedelta
+from functools import reduce
 
 # OAuth2
 from oauthlib import oauth2
@@ -43,12 +45,13 @@ from rest_framework.utils.serializer_helpers import ReturnList
 from polymorphic.models import PolymorphicModel
 
 # AWX
-from awx.main.access import get_user_capabilities
+from awx.main.access import access_registry, get_user_capabilities
 from awx.main.constants import ACTIVE_STATES, CENSOR_VALUE
 from awx.main.models import (
     ActivityStream,
     AdHocCommand,
     AdHocCommandEvent,
+    CapacityLedger,
     Credential,
     CredentialInputSource,
     CredentialType,
@@ -111,7 +114,6 @@ from awx.main.utils import (
     truncate_stdout,
 )
 from awx.main.utils.filters import SmartFilter
-from awx.main.utils.named_url_graph import reset_counters
 from awx.main.redact import UriCleaner, REPLACE_STR
 
 from awx.main.validators import vars_validate_or_raise
@@ -193,6 +195,20 @@ def reverse_gfk(content_object, request):
     return {camelcase_to_underscore(content_object.__class__.__name__): content_object.get_absolute_url(request=request)}
 
 
+def first_per_parent(queryset, field, parent_ids, limit):
+    """
+    Returns a dictionary of the first `limit` objects of the ordered
+    `queryset` for each of `parent_ids`, by the value of `field`, read in one
+    query that reads no more than `limit` rows for each parent.
+    """
+    objects = defaultdict(list)
+    if parent_ids:
+        first = reduce(operator.or_, [models.Q(pk__in=queryset.filter(**{field: pk}).values('pk')[:limit]) for pk in parent_ids])
+        for obj in queryset.filter(first):
+            objects[getattr(obj, field)].append(obj)
+    return objects
+
+
 class CopySerializer(serializers.Serializer):
 
     name = serializers.CharField()
@@ -380,7 +396,6 @@ class BaseSerializer(serializers.ModelSerializer, metaclass=BaseSerializerMetacl
 
     def _generate_named_url(self, url_path, obj, node):
         url_units = url_path.split('/')
-        reset_counters()
         named_url = node.generate_named_url(obj)
         url_units[4] = named_url
         return '/'.join(url_units)
@@ -851,9 +866,7 @@ class UnifiedJobSerializer(BaseSerializer):
             serializer = serializer_class(instance=obj, context=self.context)
             # preserve links for list view
             if self.parent:
-                serializer.parent = self.parent
-                serializer.polymorphic_base = self
-                # TODO: restrict models for capabilities prefetch, when it is added
+                self._bind_sub_serializer(serializer, obj)
             ret = serializer.to_representation(obj)
         else:
             ret = super(UnifiedJobSerializer, self).to_representation(obj)
@@ -868,6 +881,24 @@ class UnifiedJobSerializer(BaseSerializer):
         ret['job_explanation'] = _(obj.job_explanation)
         return ret
 
+    def _bind_sub_serializer(self, serializer, obj):
+        serializer.parent = self.parent
+        if isinstance(self.parent, serializers.ListSerializer) and not self.context.get('page_prefetched'):
+            # the rows of the page were fetched per model, without the related
+            # objects the list view of each model would select
+            page_by_model = defaultdict(list)
+            for page_obj in self.parent.instance:
+                page_by_model[type(page_obj)].append(page_obj)
+            for model, objs in page_by_model.items():
+                access_class = access_registry.get(model)
+                if access_class is not None:
+                    models.prefetch_related_objects(objs, *(access_class.select_related + access_class.prefetch_related))
+            self.context['page_prefetched'] = True
+        # capabilities prefetch is only valid for jobs, and runs against the
+        # job model rather than the unified job model
+        if not isinstance(obj, Job):
+            serializer.capabilities_prefetch = None
+
     def get_launched_by(self, obj):
         if obj is not None:
             return obj.launched_by
@@ -912,6 +943,9 @@ class UnifiedJobListSerializer(UnifiedJobSerializer):
         serializer_class = self.get_sub_serializer(obj)
         if serializer_class:
             serializer = serializer_class(instance=obj, context=self.context)
+            # preserve links for list view
+            if self.parent:
+                self._bind_sub_serializer(serializer, obj)
             ret = serializer.to_representation(obj)
         else:
             ret = super(UnifiedJobListSerializer, self).to_representation(obj)
@@ -1810,11 +1844,20 @@ class HostSerializer(BaseSerializerWithVariables):
                     'status': j.job.status,
                     'finished': j.job.finished,
                 }
-                for j in obj.job_host_summaries.select_related('job__job_template').order_by('-created').defer('job__extra_vars', 'job__artifacts')[:5]
+                for j in self._recent_job_host_summaries(obj)
             ],
         )
         return d
 
+    def _recent_job_host_summaries(self, obj):
+        qs = JobHostSummary.objects.select_related('job__job_template').order_by('-created').defer('job__extra_vars', 'job__artifacts')
+        if isinstance(self.parent, serializers.ListSerializer):
+            # in a list view, read those of the whole page at once
+            if 'recent_job_host_summaries' not in self.context:
+                self.context['recent_job_host_summaries'] = first_per_parent(qs, 'host_id', [host.id for host in self.parent.instance], 5)
+            return self.context['recent_job_host_summaries'][obj.id]
+        return qs.filter(host=obj)[:5]
+
     def _get_host_port_from_name(self, name):
         # Allow hostname (except IPv6 for now) to specify the port # inline.
         port = None
@@ -2857,10 +2900,17 @@ class JobTemplateMixin(object):
 
     def _recent_jobs(self, obj):
         # Exclude "joblets", jobs that ran as part of a sliced workflow job
-        uj_qs = obj.unifiedjob_unified_jobs.exclude(job__job_slice_count__gt=1).order_by('-created')
+        uj_qs = UnifiedJob.objects.exclude(job__job_slice_count__gt=1).order_by('-created')
         # Would like to apply an .only, but does not play well with non_polymorphic
         # .only('id', 'status', 'finished', 'polymorphic_ctype_id')
         optimized_qs = uj_qs.non_polymorphic()
+        if isinstance(self.parent, serializers.ListSerializer):
+            # in a list view, read those of the whole page at once
+            if 'recent_jobs' not in self.context:
+                self.context['recent_jobs'] = first_per_parent(optimized_qs, 'unified_job_template_id', [t.id for t in self.parent.instance], 10)
+            recent_jobs = self.context['recent_jobs'][obj.id]
+        else:
+            recent_jobs = optimized_qs.filter(unified_job_template=obj)[:10]
         return [
             {
                 'id': x.id,
@@ -2870,7 +2920,7 @@ class JobTemplateMixin(object):
                 # Make type consistent with API top-level key, for instance workflow_job
                 'type': x.job_type_name,
             }
-            for x in optimized_qs[:10]
+            for x in recent_jobs
         ]
 
     def get_summary_fields(self, obj):
@@ -3012,6 +3062,7 @@ class JobTemplateWithSpecSerializer(JobTemplateSerializer):
 
 
 class JobSerializer(UnifiedJobSerializer, JobOptionsSerializer):
+    capabilities_prefetch = [{'start': 'job_template.execute'}, {'delete': 'organization.admin'}]
 
     passwords_needed_to_start = serializers.ReadOnlyField()
     artifacts = serializers.SerializerMethodField()
@@ -4768,7 +4819,23 @@ class ScheduleSerializer(LaunchConfigurationBaseSerializer, SchedulePreviewSeria
         return super(ScheduleSerializer, self).validate(attrs)
 
 
-class InstanceSerializer(BaseSerializer):
+class CapacityLedgerMixin(object):
+    """
+    Reads capacity and job counts from one CapacityLedger shared by every
+    object serialized in a request, instead of querying them per object.
+    """
+
+    def get_capacity_ledger(self):
+        if 'capacity_ledger' not in self.context:
+            self.context['capacity_ledger'] = CapacityLedger()
+        return self.context['capacity_ledger']
+
+    def to_representation(self, obj):
+        self.get_capacity_ledger().attach([obj])
+        return super(CapacityLedgerMixin, self).to_representation(obj)
+
+
+class InstanceSerializer(CapacityLedgerMixin, BaseSerializer):
 
     consumed_capacity = serializers.SerializerMethodField()
     percent_capacity_remaining = serializers.SerializerMethodField()
@@ -4818,7 +4885,7 @@ class InstanceSerializer(BaseSerializer):
             return float("{0:.2f}".format(((float(obj.capacity) - float(obj.consumed_capacity)) / (float(obj.capacity))) * 100))
 
 
-class InstanceGroupSerializer(BaseSerializer):
+class InstanceGroupSerializer(CapacityLedgerMixin, BaseSerializer):
 
     show_capabilities = ['edit', 'delete']
 
@@ -4941,10 +5008,9 @@ class InstanceGroupSerializer(BaseSerializer):
         # Store capacity values (globally computed) in the context
         if 'capacity_map' not in self.context:
             ig_qs = None
-            jobs_qs = UnifiedJob.objects.filter(status__in=('running', 'waiting'))
             if self.parent:  # Is ListView:
                 ig_qs = self.parent.instance
-            self.context['capacity_map'] = InstanceGroup.objects.capacity_values(qs=ig_qs, tasks=jobs_qs, breakdown=True)
+            self.context['capacity_map'] = InstanceGroup.objects.capacity_values(qs=ig_qs, tasks=self.get_capacity_ledger().tasks, breakdown=True)
         return self.context['capacity_map']
 
     def get_consumed_capacity(self, obj):
@@ -20,7 +20,7 @@ from urllib3.exceptions import ConnectTimeoutError
 # Django
 from django.conf import settings
 from django.core.exceptions import FieldError, ObjectDoesNotExist
-from django.db.models import Q, Sum
+from django.db.models import Min, Q
 from django.db import IntegrityError, ProgrammingError, transaction, connection
 from django.shortcuts import get_object_or_404
 from django.utils.safestring import mark_safe
@@ -217,91 +217,60 @@ class DashboardView(APIView):
         '''Show Dashboard Details'''
         data = OrderedDict()
         data['related'] = {'jobs_graph': reverse('api:dashboard_jobs_graph_view', request=request)}
-        user_inventory = get_user_queryset(request.user, models.Inventory)
-        inventory_with_failed_hosts = user_inventory.filter(hosts_with_active_failures__gt=0)
-        user_inventory_external = user_inventory.filter(has_inventory_sources=True)
-        # if there are *zero* inventories, this aggregrate query will be None, fall back to 0
-        failed_inventory = user_inventory.aggregate(Sum('inventory_sources_with_failures'))['inventory_sources_with_failures__sum'] or 0
+        statistics = models.DashboardRollup.statistics_for_user(request.user)
         data['inventories'] = {
             'url': reverse('api:inventory_list', request=request),
-            'total': user_inventory.count(),
-            'total_with_inventory_source': user_inventory_external.count(),
-            'job_failed': inventory_with_failed_hosts.count(),
-            'inventory_failed': failed_inventory,
+            'total': statistics['inventories']['total'],
+            'total_with_inventory_source': statistics['inventories']['total_with_inventory_source'],
+            'job_failed': statistics['inventories']['job_failed'],
+            'inventory_failed': statistics['inventories']['inventory_failed'],
         }
-        user_inventory_sources = get_user_queryset(request.user, models.InventorySource)
-        ec2_inventory_sources = user_inventory_sources.filter(source='ec2')
-        ec2_inventory_failed = ec2_inventory_sources.filter(status='failed')
         data['inventory_sources'] = {}
         data['inventory_sources']['ec2'] = {
             'url': reverse('api:inventory_source_list', request=request) + "?source=ec2",
             'failures_url': reverse('api:inventory_source_list', request=request) + "?source=ec2&status=failed",
             'label': 'Amazon EC2',
-            'total': ec2_inventory_sources.count(),
-            'failed': ec2_inventory_failed.count(),
+            'total': statistics['ec2_inventory_sources']['total'],
+            'failed': statistics['ec2_inventory_sources']['failed'],
         }
 
-        user_groups = get_user_queryset(request.user, models.Group)
-        groups_inventory_failed = models.Group.objects.filter(inventory_sources__last_job_failed=True).count()
-        data['groups'] = {'url': reverse('api:group_list', request=request), 'total': user_groups.count(), 'inventory_failed': groups_inventory_failed}
+        data['groups'] = {
+            'url': reverse('api:group_list', request=request),
+            'total': statistics['groups']['total'],
+            'inventory_failed': statistics['groups_inventory_failed'],
+        }
 
-        user_hosts = get_user_queryset(request.user, models.Host)
-        user_hosts_failed = user_hosts.filter(last_job_host_summary__failed=True)
         data['hosts'] = {
             'url': reverse('api:host_list', request=request),
             'failures_url': reverse('api:host_list', request=request) + "?last_job_host_summary__failed=True",
-            'total': user_hosts.count(),
-            'failed': user_hosts_failed.count(),
+            'total': statistics['hosts']['total'],
+            'failed': statistics['hosts']['failed'],
         }
 
-        user_projects = get_user_queryset(request.user, models.Project)
-        user_projects_failed = user_projects.filter(last_job_failed=True)
         data['projects'] = {
             'url': reverse('api:project_list', request=request),
             'failures_url': reverse('api:project_list', request=request) + "?last_job_failed=True",
-            'total': user_projects.count(),
-            'failed': user_projects_failed.count(),
+            'total': statistics['projects']['total'],
+            'failed': statistics['projects']['failed'],
         }
 
-        git_projects = user_projects.filter(scm_type='git')
-        git_failed_projects = git_projects.filter(last_job_failed=True)
-        svn_projects = user_projects.filter(scm_type='svn')
-        svn_failed_projects = svn_projects.filter(last_job_failed=True)
-        archive_projects = user_projects.filter(scm_type='archive')
-        archive_failed_projects = archive_projects.filter(last_job_failed=True)
         data['scm_types'] = {}
-        data['scm_types']['git'] = {
-            'url': reverse('api:project_list', request=request) + "?scm_type=git",
-            'label': 'Git',
-            'failures_url': reverse('api:project_list', request=request) + "?scm_type=git&last_job_failed=True",
-            'total': git_projects.count(),
-            'failed': git_failed_projects.count(),
-        }
-        data['scm_types']['svn'] = {
-            'url': reverse('api:project_list', request=request) + "?scm_type=svn",
-            'label': 'Subversion',
-            'failures_url': reverse('api:project_list', request=request) + "?scm_type=svn&last_job_failed=True",
-            'total': svn_projects.count(),
-            'failed': svn_failed_projects.count(),
-        }
-        data['scm_types']['archive'] = {
-            'url': reverse('api:project_list', request=request) + "?scm_type=archive",
-            'label': 'Remote Archive',
-            'failures_url': reverse('api:project_list', request=request) + "?scm_type=archive&last_job_failed=True",
-            'total': archive_projects.count(),
-            'failed': archive_failed_projects.count(),
-        }
+        for scm_type, label in (('git', 'Git'), ('svn', 'Subversion'), ('archive', 'Remote Archive')):
+            data['scm_types'][scm_type] = {
+                'url': reverse('api:project_list', request=request) + "?scm_type={}".format(scm_type),
+                'label': label,
+                'failures_url': reverse('api:project_list', request=request) + "?scm_type={}&last_job_failed=True".format(scm_type),
+                'total': statistics['projects']['{}_total'.format(scm_type)],
+                'failed': statistics['projects']['{}_failed'.format(scm_type)],
+            }
 
         user_list = get_user_queryset(request.user, models.User)
-        team_list = get_user_queryset(request.user, models.Team)
-        credential_list = get_user_queryset(request.user, models.Credential)
-        job_template_list = get_user_queryset(request.user, models.JobTemplate)
         organization_list = get_user_queryset(request.user, models.Organization)
         data['users'] = {'url': reverse('api:user_list', request=request), 'total': user_list.count()}
         data['organizations'] = {'url': reverse('api:organization_list', request=request), 'total': organization_list.count()}
-        data['teams'] = {'url': reverse('api:team_list', request=request), 'total': team_list.count()}
-        data['credentials'] = {'url': reverse('api:credential_list', request=request), 'total': credential_list.count()}
-        data['job_templates'] = {'url': reverse('api:job_template_list', request=request), 'total': job_template_list.count()}
+        data['teams'] = {'url': reverse('api:team_list', request=request), 'total': statistics['teams']['total']}
+        data['credentials'] = {'url': reverse('api:credential_list', request=request), 'total': statistics['credentials']['total']}
+        data['job_templates'] = {'url': reverse('api:job_template_list', request=request), 'total': statistics['job_templates']['total']}
         return Response(data)
 
 
@@ -3724,6 +3693,7 @@ class BaseJobEventsList(NoTruncateMixin, SubListAPIView):
     relationship = 'job_events'
     name = _('Job Events List')
     search_fields = ('stdout',)
+    pagination_class = UnifiedJobEventPagination
 
     def finalize_response(self, request, response, *args, **kwargs):
         response['X-UI-Max-Events'] = settings.MAX_UI_JOB_EVENTS
@@ -3733,12 +3703,22 @@ class BaseJobEventsList(NoTruncateMixin, SubListAPIView):
 class HostJobEventsList(BaseJobEventsList):
 
     parent_model = models.Host
+    # events for a host span many jobs, so counter is not unique here
+    cursor_ordering = ('id',)
 
     def get_queryset(self):
         parent_obj = self.get_parent_object()
         self.check_parent_access(parent_obj)
         qs = self.request.user.get_queryset(self.model).filter(host=parent_obj)
-        return qs
+        # Only jobs that had not finished by the time the host was created can
+        # have events for it, whatever inventory they ran against (jobs of a
+        # smart inventory record events under the original host).  Bounding
+        # job_created by the oldest such job lets postgres skip every older
+        # event partition.
+        earliest = models.Job.objects.filter(Q(finished__isnull=True) | Q(finished__gte=parent_obj.created)).aggregate(earliest=Min('created'))['earliest']
+        if earliest is None:
+            return qs.none()
+        return qs.filter(job_created__gte=earliest)
 
 
 class GroupJobEventsList(BaseJobEventsList):
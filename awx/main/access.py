@@ -436,6 +436,9 @@ class BaseAccess(object):
             elif display_method == 'copy' and isinstance(obj, WorkflowJobTemplate) and obj.organization_id is None:
                 user_capabilities[display_method] = self.user.is_superuser
                 continue
+            elif display_method == 'delete' and isinstance(obj, Job) and obj.organization_id is None:
+                user_capabilities[display_method] = self.user.is_superuser
+                continue
             elif display_method == 'copy' and isinstance(obj, Project) and obj.scm_type == '':
                 # Cannot copy manual project without errors
                 user_capabilities[display_method] = False
@@ -2494,10 +2497,10 @@ class UnifiedJobAccess(BaseAccess):
     # )
 
     def filtered_queryset(self):
-        inv_pk_qs = Inventory._accessible_pk_qs(Inventory, self.user, 'read_role')
+        inv_pk_qs = Inventory.materialized_accessible_pk_qs(self.user, 'read_role')
         org_auditor_qs = Organization.objects.filter(Q(admin_role__members=self.user) | Q(auditor_role__members=self.user))
         qs = self.model.objects.filter(
-            Q(unified_job_template_id__in=UnifiedJobTemplate.accessible_pk_qs(self.user, 'read_role'))
+            Q(unified_job_template_id__in=UnifiedJobTemplate.materialized_accessible_pk_qs(self.user, 'read_role'))
             | Q(inventoryupdate__inventory_source__inventory__id__in=inv_pk_qs)
             | Q(adhoccommand__inventory__id__in=inv_pk_qs)
             | Q(organization__in=org_auditor_qs)
@@ -2705,17 +2708,17 @@ class ActivityStreamAccess(BaseAccess):
         # 'job_template', 'job', 'project', 'project_update', 'workflow_job',
         # 'inventory_source', 'workflow_job_template'
 
-        inventory_set = Inventory.accessible_objects(self.user, 'read_role')
-        credential_set = Credential.accessible_objects(self.user, 'read_role')
+        inventory_set = Inventory.materialized_accessible_pk_qs(self.user, 'read_role')
+        credential_set = Credential.materialized_accessible_pk_qs(self.user, 'read_role')
         auditing_orgs = (
             (Organization.accessible_objects(self.user, 'admin_role') | Organization.accessible_objects(self.user, 'auditor_role'))
             .distinct()
             .values_list('id', flat=True)
         )
-        project_set = Project.accessible_objects(self.user, 'read_role')
-        jt_set = JobTemplate.accessible_objects(self.user, 'read_role')
-        team_set = Team.accessible_objects(self.user, 'read_role')
-        wfjt_set = WorkflowJobTemplate.accessible_objects(self.user, 'read_role')
+        project_set = Project.materialized_accessible_pk_qs(self.user, 'read_role')
+        jt_set = JobTemplate.materialized_accessible_pk_qs(self.user, 'read_role')
+        team_set = Team.materialized_accessible_pk_qs(self.user, 'read_role')
+        wfjt_set = WorkflowJobTemplate.materialized_accessible_pk_qs(self.user, 'read_role')
         app_set = OAuth2ApplicationAccess(self.user).filtered_queryset()
         token_set = OAuth2TokenAccess(self.user).filtered_queryset()
 
@@ -1,3 +1,4 @@
+import gzip
 import io
 import json
 import os
@@ -217,8 +218,9 @@ def instance_info(since, include_hostnames=False, **kwargs):
     instances = models.Instance.objects.values_list('hostname').values(
         'uuid', 'version', 'capacity', 'cpu', 'memory', 'managed_by_policy', 'hostname', 'enabled'
     )
+    ledger = models.CapacityLedger()
     for instance in instances:
-        consumed_capacity = sum(x.task_impact for x in models.UnifiedJob.objects.filter(execution_node=instance['hostname'], status__in=('running', 'waiting')))
+        consumed_capacity = ledger.consumed_capacity(instance['hostname'])
         instance_info = {
             'uuid': instance['uuid'],
             'version': instance['version'],
@@ -273,7 +275,9 @@ def query_info(since, collection_type, until, **kwargs):
 '''
 The event table can be *very* large, and we have a 100MB upload limit.
 
-Split large table dumps at dump time into a series of files.
+Split large table dumps at dump time into a series of files.  Each file is
+compressed as it is written, so an uncompressed dump never touches the disk;
+gather() adds the compressed data to its archive as is.
 '''
 MAX_TABLE_SIZE = 200 * 1048576
 
@@ -291,8 +295,8 @@ class FileSplitter(io.StringIO):
         if self.currentfile:
             self.currentfile.close()
         self.counter = 0
-        fname = '{}_split{}'.format(self.filespec, len(self.files))
-        self.currentfile = open(fname, 'w', encoding='utf-8')
+        fname = '{}_split{}.gz'.format(self.filespec, len(self.files))
+        self.currentfile = gzip.open(fname, 'wt', encoding='utf-8')
         self.files.append(fname)
         if self.header:
             self.currentfile.write('{}\n'.format(self.header))
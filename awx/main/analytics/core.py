@@ -1,18 +1,26 @@
+import concurrent.futures
+import contextlib
+import functools
+import gzip
 import inspect
-import io
 import json
 import logging
 import os
 import os.path
 import pathlib
 import shutil
+import struct
 import tarfile
 import tempfile
+import threading
+import time
 
 from django.conf import settings
+from django.db import connection
 from django.core.serializers.json import DjangoJSONEncoder
 from django.utils.timezone import now, timedelta
 from rest_framework.exceptions import PermissionDenied
+import psutil
 import requests
 
 from awx.conf.license import get_license
@@ -58,7 +66,8 @@ def register(key, version, description=None, format='json', expensive=None):
 
     Decorated functions should do the following based on format:
     - json: return JSON-serializable objects.
-    - csv: write CSV data to a filename named 'key'
+    - csv: write CSV data to a filename named 'key', optionally gzip
+      compressed (see collectors.FileSplitter), and return the paths written.
 
     @register('projects_by_scm_type', 1)
     def projects_by_scm_type():
@@ -76,36 +85,90 @@ def register(key, version, description=None, format='json', expensive=None):
     return decorate
 
 
+class ArchiveWriter(object):
+    """
+    Writes a .tar.gz as a series of gzip members, one or more per tar member.
+    Readers decompress concatenated gzip members as a single stream, which
+    lets table dumps that were compressed as they were copied out of the
+    database (see collectors.FileSplitter) be added without decompressing
+    and compressing them again.
+    """
+
+    def __init__(self, path, mtime):
+        self.file = open(path, 'xb')
+        self.name = self.file.name
+        self.mtime = mtime
+
+    def header(self, name, size):
+        info = tarfile.TarInfo(f'./{name}')
+        info.size = size
+        info.mtime = self.mtime
+        return info.tobuf()
+
+    def padding(self, size):
+        remainder = size % tarfile.BLOCKSIZE
+        return tarfile.NUL * (tarfile.BLOCKSIZE - remainder) if remainder else b''
+
+    def add_bytes(self, name, buf):
+        self.file.write(gzip.compress(self.header(name, len(buf)) + buf + self.padding(len(buf))))
+
+    def add_file(self, name, path):
+        if path.endswith('.gz'):
+            with open(path, 'rb') as src:
+                # the uncompressed size is in the gzip trailer (modulo 2**32,
+                # but dumps are split well before that)
+                src.seek(-4, os.SEEK_END)
+                size = struct.unpack('<I', src.read(4))[0]
+                src.seek(0)
+                self.file.write(gzip.compress(self.header(name, size)))
+                shutil.copyfileobj(src, self.file)
+            self.file.write(gzip.compress(self.padding(size)))
+        else:
+            size = os.path.getsize(path)
+            with open(path, 'rb') as src, gzip.GzipFile(fileobj=self.file, mode='wb') as dst:
+                dst.write(self.header(name, size))
+                shutil.copyfileobj(src, dst)
+                dst.write(self.padding(size))
+
+    def close(self):
+        self.file.write(gzip.compress(tarfile.NUL * tarfile.BLOCKSIZE * 2))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+# chooses archive names for the collectors running concurrently in gather()
+package_lock = threading.Lock()
+
+
 def package(target, data, timestamp):
     try:
         tarname_base = f'{settings.SYSTEM_UUID}-{timestamp.strftime("%Y-%m-%d-%H%M%S%z")}'
         path = pathlib.Path(target)
-        index = len(list(path.glob(f'{tarname_base}-*.*')))
-        tarname = f'{tarname_base}-{index}.tar.gz'
+        with package_lock:
+            index = len(list(path.glob(f'{tarname_base}-*.*')))
+            tarname = f'{tarname_base}-{index}.tar.gz'
+            f = ArchiveWriter(target.joinpath(tarname), timestamp.timestamp())
 
         manifest = {}
-        with tarfile.open(target.joinpath(tarname), 'w:gz') as f:
+        with f:
             for name, (item, version) in data.items():
                 try:
                     if isinstance(item, str):
-                        f.add(item, arcname=f'./{name}')
+                        f.add_file(name, item)
                     else:
-                        buf = json.dumps(item).encode('utf-8')
-                        info = tarfile.TarInfo(f'./{name}')
-                        info.size = len(buf)
-                        info.mtime = timestamp.timestamp()
-                        f.addfile(info, fileobj=io.BytesIO(buf))
+                        f.add_bytes(name, json.dumps(item).encode('utf-8'))
                     manifest[name] = version
                 except Exception:
                     logger.exception(f"Could not generate metric {name}")
                     return None
 
             try:
-                buf = json.dumps(manifest).encode('utf-8')
-                info = tarfile.TarInfo('./manifest.json')
-                info.size = len(buf)
-                info.mtime = timestamp.timestamp()
-                f.addfile(info, fileobj=io.BytesIO(buf))
+                f.add_bytes('manifest.json', json.dumps(manifest).encode('utf-8'))
             except Exception:
                 logger.exception("Could not generate manifest.json")
                 return None
@@ -161,6 +224,144 @@ def calculate_collection_interval(since, until):
     return since, until, last_gather
 
 
+class GatherState(object):
+    """
+    What the collectors of one gather() run share while they run
+    concurrently: the archives written so far, whether all of them shipped,
+    the last entry collected for each collector, and the peak memory and
+    disk use of the run, sampled as each slice is collected and packaged.
+    """
+
+    def __init__(self, dest, last_entries, collection_type):
+        self.lock = threading.Lock()
+        self.dest = dest
+        self.last_entries = last_entries
+        self.collection_type = collection_type
+        self.tarfiles = []
+        self.succeeded = True
+        self.process = psutil.Process()
+        self.peak_memory = 0
+        self.peak_disk = 0
+
+    def add_tarfile(self, path):
+        with self.lock:
+            self.tarfiles.append(path)
+        self.sample()
+
+    def failed(self):
+        with self.lock:
+            self.succeeded = False
+
+    def sample(self):
+        memory = self.process.memory_info().rss
+        with self.lock:
+            paths = list(self.tarfiles)
+        for root, dirs, files in os.walk(self.dest):
+            paths.extend(os.path.join(root, name) for name in files)
+        disk = 0
+        for path in paths:
+            try:
+                disk += os.path.getsize(path)
+            except OSError:  # removed in the meantime
+                pass
+        with self.lock:
+            self.peak_memory = max(self.peak_memory, memory)
+            self.peak_disk = max(self.peak_disk, disk)
+
+    def update_last_entries(self, keys, end):
+        if self.collection_type == 'dry-run':
+            return
+        from awx.main.signals import disable_activity_stream
+
+        with self.lock, disable_activity_stream():
+            for key in keys:
+                entry = self.last_entries.get(key)
+                self.last_entries[key] = max(entry, end) if entry and type(entry) == type(end) else end
+            settings.AUTOMATION_ANALYTICS_LAST_ENTRIES = json.dumps(self.last_entries, cls=DjangoJSONEncoder)
+
+
+@contextlib.contextmanager
+def statement_timeout(seconds):
+    """
+    Cancels any query run in this context that takes longer than `seconds`.
+    """
+    if not seconds or connection.vendor != 'postgresql':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SHOW statement_timeout')
+        previous = cursor.fetchone()[0]
+        cursor.execute('SET statement_timeout = %s', [int(seconds * 1000)])
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('SET statement_timeout = %s', [previous])
+
+
+def run_collectors(calls, workers):
+    if workers <= 1:
+        for call in calls:
+            call()
+        return
+
+    def run(call):
+        try:
+            call()
+        finally:
+            # each thread has its own database connection
+            connection.close()
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix='analytics') as executor:
+        for future in [executor.submit(run, call) for call in calls]:
+            future.result()
+
+
+def gather_csv(func, state, config, since, until, last_gather):
+    """
+    Collects, packages and ships the slices of one CSV collector in order,
+    recording each slice as collected once it has shipped.
+    """
+    from awx.main.analytics import collectors
+
+    key = func.__awx_analytics_key__
+    filename = f'{key}.csv'
+    full_path = state.dest.joinpath('stage', func.__name__)
+    full_path.mkdir(mode=0o700)
+    try:
+        with statement_timeout(settings.AUTOMATION_ANALYTICS_STATEMENT_TIMEOUT):
+            # These slicer functions may return a generator. The `since` parameter is
+            # allowed to be None, and will fall back to LAST_ENTRIES[key] or to
+            # LAST_GATHER (truncated appropriately to match the 4-week limit).
+            if func.__awx_expensive__:
+                slices = func.__awx_expensive__(key, since, until, last_gather)
+            else:
+                slices = collectors.trivial_slicing(key, since, until, last_gather)
+
+            for start, end in slices:
+                files = func(start, full_path=full_path, until=end)
+                state.sample()
+
+                slice_succeeded = True
+                for fpath in files or []:
+                    tgzfile = package(state.dest.parent, {filename: (fpath, func.__awx_analytics_version__), 'config.json': config}, until)
+                    os.remove(fpath)
+                    if tgzfile is not None:
+                        state.add_tarfile(tgzfile)
+                        if state.collection_type != 'dry-run' and not ship(tgzfile):
+                            slice_succeeded = False
+                            state.failed()
+                            break
+
+                if slice_succeeded:
+                    state.update_last_entries([key], end)
+    except Exception:
+        state.failed()
+        logger.exception("Could not generate metric {}".format(filename))
+    finally:
+        shutil.rmtree(full_path, ignore_errors=True)
+
+
 def gather(dest=None, module=None, subset=None, since=None, until=None, collection_type='scheduled'):
     """
     Gather all defined metrics and write them as JSON files in a .tgz
@@ -219,90 +420,53 @@ def gather(dest=None, module=None, subset=None, since=None, until=None, collecti
         dest = pathlib.Path(dest or tempfile.mkdtemp(prefix='awx_analytics'))
         gather_dir = dest.joinpath('stage')
         gather_dir.mkdir(mode=0o700)
-        tarfiles = []
-        succeeded = True
+        state = GatherState(dest, last_entries, collection_type)
+        started = time.time()
 
         # These json collectors are pretty compact, so collect all of them before shipping to analytics.
         data = {}
-        for func in json_collectors:
-            key = func.__awx_analytics_key__
-            filename = f'{key}.json'
-            try:
-                last_entry = max(last_entries.get(key) or last_gather, until - timedelta(weeks=4))
-                results = (func(since or last_entry, collection_type=collection_type, until=until), func.__awx_analytics_version__)
-                json.dumps(results)  # throwaway check to see if the data is json-serializable
-                data[filename] = results
-            except Exception:
-                logger.exception("Could not generate metric {}".format(filename))
-        if data:
-            if data.get('config.json') is None:
-                logger.error("'config' collector data is missing.")
-                return None
-
-            tgzfile = package(dest.parent, data, until)
-            if tgzfile is not None:
-                tarfiles.append(tgzfile)
-                if collection_type != 'dry-run':
-                    if ship(tgzfile):
-                        with disable_activity_stream():
-                            for filename in data:
-                                key = filename.replace('.json', '')
-                                last_entries[key] = max(last_entries[key], until) if last_entries.get(key) else until
-                            settings.AUTOMATION_ANALYTICS_LAST_ENTRIES = json.dumps(last_entries, cls=DjangoJSONEncoder)
-                    else:
-                        succeeded = False
+        with statement_timeout(settings.AUTOMATION_ANALYTICS_STATEMENT_TIMEOUT):
+            for func in json_collectors:
+                key = func.__awx_analytics_key__
+                filename = f'{key}.json'
+                try:
+                    last_entry = max(last_entries.get(key) or last_gather, until - timedelta(weeks=4))
+                    results = (func(since or last_entry, collection_type=collection_type, until=until), func.__awx_analytics_version__)
+                    json.dumps(results)  # throwaway check to see if the data is json-serializable
+                    data[filename] = results
+                except Exception:
+                    logger.exception("Could not generate metric {}".format(filename))
+        if data.get('config.json') is None:
+            # every archive includes it, it is required to ship
+            logger.error("'config' collector data is missing.")
+            shutil.rmtree(dest, ignore_errors=True)
+            return None
 
-        for func in csv_collectors:
-            key = func.__awx_analytics_key__
-            filename = f'{key}.csv'
-            try:
-                # These slicer functions may return a generator. The `since` parameter is
-                # allowed to be None, and will fall back to LAST_ENTRIES[key] or to
-                # LAST_GATHER (truncated appropriately to match the 4-week limit).
-                if func.__awx_expensive__:
-                    slices = func.__awx_expensive__(key, since, until, last_gather)
+        tgzfile = package(dest.parent, data, until)
+        if tgzfile is not None:
+            state.add_tarfile(tgzfile)
+            if collection_type != 'dry-run':
+                if ship(tgzfile):
+                    state.update_last_entries([filename.replace('.json', '') for filename in data], until)
                 else:
-                    slices = collectors.trivial_slicing(key, since, until, last_gather)
-
-                for start, end in slices:
-                    files = func(start, full_path=gather_dir, until=end)
-
-                    if not files:
-                        if collection_type != 'dry-run':
-                            with disable_activity_stream():
-                                entry = last_entries.get(key)
-                                last_entries[key] = max(entry, end) if entry and type(entry) == type(end) else end
-                                settings.AUTOMATION_ANALYTICS_LAST_ENTRIES = json.dumps(last_entries, cls=DjangoJSONEncoder)
-                        continue
-
-                    slice_succeeded = True
-                    for fpath in files:
-                        payload = {filename: (fpath, func.__awx_analytics_version__)}
-
-                        payload['config.json'] = data.get('config.json')
-                        if payload['config.json'] is None:
-                            logger.error("'config' collector data is missing, and is required to ship.")
-                            return None
-
-                        tgzfile = package(dest.parent, payload, until)
-                        if tgzfile is not None:
-                            tarfiles.append(tgzfile)
-                            if collection_type != 'dry-run':
-                                if not ship(tgzfile):
-                                    slice_succeeded, succeeded = False, False
-                                    break
-
-                    if slice_succeeded and collection_type != 'dry-run':
-                        with disable_activity_stream():
-                            entry = last_entries.get(key)
-                            last_entries[key] = max(entry, end) if entry and type(entry) == type(end) else end
-                            settings.AUTOMATION_ANALYTICS_LAST_ENTRIES = json.dumps(last_entries, cls=DjangoJSONEncoder)
-            except Exception:
-                succeeded = False
-                logger.exception("Could not generate metric {}".format(filename))
+                    state.failed()
+
+        # The table copies are what takes time, run them side by side; each
+        # collector still ships its own slices in order.
+        run_collectors(
+            [functools.partial(gather_csv, func, state, data['config.json'], since, until, last_gather) for func in csv_collectors],
+            settings.AUTOMATION_ANALYTICS_GATHER_WORKERS,
+        )
+        tarfiles = state.tarfiles
+
+        logger.info(
+            "Analytics collected in {:.1f}s, peak memory {:.1f} MiB, peak disk {:.1f} MiB".format(
+                time.time() - started, state.peak_memory / 1048576.0, state.peak_disk / 1048576.0
+            )
+        )
 
         if collection_type != 'dry-run':
-            if succeeded:
+            if state.succeeded:
                 for fpath in tarfiles:
                     if os.path.exists(fpath):
                         os.remove(fpath)
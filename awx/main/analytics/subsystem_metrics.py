@@ -166,7 +166,28 @@ class Metrics:
             FloatM('subsystem_metrics_pipe_execute_seconds', 'Time spent saving metrics to redis'),
             IntM('subsystem_metrics_pipe_execute_calls', 'Number of calls to pipe_execute'),
             FloatM('subsystem_metrics_send_metrics_seconds', 'Time spent sending metrics to other nodes'),
+            IntM('memoize_local_hits', 'Number of memoized calls served from the process-local cache'),
+            IntM('memoize_shared_hits', 'Number of memoized calls served from the shared cache'),
+            IntM('memoize_misses', 'Number of memoized calls that recomputed their value'),
+            IntM('memoize_lock_waits', 'Number of memoized calls that waited on another process to recompute a value'),
+            IntM('websocket_subscriptions', 'Number of websocket group subscription requests handled'),
+            FloatM('websocket_subscription_seconds', 'Time spent handling websocket group subscription requests'),
+            IntM('websocket_subscription_access_queries', 'Number of access queries run for websocket group subscriptions'),
+            IntM('broadcast_websocket_messages_sent', 'Number of websocket messages relayed to other nodes'),
+            IntM('broadcast_websocket_frames_sent', 'Number of websocket frames used to relay messages to other nodes'),
+            IntM('broadcast_websocket_messages_dropped', 'Number of websocket messages not relayed to other nodes due to rate limiting'),
+            IntM('dispatcher_messages_coalesced', 'Number of dispatcher messages dropped because an identical message was already pending'),
+            IntM('dispatcher_jobs_reaped', 'Number of jobs marked as failed because they were no longer running'),
+            FloatM('dispatcher_reap_seconds', 'Time spent reaping jobs that were no longer running'),
+            IntM('external_logger_records_queued', 'Number of log records queued to be sent to the external log aggregator'),
+            IntM('external_logger_records_sent', 'Number of log records sent to the external log aggregator'),
+            IntM('external_logger_records_dropped', 'Number of log records not sent to the external log aggregator because its queue was full'),
+            IntM('external_logger_send_errors', 'Number of failed attempts to send a log record to rsyslogd'),
+            IntM('periodic_tasks_skipped', 'Number of periodic task runs skipped because the previous run had not finished'),
         ]
+        for name in settings.CELERYBEAT_SCHEDULE:
+            METRICSLIST.append(SetFloatM(f'periodic_{name}_last_run', f'Timestamp of the last run of the {name} periodic task published by this node'))
+            METRICSLIST.append(SetFloatM(f'periodic_{name}_lag_seconds', f'Seconds the last run of the {name} periodic task was published after it was due'))
         # turn metric list into dictionary with the metric name as a key
         self.METRICS = {}
         for m in METRICSLIST:
@@ -299,6 +320,26 @@ class Metrics:
         return output_text
 
 
+def add_local_counters(counters):
+    # add process-local counter deltas directly to this node's metrics hash;
+    # used by code that runs in processes which cannot build a Metrics object
+    pipe = redis.Redis.from_url(settings.BROKER_URL).pipeline()
+    for field, value in counters.items():
+        if isinstance(value, float):
+            pipe.hincrbyfloat(root_key, field, value)
+        elif value:
+            pipe.hincrby(root_key, field, value)
+    pipe.execute()
+
+
+def set_local_gauges(gauges):
+    # set values directly in this node's metrics hash, see add_local_counters
+    pipe = redis.Redis.from_url(settings.BROKER_URL).pipeline()
+    for field, value in gauges.items():
+        pipe.hset(root_key, field, value)
+    pipe.execute()
+
+
 def metrics(request):
     m = Metrics()
     return m.generate_metrics(request)
@@ -9,6 +9,7 @@ from django.conf import settings
 from django.utils.encoding import force_bytes
 from django.contrib.auth.models import User
 
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 from channels.layers import get_channel_layer
 from channels.db import database_sync_to_async
@@ -89,6 +90,11 @@ class BroadcastConsumer(AsyncJsonWebsocketConsumer):
             await self.close()
             return
 
+        from awx.main.wsbroadcast import BroadcastMessageBuffer  # noqa
+
+        self.buffer = BroadcastMessageBuffer()
+        self.flush_task = None
+        self.last_metrics_save = time.monotonic()
         await self.accept()
         await self.channel_layer.group_add(settings.BROADCAST_WEBSOCKET_GROUP_NAME, self.channel_name)
         logger.info(f"client '{self.channel_name}' joined the broadcast group.")
@@ -96,12 +102,48 @@ class BroadcastConsumer(AsyncJsonWebsocketConsumer):
     async def disconnect(self, code):
         logger.info(f"client '{self.channel_name}' disconnected from the broadcast group.")
         await self.channel_layer.group_discard(settings.BROADCAST_WEBSOCKET_GROUP_NAME, self.channel_name)
+        if getattr(self, 'flush_task', None):
+            self.flush_task.cancel()
 
     async def internal_message(self, event):
         await self.send(event['text'])
 
+    async def broadcast_message(self, event):
+        self.buffer.add(event['group'], event['text'], droppable=event.get('droppable', False))
+        if self.buffer.full:
+            await self.flush()
+        elif self.flush_task is None:
+            self.flush_task = asyncio.ensure_future(self.flush_later())
+
+    async def flush_later(self):
+        await asyncio.sleep(settings.BROADCAST_WEBSOCKET_BATCH_WINDOW_SECONDS)
+        self.flush_task = None
+        await self.flush()
+
+    async def flush(self):
+        for frame in self.buffer.drain():
+            await self.send(frame)
+        if time.monotonic() - self.last_metrics_save > settings.SUBSYSTEM_METRICS_INTERVAL_SAVE_TO_REDIS:
+            self.last_metrics_save = time.monotonic()
+            await self.record_metrics(self.buffer.pop_counters())
+
+    @sync_to_async
+    def record_metrics(self, counters):
+        try:
+            from awx.main.analytics.subsystem_metrics import add_local_counters
+
+            add_local_counters(counters)
+        except Exception:
+            logger.debug('Could not record websocket broadcast metrics', exc_info=True)
+
 
 class EventConsumer(AsyncJsonWebsocketConsumer):
+    # per-connection authorization cache, see get_real_user()
+    _real_user = None
+    _authorized_ids = None
+    _auth_cache_expires = 0
+    _subscription_queries = 0
+
     async def connect(self):
         user = self.scope['user']
         if user and not user.is_anonymous:
@@ -128,16 +170,34 @@ class EventConsumer(AsyncJsonWebsocketConsumer):
                 self.channel_name,
             )
 
-    @database_sync_to_async
-    def user_can_see_object_id(self, user_access, oid):
+    def get_real_user(self):
         # At this point user is a channels.auth.UserLazyObject object
         # This causes problems with our generic role permissions checking.
         # Specifically, type(user) != User
         # Therefore, get the "real" User objects from the database before
-        # calling the access permission methods
-        user_access.user = User.objects.get(id=user_access.user.id)
-        res = user_access.get_queryset().filter(pk=oid).exists()
-        return res
+        # calling the access permission methods.  The real user is kept for
+        # the lifetime of the authorization cache.
+        now = time.monotonic()
+        if self._real_user is None or now > self._auth_cache_expires:
+            self._real_user = User.objects.get(id=self.scope['user'].id)
+            self._authorized_ids = {}
+            self._auth_cache_expires = now + settings.WEBSOCKET_AUTHORIZATION_CACHE_SECONDS
+        return self._real_user
+
+    @database_sync_to_async
+    def authorized_object_ids(self, access_cls, group_name, oids):
+        """
+        Return the subset of `oids` the user is allowed to see, resolved with
+        a single query for every ID not already authorized on this connection.
+        """
+        user_access = access_cls(self.get_real_user())
+        authorized = self._authorized_ids.setdefault(group_name, set())
+        unknown = set(oids) - authorized
+        if unknown:
+            visible = user_access.get_queryset().filter(pk__in=unknown).prefetch_related(None)
+            authorized.update(visible.values_list('pk', flat=True))
+            self._subscription_queries += 1
+        return authorized.intersection(oids)
 
     async def receive_json(self, data):
         from awx.main.access import consumer_access
@@ -150,19 +210,28 @@ class EventConsumer(AsyncJsonWebsocketConsumer):
             return
 
         if 'groups' in data:
+            subscribe_start = time.perf_counter()
+            self._subscription_queries = 0
             groups = data['groups']
             new_groups = set()
             current_groups = set(self.scope['session'].pop('groups') if 'groups' in self.scope['session'] else [])
             for group_name, v in groups.items():
                 if type(v) is list:
+                    access_cls = consumer_access(group_name)
+                    allowed = None
+                    if access_cls is not None:
+                        ids = {}
+                        for oid in v:
+                            try:
+                                ids[oid] = int(oid)
+                            except (TypeError, ValueError):
+                                pass
+                        allowed = await self.authorized_object_ids(access_cls, group_name, set(ids.values()))
                     for oid in v:
                         name = '{}-{}'.format(group_name, oid)
-                        access_cls = consumer_access(group_name)
-                        if access_cls is not None:
-                            user_access = access_cls(user)
-                            if not await self.user_can_see_object_id(user_access, oid):
-                                await self.send_json({"error": "access denied to channel {0} for resource id {1}".format(group_name, oid)})
-                                continue
+                        if allowed is not None and ids.get(oid) not in allowed:
+                            await self.send_json({"error": "access denied to channel {0} for resource id {1}".format(group_name, oid)})
+                            continue
                         new_groups.add(name)
                 else:
                     await self.send_json({"error": "access denied to channel"})
@@ -181,6 +250,22 @@ class EventConsumer(AsyncJsonWebsocketConsumer):
                 await self.channel_layer.group_add(group_name, self.channel_name)
             self.scope['session']['groups'] = new_groups
             await self.send_json({"groups_current": list(new_groups), "groups_left": list(old_groups), "groups_joined": list(new_groups_exclusive)})
+            await self.record_subscription_metrics(time.perf_counter() - subscribe_start, self._subscription_queries)
+
+    @sync_to_async
+    def record_subscription_metrics(self, duration, queries):
+        try:
+            from awx.main.analytics.subsystem_metrics import add_local_counters
+
+            add_local_counters(
+                {
+                    'websocket_subscriptions': 1,
+                    'websocket_subscription_seconds': duration,
+                    'websocket_subscription_access_queries': queries,
+                }
+            )
+        except Exception:
+            logger.debug('Could not record websocket subscription metrics', exc_info=True)
 
     async def internal_message(self, event):
         await self.send(event['text'])
@@ -200,9 +285,12 @@ def _dump_payload(payload):
         return None
 
 
-def emit_channel_notification(group, payload):
-    from awx.main.wsbroadcast import wrap_broadcast_msg  # noqa
-
+def emit_channel_notification(group, payload, droppable=False):
+    """
+    Send `payload` to the websocket clients subscribed to `group` on every node.
+    Droppable messages may be discarded on their way to other nodes when the
+    group exceeds BROADCAST_WEBSOCKET_GROUP_RATE_LIMIT.
+    """
     payload_dumped = _dump_payload(payload)
     if payload_dumped is None:
         return
@@ -220,8 +308,10 @@ def emit_channel_notification(group, payload):
         channel_layer.group_send(
             settings.BROADCAST_WEBSOCKET_GROUP_NAME,
             {
-                "type": "internal.message",
-                "text": wrap_broadcast_msg(group, payload_dumped),
+                "type": "broadcast.message",
+                "group": group,
+                "text": payload_dumped,
+                "droppable": droppable,
             },
         )
     )
@@ -120,7 +120,7 @@ class DatabaseWrapper(BaseDatabaseWrapper):
         self.queries_log = RecordedQueryLog(self.queries_log, self)
 
     @property
-    @memoize(ttl=1, cache=__loc__)
+    @memoize(ttl=1, cache=__loc__, record_stats=False)
     def force_debug_cursor(self):
         # in Django's base DB implementation, `self.force_debug_cursor` is just
         # a simple boolean, and this value is used to signal to Django that it
@@ -44,12 +44,17 @@ class PubSub(object):
         self.conn.close()
 
 
-@contextmanager
-def pg_bus_conn():
+def pg_connect():
     conf = settings.DATABASES['default']
     conn = psycopg2.connect(dbname=conf['NAME'], host=conf['HOST'], user=conf['USER'], password=conf['PASSWORD'], port=conf['PORT'], **conf.get("OPTIONS", {}))
     # Django connection.cursor().connection doesn't have autocommit=True on
     conn.set_session(autocommit=True)
+    return conn
+
+
+@contextmanager
+def pg_bus_conn():
+    conn = pg_connect()
     pubsub = PubSub(conn)
     yield pubsub
     conn.close()
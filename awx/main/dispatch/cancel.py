@@ -0,0 +1,119 @@
+import json
+import logging
+import threading
+from queue import Empty as QueueEmpty
+
+from django.db import connection
+
+logger = logging.getLogger('awx.main.dispatch')
+
+
+def cancel_channel(hostname):
+    # channel names are identifiers, and postgres limits those to 63 bytes;
+    # a collision after truncation only costs the other node a spurious check
+    return 'awx_cancel_{}'.format(hostname)[:63]
+
+
+def notify_cancel(unified_job):
+    """
+    Tell the node running `unified_job` that its cancel flag was set.
+
+    The notification is sent on the Django connection, so postgres only
+    delivers it once the transaction that set the flag is committed.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cur:
+        cur.execute('SELECT pg_notify(%s, %s);', (cancel_channel(unified_job.get_queue_name()), json.dumps({'id': unified_job.pk})))
+
+
+def cancel_notification_job_id(payload):
+    """
+    Return the id of the job a cancel notification is about, or None if the
+    payload is malformed.
+    """
+    try:
+        return int(json.loads(payload)['id'])
+    except (ValueError, KeyError, TypeError):
+        logger.warning('Ignoring malformed cancel notification {}'.format(payload))
+        return None
+
+
+class CancelListener(object):
+    """
+    Wakes up the threads of this worker process watching the jobs whose
+    cancel flag was set.
+
+    The dispatcher process LISTENs for the cancel notifications of its node
+    on the connection it already holds for its queues, and forwards the job
+    id to the worker running that job (see WorkerPool.forward_cancel), so a
+    node holds one LISTEN however many jobs it runs.  The worker reads them
+    from `queue` in a thread that runs while it has watchers.  A wakeup only
+    means "look at the database now"; the watcher still reads the cancel flag
+    before canceling anything.  A None id wakes every watcher; it is
+    forwarded whenever the dispatcher (re)connects, so a cancel sent while it
+    was not listening is not missed.
+    """
+
+    select_timeout = 5
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.watchers = {}
+        self.thread = None
+        self.queue = None
+
+    @property
+    def connected(self):
+        # jobs run outside of a dispatcher worker are never woken up
+        return self.queue is not None
+
+    def register(self, unified_job_id):
+        wakeup = threading.Event()
+        with self.lock:
+            self.watchers.setdefault(unified_job_id, set()).add(wakeup)
+        self.ensure_running()
+        return wakeup
+
+    def ensure_running(self):
+        with self.lock:
+            if self.thread is None and self.watchers and self.connected:
+                self.thread = threading.Thread(target=self.run, name='awx-cancel-listener', daemon=True)
+                self.thread.start()
+
+    def unregister(self, unified_job_id, wakeup):
+        with self.lock:
+            watchers = self.watchers.get(unified_job_id, set())
+            watchers.discard(wakeup)
+            if not watchers:
+                self.watchers.pop(unified_job_id, None)
+
+    def wake(self, unified_job_id=None):
+        with self.lock:
+            if unified_job_id is None:
+                events = [e for watchers in self.watchers.values() for e in watchers]
+            else:
+                events = list(self.watchers.get(unified_job_id, ()))
+        for e in events:
+            e.set()
+
+    def run(self):
+        try:
+            while True:
+                try:
+                    self.wake(self.queue.get(timeout=self.select_timeout))
+                except QueueEmpty:
+                    pass
+                with self.lock:
+                    if not self.watchers:
+                        self.thread = None
+                        return
+        except Exception:
+            logger.exception('Cancel listener failed, job cancellation falls back to polling')
+            with self.lock:
+                self.thread = None
+                self.queue = None
+            self.wake()
+
+
+cancel_listener = CancelListener()
@@ -2,24 +2,151 @@ import logging
 import os
 import time
 from multiprocessing import Process
+from uuid import uuid4
 
+import redis
 from django.conf import settings
 from django.db import connections
-from schedule import Scheduler
 from django_guid.middleware import GuidMiddleware
 
+from awx.main.dispatch.publish import publisher
 from awx.main.dispatch.worker import TaskWorker
+from awx.main.models import PeriodicTaskLease
 
 logger = logging.getLogger('awx.main.dispatch.periodic')
 
 
-class Scheduler(Scheduler):
-    def run_continuously(self):
-        idle_seconds = max(1, min(self.jobs).period.total_seconds() / 2)
+def running_key(name):
+    # per node, a restarted dispatcher has lost whatever it had queued
+    return f'awx_periodic_running_{settings.CLUSTER_HOST_ID}_{name}'
+
+
+def finished(name):
+    """
+    Marks the last run of the periodic task `name` as finished, allowing
+    the next one to be published.
+    """
+    redis.Redis.from_url(settings.BROKER_URL).delete(running_key(name))
+
+
+class PeriodicTask(object):
+    """
+    An entry of CELERYBEAT_SCHEDULE.  Its runs are due every `schedule`,
+    counted from the previous due time rather than from when the previous
+    run was published, so that they do not drift; runs missed altogether
+    are not made up.
+
+    A run is skipped while the previous one published by this node is
+    still queued or running (for at most DISPATCHER_PERIODIC_RUNNING_INTERVALS
+    intervals, in case its message was lost), and, for entries with
+    `'cluster': True`, on every node but the one holding the task's lease, a
+    row in the database shared by all nodes (see PeriodicTaskLease).  The
+    lease lasts two intervals and is only renewed by the runs its holder
+    publishes, so another node takes over when its holder stops publishing.
+    """
+
+    def __init__(self, name, entry, start):
+        self.name = name
+        self.task = TaskWorker.resolve_callable(entry['task'])
+        self.interval = entry['schedule'].total_seconds()
+        self.cluster = entry.get('cluster', False)
+        self.due = start + self.interval
+
+    def advance(self, now):
+        """
+        Moves on to the next due time after `now`, and returns how many
+        seconds late the current run is.
+        """
+        lag = now - self.due
+        while self.due <= now:
+            self.due += self.interval
+        return lag
+
+    def leads(self):
+        if not self.cluster:
+            return True
+        return PeriodicTaskLease.acquire(self.name, settings.CLUSTER_HOST_ID, self.interval * 2 + 1)
+
+    def claim(self, conn):
+        """
+        Marks a run of the task as published by this node, unless the
+        previous one has not finished yet; returns the uuid of the run, or
+        None.
+        """
+        uuid = str(uuid4())
+        timeout = max(int(self.interval * settings.DISPATCHER_PERIODIC_RUNNING_INTERVALS), 1)
+        if not conn.set(running_key(self.name), uuid, nx=True, ex=timeout):
+            logger.debug(f'skipping periodic task {self.name}, its previous run has not finished')
+            return None
+        return uuid
 
+    def release(self, conn):
+        conn.delete(running_key(self.name))
+
+    def publish(self, uuid):
+        self.task.apply_async(uuid=uuid, periodic=self.name)
+
+
+class Scheduler(object):
+    def __init__(self):
+        self.tasks = []
+
+    def add(self, name, entry):
+        self.tasks.append(PeriodicTask(name, entry, time.time()))
+
+    def clear(self, conn):
+        conn.delete(*[running_key(task.name) for task in self.tasks])
+
+    def run_pending(self, conn):
+        now = time.time()
+        gauges, published, skipped = {}, [], 0
+        try:
+            # tasks that come due together are published in one round trip
+            with publisher.batch():
+                for task in self.tasks:
+                    if task.due > now:
+                        continue
+                    lag = task.advance(now)
+                    uuid = None
+                    try:
+                        uuid = task.claim(conn)
+                        if uuid is None:
+                            skipped += 1
+                            continue
+                        # only the runs published by the holder renew its lease
+                        if not task.leads():
+                            task.release(conn)
+                            continue
+                        task.publish(uuid)
+                    except Exception:
+                        logger.exception(f'failed to publish periodic task {task.name}')
+                        if uuid is not None:
+                            task.release(conn)
+                        continue
+                    published.append(running_key(task.name))
+                    gauges[f'periodic_{task.name}_last_run'] = now
+                    gauges[f'periodic_{task.name}_lag_seconds'] = lag
+        except Exception:
+            if published:
+                conn.delete(*published)
+            raise
+        try:
+            from awx.main.analytics.subsystem_metrics import add_local_counters, set_local_gauges
+
+            if gauges:
+                set_local_gauges(gauges)
+            if skipped:
+                add_local_counters({'periodic_tasks_skipped': skipped})
+        except Exception:
+            logger.debug('Could not record periodic task metrics', exc_info=True)
+
+    def run_continuously(self):
         def run():
             ppid = os.getppid()
             logger.warn('periodic beat started')
+            broker = redis.Redis.from_url(settings.BROKER_URL)
+            # nothing this node published before it (re)started is still running
+            self.clear(broker)
             while True:
                 if os.getppid() != ppid:
                     # if the parent PID changes, this process has been orphaned
@@ -33,10 +160,11 @@ class Scheduler(Scheduler):
                         # connection
                         conn.close_if_unusable_or_obsolete()
                     GuidMiddleware.set_guid(GuidMiddleware._generate_guid())
-                    self.run_pending()
+                    self.run_pending(broker)
                 except Exception:
                     logger.exception('encountered an error while scheduling periodic tasks')
-                time.sleep(idle_seconds)
+                # wake up for the next task due, but at least once a second
+                time.sleep(min(max(min(task.due for task in self.tasks) - time.time(), 0.1), 1))
 
         process = Process(target=run)
         process.daemon = True
@@ -45,8 +173,6 @@ class Scheduler(Scheduler):
 
 def run_continuously():
     scheduler = Scheduler()
-    for task in settings.CELERYBEAT_SCHEDULE.values():
-        apply_async = TaskWorker.resolve_callable(task['task']).apply_async
-        total_seconds = task['schedule'].total_seconds()
-        scheduler.every(total_seconds).seconds.do(apply_async)
+    for name, entry in settings.CELERYBEAT_SCHEDULE.items():
+        scheduler.add(name, entry)
     scheduler.run_continuously()
@@ -9,7 +9,8 @@ from datetime import datetime
 from uuid import uuid4
 
 import collections
-from multiprocessing import Process
+import json
+from multiprocessing import Process, Value
 from multiprocessing import Queue as MPQueue
 from queue import Full as QueueFull, Empty as QueueEmpty
 
@@ -29,6 +30,10 @@ else:
     logger = logging.getLogger('awx.main.dispatch')
 
 
+def coalesce_key(body):
+    return json.dumps([body.get('task'), body.get('args', []), body.get('kwargs', {})], sort_keys=True)
+
+
 class NoOpResultQueue(object):
     def put(self, item):
         pass
@@ -54,6 +59,14 @@ class PoolWorker(object):
     Periodically, the worker will call .calculate_managed_tasks(), which will
     cause messages in self.finished to be removed from self.managed_tasks.
 
+    A third queue, self.cancels, carries the ids of the jobs whose cancel flag
+    was set to the worker running them (see WorkerPool.forward_cancel).
+
+    The child process also counts the messages it has taken off its queue
+    in self.started, in shared memory, so that the messages in
+    self.managed_tasks it has not started yet are known exactly (see
+    .waiting_tasks), even before self.finished is drained.
+
     In this way, self.managed_tasks represents a view of the messages assigned
     to a specific process.  The message at [0] is the least-recently inserted
     message, and it represents what the worker is running _right now_
@@ -71,7 +84,12 @@ class PoolWorker(object):
         self.managed_tasks = collections.OrderedDict()
         self.finished = MPQueue(queue_size) if self.track_managed_tasks else NoOpResultQueue()
         self.queue = MPQueue(queue_size)
-        self.process = Process(target=target, args=(self.queue, self.finished) + args)
+        kwargs = {}
+        self.started = self.cancels = None
+        if self.track_managed_tasks:
+            self.started = kwargs['started'] = Value('L', 0)
+            self.cancels = kwargs['cancels'] = MPQueue()
+        self.process = Process(target=target, args=(self.queue, self.finished) + args, kwargs=kwargs)
         self.process.daemon = True
 
     def start(self):
@@ -155,6 +173,22 @@ class PoolWorker(object):
 
         return None
 
+    @property
+    def waiting_tasks(self):
+        """
+        The messages handed to this worker that it has not started yet.
+        """
+        if not self.track_managed_tasks:
+            return []
+        self.calculate_managed_tasks()
+        # the worker runs its messages in order, and counts each one before
+        # running it; if it starts one after this count is read, that run
+        # still starts after the caller looked
+        waiting = self.messages_sent - self.started.value
+        if waiting <= 0:
+            return []
+        return list(self.managed_tasks.values())[-waiting:]
+
     @property
     def orphaned_tasks(self):
         if not self.track_managed_tasks:
@@ -279,6 +313,32 @@ class WorkerPool(object):
         now = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S UTC')
         return tmpl.render(pool=self, workers=self.workers, meta=self.debug_meta, dt=now)
 
+    def find_pending(self, coalesce_key):
+        """
+        Look for a message with the given `coalesce_key` that has been handed
+        to a worker but not started yet.  Only pools that track the messages
+        of their workers (see StatefulPoolWorker) can find anything.
+        """
+        for w in self.workers:
+            for body in w.waiting_tasks:
+                if isinstance(body, dict) and body.get('coalesce_key') == coalesce_key:
+                    return body
+        return None
+
+    def forward_cancel(self, unified_job_id):
+        """
+        Pass the id of a job whose cancel flag was set on to the workers
+        running it; None is passed on to every worker.
+        """
+        for w in self.workers:
+            if w.cancels is None:
+                continue
+            if unified_job_id is not None:
+                w.calculate_managed_tasks()
+                if not any(isinstance(body, dict) and body.get('args', [])[:1] == [unified_job_id] for body in w.managed_tasks.values()):
+                    continue
+            w.cancels.put(unified_job_id)
+
     def write(self, preferred_queue, body):
         queue_order = sorted(range(len(self.workers)), key=lambda x: -1 if x == preferred_queue else x)
         write_attempt_order = []
@@ -1,17 +1,105 @@
 import inspect
 import logging
+import os
 import sys
 import json
+import threading
+from contextlib import contextmanager
 from uuid import uuid4
 
+import psycopg2
 from django.conf import settings
 from django_guid.middleware import GuidMiddleware
 
-from . import pg_bus_conn
+from . import pg_connect
 
 logger = logging.getLogger('awx.main.dispatch')
 
 
+class NotifyPublisher(object):
+    """
+    Publishes dispatcher messages over a persistent autocommit connection,
+    instead of connecting to postgres once per message.
+
+    The connection is opened on first use and shared by every thread in the
+    process.  If it turns out to be broken, it is replaced and the message is
+    sent again once (so a message can, rarely, be delivered twice).  A
+    connection inherited from a parent process is left alone, since closing
+    it would also close it for the parent.
+
+    Inside of `batch()`, messages published by the current thread are held
+    back and sent in as few round trips as possible when the block exits.
+    """
+
+    max_batch_size = 100
+
+    def __init__(self, connect=pg_connect):
+        self.connect = connect
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.conn = None
+        self.pid = None
+        self.inherited = []
+
+    def _connection(self):
+        if self.conn is not None and self.pid != os.getpid():
+            # keep a reference so the parent's connection is never closed
+            # (or garbage collected) by this process
+            self.inherited.append(self.conn)
+            self.conn = None
+        if self.conn is None or self.conn.closed:
+            self.conn = self.connect()
+            self.pid = os.getpid()
+        return self.conn
+
+    def _reset(self):
+        if self.conn is not None:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+        self.conn = None
+
+    def _send(self, messages):
+        sql = 'SELECT {};'.format(', '.join(['pg_notify(%s, %s)'] * len(messages)))
+        params = [value for message in messages for value in message]
+        with self.lock:
+            for retry in (True, False):
+                try:
+                    with self._connection().cursor() as cur:
+                        cur.execute(sql, params)
+                    return
+                except (psycopg2.InterfaceError, psycopg2.OperationalError):
+                    self._reset()
+                    if not retry:
+                        raise
+                    logger.warning('Connection used to publish dispatcher messages was lost, reconnecting.')
+
+    def notify(self, channel, payload):
+        pending = getattr(self.local, 'pending', None)
+        if pending is not None:
+            pending.append((channel, payload))
+        else:
+            self._send([(channel, payload)])
+
+    @contextmanager
+    def batch(self):
+        if getattr(self.local, 'pending', None) is not None:
+            # nested; the outermost batch sends everything
+            yield
+            return
+        self.local.pending = []
+        try:
+            yield
+        finally:
+            pending, self.local.pending = self.local.pending, None
+            for i in range(0, len(pending), self.max_batch_size):
+                self._send(pending[i : i + self.max_batch_size])
+
+
+publisher = NotifyPublisher()
+
+
 def serialize_task(f):
     return '.'.join([f.__module__, f.__name__])
 
@@ -49,17 +137,28 @@ class task:
     @task(queue='tower_broadcast')
     def announce():
         print("Run this everywhere!")
+
+    # Idempotent tasks can opt in to coalescing; a message is dropped by the
+    # dispatcher if an identical one (same task, args and kwargs) is still
+    # waiting for a worker:
+
+    @task(coalesce=True)
+    def recalculate(pk):
+        ...
     """
 
-    def __init__(self, queue=None):
+    def __init__(self, queue=None, coalesce=False):
         self.queue = queue
+        self.coalesce = coalesce
 
     def __call__(self, fn=None):
         queue = self.queue
+        coalesce = self.coalesce
 
         class PublisherMixin(object):
 
             queue = None
+            coalesce = False
 
             @classmethod
             def delay(cls, *args, **kwargs):
@@ -79,12 +178,13 @@ class task:
                 guid = GuidMiddleware.get_guid()
                 if guid:
                     obj['guid'] = guid
+                if cls.coalesce:
+                    obj['coalesce'] = True
                 obj.update(**kw)
                 if callable(queue):
                     queue = queue()
                 if not settings.IS_TESTING(sys.argv):
-                    with pg_bus_conn() as conn:
-                        conn.notify(queue, json.dumps(obj))
+                    publisher.notify(queue, json.dumps(obj))
                 return (obj, queue)
 
         # If the object we're wrapping *is* a class (e.g., RunJob), return
@@ -93,7 +193,7 @@ class task:
         # being decorated *plus* PublisherMixin so cls.apply_async() and
         # cls.delay() work
         bases = []
-        ns = {'name': serialize_task(fn), 'queue': queue}
+        ns = {'name': serialize_task(fn), 'queue': queue, 'coalesce': coalesce}
         if inspect.isclass(fn):
             bases = list(fn.__bases__)
             ns.update(fn.__dict__)
@@ -1,7 +1,12 @@
 from datetime import timedelta
+import decimal
+import functools
 import logging
+import time
 
-from django.db.models import Q
+from django.db import connection, transaction
+from django.db.models import Case, DateTimeField, DecimalField, F, Q, Value, When
+from django.db.models.functions import Coalesce, Concat
 from django.utils.timezone import now as tz_now
 from django.contrib.contenttypes.models import ContentType
 
@@ -9,6 +14,13 @@ from awx.main.models import Instance, UnifiedJob, WorkflowJob
 
 logger = logging.getLogger('awx.main.dispatch')
 
+REAPED_EXPLANATION = ' '.join(
+    (
+        'Task was marked as running but was not present in',
+        'the job queue, so it has been marked as failed.',
+    )
+)
+
 
 def reap_job(j, status):
     if UnifiedJob.objects.get(id=j.id).status not in ('running', 'waiting'):
@@ -16,12 +28,7 @@ def reap_job(j, status):
         return
     j.status = status
     j.start_args = ''  # blank field to remove encrypted passwords
-    j.job_explanation += ' '.join(
-        (
-            'Task was marked as running but was not present in',
-            'the job queue, so it has been marked as failed.',
-        )
-    )
+    j.job_explanation += REAPED_EXPLANATION
     j.save(update_fields=['status', 'start_args', 'job_explanation'])
     if hasattr(j, 'send_notification_templates'):
         j.send_notification_templates('failed')
@@ -29,6 +36,106 @@ def reap_job(j, status):
     logger.error('{} is no longer running; reaping'.format(j.log_format))
 
 
+def reap_jobs(queryset, status):
+    """
+    Does what reap_job does for every job of `queryset` that is still
+    waiting or running, with one conditional UPDATE for all of them rather
+    than a fetch and a save per job, and returns the ids of the jobs reaped.
+    Templates are read and saved once for all their reaped jobs, and
+    notification templates are looked up once per template.
+    """
+    start = time.time()
+    finished = tz_now()
+    with transaction.atomic():
+        rows = list(queryset.filter(status__in=('running', 'waiting')).select_for_update().order_by('id').values_list('id', 'started', 'finished', 'elapsed'))
+        if not rows:
+            return []
+        ids = [row[0] for row in rows]
+        dq = decimal.Decimal('1.000')
+        elapsed_field = DecimalField(max_digits=12, decimal_places=3)
+        elapsed = [
+            When(pk=pk, then=Value(decimal.Decimal(((job_finished or finished) - started).total_seconds()).quantize(dq), output_field=elapsed_field))
+            for pk, started, job_finished, job_elapsed in rows
+            if started and not job_elapsed
+        ]
+        failed = status in ('failed', 'error', 'canceled')
+        updates = dict(
+            status=status,
+            failed=failed,
+            start_args='',  # blank field to remove encrypted passwords
+            job_explanation=Concat(F('job_explanation'), Value(REAPED_EXPLANATION)),
+            modified=finished,
+        )
+        if status in ('successful', 'failed', 'error', 'canceled'):
+            updates['finished'] = Coalesce(F('finished'), Value(finished, output_field=DateTimeField()))
+            if elapsed:
+                updates['elapsed'] = Case(*elapsed, default=F('elapsed'))
+        # the rows are locked, so none of them can have finished in the meantime
+        UnifiedJob.objects.filter(id__in=ids, status__in=('running', 'waiting')).update(**updates)
+
+        jobs = list(UnifiedJob.objects.filter(id__in=ids).order_by('id'))
+        parents = {}
+        for j in jobs:
+            logger.error('{} is no longer running; reaping'.format(j.log_format))
+            if j.unified_job_template_id is None:
+                continue
+            # every job updates its template in turn, as saving each of them
+            # would, but the template is read and saved once
+            if j.unified_job_template_id not in parents:
+                parents[j.unified_job_template_id] = dict(instance=j._get_parent_instance(), update_fields=[], simultaneous=False)
+            parent = parents[j.unified_job_template_id]
+            if parent['instance'] is not None:
+                j._update_parent_instance_no_save(parent['instance'], parent['update_fields'])
+                parent['simultaneous'] = parent['simultaneous'] or getattr(j, 'allow_simultaneous', False)
+        for parent in parents.values():
+            if not parent['update_fields']:
+                continue
+            save = functools.partial(parent['instance'].save, update_fields=parent['update_fields'])
+            if parent['simultaneous']:
+                connection.on_commit(save)
+            else:
+                save()
+
+        notification_templates = {}
+        for j in jobs:
+            if not hasattr(j, 'send_notification_templates'):
+                continue
+            if j.unified_job_template_id is None:
+                j.send_notification_templates('failed')
+                continue
+            key = (type(j), j.unified_job_template_id)
+            if key not in notification_templates:
+                try:
+                    notification_templates[key] = j.get_notification_templates()
+                except Exception:
+                    logger.warn("No notification template defined for emitting notification")
+                    notification_templates[key] = {}
+            j.send_notification_templates('failed', notification_templates=notification_templates[key])
+
+        for j in jobs:
+            if hasattr(j, 'update_webhook_status'):
+                connection.on_commit(lambda j=j: j.update_webhook_status(status))
+        connection.on_commit(lambda: emit_reaped_status(jobs, status))
+
+    elapsed = time.time() - start
+    logger.info('Reaped {} jobs in {:.3f} seconds'.format(len(ids), elapsed))
+    try:
+        from awx.main.analytics.subsystem_metrics import add_local_counters
+
+        add_local_counters({'dispatcher_jobs_reaped': len(ids), 'dispatcher_reap_seconds': elapsed})
+    except Exception:
+        logger.debug('Could not record reaper metrics', exc_info=True)
+    return ids
+
+
+def emit_reaped_status(jobs, status):
+    for j in jobs:
+        try:
+            j._websocket_emit_status(status)
+        except Exception:
+            logger.exception('{} failed to emit channel msg about being reaped'.format(j.log_format))
+
+
 def reap(instance=None, status='failed', excluded_uuids=[]):
     """
     Reap all jobs in waiting|running for this instance.
@@ -45,5 +152,4 @@ def reap(instance=None, status='failed', excluded_uuids=[]):
         & (Q(execution_node=me.hostname) | Q(controller_node=me.hostname))
         & ~Q(polymorphic_ctype_id=workflow_ctype_id)
     ).exclude(celery_task_id__in=excluded_uuids)
-    for j in jobs:
-        reap_job(j, status)
+    return reap_jobs(jobs, status)
@@ -15,8 +15,10 @@ from queue import Empty as QueueEmpty
 from django import db
 from django.conf import settings
 
-from awx.main.dispatch.pool import WorkerPool
-from awx.main.dispatch import pg_bus_conn
+from awx.main.dispatch.pool import WorkerPool, coalesce_key
+from awx.main.dispatch import get_local_queuename, pg_bus_conn
+from awx.main.dispatch.cancel import cancel_channel, cancel_listener, cancel_notification_job_id
+from awx.main.analytics.subsystem_metrics import add_local_counters
 
 if 'run_callback_receiver' in sys.argv:
     logger = logging.getLogger('awx.main.commands.run_callback_receiver')
@@ -47,6 +49,7 @@ class AWXConsumerBase(object):
 
         self.name = name
         self.total_messages = 0
+        self.coalesced_messages = 0
         self.queues = queues
         self.worker = worker
         self.pool = pool
@@ -87,6 +90,25 @@ class AWXConsumerBase(object):
             except Exception:
                 logger.exception(f"Exception handling control message: {body}")
                 return
+        if body.get('coalesce') and not (body.get('callbacks') or body.get('errbacks')):
+            body['coalesce_key'] = coalesce_key(body)
+            duplicate = self.pool.find_pending(body['coalesce_key'])
+            if duplicate is not None:
+                # an identical idempotent message is still waiting for a
+                # worker, running it once covers both
+                logger.debug('coalesced {} into pending message {}'.format(body.get('uuid'), duplicate.get('uuid')))
+                self.coalesced_messages += 1
+                self.record_statistics()
+                if body.get('periodic'):
+                    # this run of the periodic task is over, the pending one
+                    # does its work
+                    try:
+                        from awx.main.dispatch.periodic import finished  # prevent circular import
+
+                        finished(body['periodic'])
+                    except Exception:
+                        logger.exception('failed to mark periodic task {} finished'.format(body['periodic']))
+                return
         if len(self.pool):
             if "uuid" in body and body['uuid']:
                 try:
@@ -105,6 +127,9 @@ class AWXConsumerBase(object):
         if time.time() - self.last_stats > 1:  # buffer stat recording to once per second
             try:
                 self.redis.set(f'awx_{self.name}_statistics', self.pool.debug())
+                if self.coalesced_messages:
+                    add_local_counters({'dispatcher_messages_coalesced': self.coalesced_messages})
+                    self.coalesced_messages = 0
                 self.last_stats = time.time()
             except Exception:
                 logger.exception(f"encountered an error communicating with redis to store {self.name} statistics")
@@ -139,16 +164,26 @@ class AWXConsumerPG(AWXConsumerBase):
 
         logger.warn(f"Running worker {self.name} listening to queues {self.queues}")
         init = False
+        cancels = cancel_channel(get_local_queuename())
 
         while True:
             try:
                 with pg_bus_conn() as conn:
                     for queue in self.queues:
                         conn.listen(queue)
+                    # one LISTEN for the cancels of every job run on this node
+                    conn.listen(cancels)
+                    # a cancel may have been sent while not listening
+                    self.pool.forward_cancel(None)
                     if init is False:
                         self.worker.on_start()
                         init = True
                     for e in conn.events():
+                        if e.channel == cancels:
+                            unified_job_id = cancel_notification_job_id(e.payload)
+                            if unified_job_id is not None:
+                                self.pool.forward_cancel(unified_job_id)
+                            continue
                         self.process_task(json.loads(e.payload))
                     if self.should_stop:
                         return
@@ -161,8 +196,10 @@ class BaseWorker(object):
     def read(self, queue):
         return queue.get(block=True, timeout=1)
 
-    def work_loop(self, queue, finished, idx, *args):
+    def work_loop(self, queue, finished, idx, *args, started=None, cancels=None):
         ppid = os.getppid()
+        if cancels is not None:
+            cancel_listener.queue = cancels
         signal_handler = WorkerSignalHandler()
         while not signal_handler.kill_now:
             # if the parent PID changes, this process has been orphaned
@@ -178,6 +215,10 @@ class BaseWorker(object):
             except Exception as e:
                 logger.error("Exception on worker {}, restarting: ".format(idx) + str(e))
                 continue
+            if started is not None:
+                # see PoolWorker.waiting_tasks
+                with started.get_lock():
+                    started.value += 1
             try:
                 for conn in db.connections.all():
                     # If the database connection has a hiccup during the prior message, close it
@@ -118,6 +118,14 @@ class TaskWorker(BaseWorker):
                 kube_config._cleanup_temp_files()
             except Exception:
                 logger.exception('failed to cleanup k8s client tmp files')
+            if body.get('periodic'):
+                # allow the next run of the periodic task to be published
+                try:
+                    from awx.main.dispatch.periodic import finished  # prevent circular import
+
+                    finished(body['periodic'])
+                except Exception:
+                    logger.exception('failed to mark periodic task {} finished'.format(body['periodic']))
 
         for callback in body.get('callbacks', []) or []:
             callback['uuid'] = body['uuid']
@@ -0,0 +1,19 @@
+# Copyright (c) 2015 Ansible, Inc.
+# All Rights Reserved
+
+from django.core.management.base import BaseCommand, CommandError
+
+from awx.main.models import CapacityLedger
+
+
+class Command(BaseCommand):
+    """Compare the capacity ledger against capacity computed per instance and instance group"""
+
+    def handle(self, *args, **options):
+        discrepancies = CapacityLedger().discrepancies()
+        for obj, attr, recorded, actual in discrepancies:
+            self.stdout.write('{} {}: ledger={} actual={}'.format(obj, attr, recorded, actual))
+        if discrepancies:
+            # jobs changing state while the check runs also show up here
+            raise CommandError('{} capacity ledger values do not match'.format(len(discrepancies)))
+        self.stdout.write('Capacity ledger is consistent')
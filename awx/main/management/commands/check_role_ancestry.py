@@ -0,0 +1,30 @@
+# Copyright (c) 2015 Ansible, Inc.
+# All Rights Reserved
+
+from django.core.management.base import BaseCommand, CommandError
+
+from awx.main.models import Role
+
+
+class Command(BaseCommand):
+    """Compare the role ancestors table against the ancestry computed from role parents"""
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', dest='fix', action='store_true', default=False, help='rebuild the ancestry of all roles if it does not match')
+
+    def handle(self, *args, **options):
+        missing, extra = Role.verify_role_ancestor_list()
+        for descendent_id, ancestor_id in missing:
+            self.stdout.write('missing: role {} descends from role {}'.format(descendent_id, ancestor_id))
+        for descendent_id, ancestor_id in extra:
+            self.stdout.write('extra: role {} does not descend from role {}'.format(descendent_id, ancestor_id))
+        if not (missing or extra):
+            self.stdout.write('Role ancestry is consistent')
+            return
+        if not options['fix']:
+            raise CommandError('{} role ancestry entries are missing and {} are extra'.format(len(missing), len(extra)))
+        Role.rebuild_role_ancestor_list(list(Role.objects.values_list('id', flat=True)), [])
+        missing, extra = Role.verify_role_ancestor_list()
+        if missing or extra:
+            raise CommandError('{} role ancestry entries are still missing and {} extra after rebuilding'.format(len(missing), len(extra)))
+        self.stdout.write('Role ancestry rebuilt')
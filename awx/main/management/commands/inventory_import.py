@@ -29,7 +29,7 @@ from awx.main.utils.safe_yaml import sanitize_jinja
 from awx.main.models.rbac import batch_role_ancestor_rebuilding
 from awx.main.utils import ignore_inventory_computed_fields, get_licenser
 from awx.main.utils.execution_environments import get_default_execution_environment
-from awx.main.signals import disable_activity_stream
+from awx.main.signals import buffer_activity_stream, disable_activity_stream
 from awx.main.constants import STANDARD_INVENTORY_UPDATE_ENV
 from awx.main.utils.pglock import advisory_lock
 
@@ -971,7 +971,8 @@ class Command(BaseCommand):
                             logger.warning('loading into database...')
                         with ignore_inventory_computed_fields():
                             if getattr(settings, 'ACTIVITY_STREAM_ENABLED_FOR_INVENTORY_SYNC', True):
-                                self.load_into_database()
+                                with buffer_activity_stream():
+                                    self.load_into_database()
                             else:
                                 with disable_activity_stream():
                                     self.load_into_database()
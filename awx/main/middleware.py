@@ -10,6 +10,8 @@ from django.conf import settings
 from django.contrib.auth import logout
 from django.contrib.auth.models import User
 from django.db.migrations.executor import MigrationExecutor
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import Count, Max
 from django.db import connection
 from django.shortcuts import redirect
 from django.apps import apps
@@ -145,9 +147,9 @@ class URLModificationMiddleware(MiddlewareMixin):
     def _named_url_to_pk(cls, node, resource, named_url):
         kwargs = {}
         if node.populate_named_url_query_kwargs(kwargs, named_url):
-            match = node.model.objects.filter(**kwargs).first()
-            if match:
-                return str(match.pk)
+            pk = node.model.objects.filter(**kwargs).values_list('pk', flat=True).first()
+            if pk is not None:
+                return str(pk)
             else:
                 # if the name does *not* resolve to any actual resource,
                 # we should still attempt to route it through so that 401s are
@@ -193,8 +195,37 @@ class URLModificationMiddleware(MiddlewareMixin):
 
 
 class MigrationRanCheckMiddleware(MiddlewareMixin):
+    """
+    Redirects to the upgrading page while there are unapplied migrations.
+
+    Computing the migration plan loads the migration graph and queries the
+    database, so it is not done on every request: once nothing is pending,
+    the process only checks again when the rows of django_migrations, which
+    every node reads from the same database, change.
+    """
+
+    lock = threading.Lock()
+    not_migrated = object()
+    migrated_marker = not_migrated  # the marker when no migrations were pending
+
+    @staticmethod
+    def migration_marker():
+        marker = MigrationRecorder.Migration.objects.aggregate(count=Count('id'), last=Max('id'))
+        return (marker['count'], marker['last'])
+
+    @classmethod
+    def migrations_pending(cls):
+        marker = cls.migration_marker()
+        if marker == cls.migrated_marker:
+            return False
+        with cls.lock:
+            executor = MigrationExecutor(connection)
+            plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
+            cls.migrated_marker = cls.not_migrated if plan else marker
+        if plan:
+            logger.debug('{} migrations have not been applied'.format(len(plan)))
+        return bool(plan)
+
     def process_request(self, request):
-        executor = MigrationExecutor(connection)
-        plan = executor.migration_plan(executor.loader.graph.leaf_nodes())
-        if bool(plan) and getattr(resolve(request.path), 'url_name', '') != 'migrations_notran':
+        if self.migrations_pending() and getattr(resolve(request.path), 'url_name', '') != 'migrations_notran':
             return redirect(reverse("ui_next:migrations_notran"))
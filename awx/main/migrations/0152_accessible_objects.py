@@ -0,0 +1,46 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('main', '0151_rename_managed_by_tower'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AccessibleObjectsState',
+            fields=[
+                (
+                    'user',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='+', serialize=False, to=settings.AUTH_USER_MODEL
+                    ),
+                ),
+                ('generation', models.PositiveIntegerField(default=0)),
+                ('built_generation', models.PositiveIntegerField(default=None, null=True)),
+                ('built', models.DateTimeField(default=None, null=True)),
+            ],
+            options={
+                'db_table': 'main_rbac_accessible_objects_state',
+            },
+        ),
+        migrations.CreateModel(
+            name='AccessibleObject',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role_field', models.TextField()),
+                ('content_type_id', models.PositiveIntegerField()),
+                ('object_id', models.PositiveIntegerField()),
+                ('user', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'main_rbac_accessible_objects',
+                'unique_together': {('user', 'content_type_id', 'role_field', 'object_id')},
+                'index_together': {('content_type_id', 'object_id', 'role_field')},
+            },
+        ),
+    ]
@@ -0,0 +1,25 @@
+import awx.main.fields
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0152_accessible_objects'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardRollup',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('statistics', awx.main.fields.JSONField(blank=True, default=dict)),
+                ('computed', models.DateTimeField(default=None, editable=False, null=True)),
+                (
+                    'organization',
+                    models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='main.Organization'),
+                ),
+            ],
+        ),
+    ]
@@ -0,0 +1,19 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('main', '0153_dashboardrollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PeriodicTaskLease',
+            fields=[
+                ('name', models.CharField(max_length=512, primary_key=True, serialize=False)),
+                ('holder', models.CharField(max_length=250)),
+                ('expires', models.DateTimeField()),
+            ],
+        ),
+    ]
@@ -45,12 +45,16 @@ from awx.main.models.ad_hoc_commands import AdHocCommand  # noqa
 from awx.main.models.schedules import Schedule  # noqa
 from awx.main.models.execution_environments import ExecutionEnvironment  # noqa
 from awx.main.models.activity_stream import ActivityStream  # noqa
+from awx.main.models.dashboard import DashboardRollup  # noqa
 from awx.main.models.ha import (  # noqa
+    CapacityLedger,
     Instance,
     InstanceGroup,
+    PeriodicTaskLease,
     TowerScheduleState,
 )
 from awx.main.models.rbac import (  # noqa
+    AccessibleObject,
     Role,
     batch_role_ancestor_rebuilding,
     get_roles_on_resource,
@@ -0,0 +1,149 @@
+# Copyright (c) 2015 Ansible, Inc.
+# All Rights Reserved.
+
+import logging
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, Q, Sum
+from django.utils.timezone import now, timedelta
+
+from awx.main.fields import JSONField
+from awx.main.models.credential import Credential
+from awx.main.models.inventory import Group, Host, Inventory, InventorySource
+from awx.main.models.jobs import JobTemplate
+from awx.main.models.organization import Organization, Team
+from awx.main.models.projects import Project
+
+__all__ = ('DashboardRollup',)
+
+logger = logging.getLogger('awx.main.models.dashboard')
+
+
+def project_statistics():
+    statistics = {'total': Count('pk'), 'failed': Count('pk', filter=Q(last_job_failed=True))}
+    for scm_type in ('git', 'svn', 'archive'):
+        statistics['{}_total'.format(scm_type)] = Count('pk', filter=Q(scm_type=scm_type))
+        statistics['{}_failed'.format(scm_type)] = Count('pk', filter=Q(scm_type=scm_type, last_job_failed=True))
+    return statistics
+
+
+# (key, model, path to the organization, aggregates)
+DASHBOARD_STATISTICS = (
+    (
+        'inventories',
+        Inventory,
+        'organization',
+        {
+            'total': Count('pk'),
+            'total_with_inventory_source': Count('pk', filter=Q(has_inventory_sources=True)),
+            'job_failed': Count('pk', filter=Q(hosts_with_active_failures__gt=0)),
+            'inventory_failed': Sum('inventory_sources_with_failures'),
+        },
+    ),
+    (
+        'ec2_inventory_sources',
+        InventorySource,
+        'inventory__organization',
+        {'total': Count('pk', filter=Q(source='ec2')), 'failed': Count('pk', filter=Q(source='ec2', status='failed'))},
+    ),
+    ('groups', Group, 'inventory__organization', {'total': Count('pk')}),
+    ('hosts', Host, 'inventory__organization', {'total': Count('pk'), 'failed': Count('pk', filter=Q(last_job_host_summary__failed=True))}),
+    ('projects', Project, 'organization', project_statistics()),
+    ('credentials', Credential, 'organization', {'total': Count('pk')}),
+    ('job_templates', JobTemplate, 'organization', {'total': Count('pk')}),
+    ('teams', Team, 'organization', {'total': Count('pk')}),
+)
+
+
+def groups_inventory_failed():
+    # not filtered by RBAC, the dashboard has always shown the system wide number
+    return Group.objects.filter(inventory_sources__last_job_failed=True).count()
+
+
+class DashboardRollup(models.Model):
+    """
+    Dashboard counts per organization, refreshed as a whole by
+    refresh_dashboard_rollups.  The row without an organization holds the
+    counts of objects that have none, and the refresh time of the set.
+
+    Organizations a user audits or administers can read all of their
+    objects, so their rollups are used as is; anything else the user can
+    read is still counted directly.  Rollups older than
+    DASHBOARD_ROLLUP_MAX_AGE seconds are not used at all.
+    """
+
+    class Meta:
+        app_label = 'main'
+
+    organization = models.ForeignKey(Organization, null=True, on_delete=models.CASCADE, related_name='+')
+    statistics = JSONField(blank=True, default=dict)
+    computed = models.DateTimeField(default=None, null=True, editable=False)
+
+    @classmethod
+    def refresh(cls):
+        start = now()
+        rows = defaultdict(dict)
+        rows[None]['groups_inventory_failed'] = groups_inventory_failed()
+        for key, model, organization_field, aggregates in DASHBOARD_STATISTICS:
+            for values in model.objects.order_by().values(organization_field).annotate(**aggregates):
+                organization_id = values.pop(organization_field)
+                rows[organization_id][key] = dict((k, v or 0) for k, v in values.items())
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create(
+                [cls(organization_id=organization_id, statistics=statistics, computed=start) for organization_id, statistics in rows.items()]
+            )
+        logger.debug('Refreshed dashboard rollups of {} organizations in {:.3f} seconds'.format(len(rows) - 1, (now() - start).total_seconds()))
+
+    @classmethod
+    def statistics_for_user(cls, user):
+        """
+        Returns the dashboard counts of the objects `user` can read, as
+        {key: {aggregate: count}} for the keys of DASHBOARD_STATISTICS, plus
+        groups_inventory_failed.
+        """
+        from awx.main.access import get_user_queryset
+        from awx.main.tasks import refresh_dashboard_rollups
+
+        max_age = timedelta(seconds=settings.DASHBOARD_ROLLUP_MAX_AGE)
+        system_rollup = cls.objects.filter(organization=None).first()
+        age = (now() - system_rollup.computed) if system_rollup else None
+        if age is None or age > max_age / 2:
+            # refreshed ahead of time so that busy dashboards keep using rollups
+            refresh_dashboard_rollups.delay()
+
+        totals = defaultdict(lambda: defaultdict(int))
+
+        def add(key, values):
+            for k, v in values.items():
+                totals[key][k] += v or 0
+
+        if age is None or age > max_age:
+            rollups, organizations = [], []
+            groups_failed = groups_inventory_failed()
+        elif user.is_superuser or user.is_system_auditor:
+            rollups, organizations = cls.objects.all(), None
+            groups_failed = system_rollup.statistics['groups_inventory_failed']
+        else:
+            organizations = set(Organization.accessible_pk_qs(user, 'admin_role').values_list('object_id', flat=True))
+            organizations.update(Organization.accessible_pk_qs(user, 'auditor_role').values_list('object_id', flat=True))
+            rollups = cls.objects.filter(organization__in=organizations)
+            groups_failed = system_rollup.statistics['groups_inventory_failed']
+
+        for rollup in rollups:
+            for key, values in rollup.statistics.items():
+                if isinstance(values, dict):
+                    add(key, values)
+        if organizations is not None:
+            for key, model, organization_field, aggregates in DASHBOARD_STATISTICS:
+                qs = get_user_queryset(user, model)
+                if organizations:
+                    qs = qs.exclude(**{'{}__in'.format(organization_field): organizations})
+                add(key, qs.order_by().aggregate(**aggregates))
+        for key, model, organization_field, aggregates in DASHBOARD_STATISTICS:
+            for k in aggregates:
+                totals[key][k] += 0
+        totals['groups_inventory_failed'] = groups_failed
+        return totals
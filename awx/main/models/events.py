@@ -100,6 +100,7 @@ def emit_event_detail(event):
             'role': getattr(event, 'role', ''),
             'task': getattr(event, 'task', ''),
         },
+        droppable=event.event not in MINIMAL_EVENTS,
     )
 
 
@@ -1,10 +1,13 @@
 # Copyright (c) 2015 Ansible, Inc.
 # All Rights Reserved.
 
+from collections import defaultdict
 from decimal import Decimal
 
 from django.core.validators import MinValueValidator
-from django.db import models, connection
+from django.db import models, connection, transaction, IntegrityError
+from django.db.models import Q
+from django.db.models.functions import Now
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils.translation import ugettext_lazy as _
@@ -23,7 +26,7 @@ from awx.main.models.unified_jobs import UnifiedJob
 from awx.main.utils import get_cpu_capacity, get_mem_capacity, get_system_task_capacity
 from awx.main.models.mixins import RelatedJobsMixin
 
-__all__ = ('Instance', 'InstanceGroup', 'TowerScheduleState')
+__all__ = ('Instance', 'InstanceGroup', 'PeriodicTaskLease', 'TowerScheduleState')
 
 
 class HasPolicyEditsMixin(HasEditsMixin):
@@ -96,8 +99,14 @@ class Instance(HasPolicyEditsMixin, BaseModel):
     def get_absolute_url(self, request=None):
         return reverse('api:instance_detail', kwargs={'pk': self.pk}, request=request)
 
+    # when set (see CapacityLedger.attach), capacity and job counts are read
+    # from the ledger instead of being queried for this instance alone
+    capacity_ledger = None
+
     @property
     def consumed_capacity(self):
+        if self.capacity_ledger is not None:
+            return self.capacity_ledger.consumed_capacity(self.hostname)
         return sum(x.task_impact for x in UnifiedJob.objects.filter(execution_node=self.hostname, status__in=('running', 'waiting')))
 
     @property
@@ -111,6 +120,8 @@ class Instance(HasPolicyEditsMixin, BaseModel):
 
     @property
     def jobs_running(self):
+        if self.capacity_ledger is not None:
+            return self.capacity_ledger.jobs_running(self.hostname)
         return UnifiedJob.objects.filter(
             execution_node=self.hostname,
             status__in=(
@@ -121,6 +132,8 @@ class Instance(HasPolicyEditsMixin, BaseModel):
 
     @property
     def jobs_total(self):
+        if self.capacity_ledger is not None:
+            return self.capacity_ledger.jobs_total(self.hostname)
         return UnifiedJob.objects.filter(execution_node=self.hostname).count()
 
     def is_lost(self, ref_time=None):
@@ -152,6 +165,89 @@ class Instance(HasPolicyEditsMixin, BaseModel):
         self.save(update_fields=['capacity', 'version', 'modified', 'cpu', 'memory', 'cpu_capacity', 'mem_capacity'])
 
 
+class CapacityLedger(object):
+    """
+    Consumed capacity and job counts of every instance and instance group,
+    built from a single pass over the running and waiting jobs, instead of
+    the queries the Instance and InstanceGroup properties run for one object
+    at a time.  Job totals are counted with one GROUP BY, the first time one
+    is asked for.
+
+    A ledger is a snapshot: build a new one to see jobs that changed state
+    since.  `discrepancies()` compares it against the per-object queries.
+    """
+
+    ACTIVE_STATUSES = ('running', 'waiting')
+
+    def __init__(self, tasks=None):
+        from awx.main.models.jobs import Job
+
+        if tasks is None:
+            tasks = UnifiedJob.objects.filter(status__in=self.ACTIVE_STATUSES)
+        self.tasks = [t for t in tasks if t.status in self.ACTIVE_STATUSES]
+        Job.prefetch_inventories([t for t in self.tasks if isinstance(t, Job)])
+
+        self._consumed_capacity = defaultdict(int)
+        self._jobs_running = defaultdict(int)
+        self._group_jobs_running = defaultdict(int)
+        for t in self.tasks:
+            if t.execution_node:
+                self._consumed_capacity[t.execution_node] += t.task_impact
+                self._jobs_running[t.execution_node] += 1
+            if t.instance_group_id:
+                self._group_jobs_running[t.instance_group_id] += 1
+        self._jobs_total = None
+        self._group_jobs_total = None
+
+    def attach(self, objs):
+        for obj in objs:
+            obj.capacity_ledger = self
+        return objs
+
+    def consumed_capacity(self, hostname):
+        return self._consumed_capacity.get(hostname, 0)
+
+    def jobs_running(self, hostname):
+        return self._jobs_running.get(hostname, 0)
+
+    def jobs_total(self, hostname):
+        if self._jobs_total is None:
+            self._jobs_total = self._count_by('execution_node')
+        return self._jobs_total.get(hostname, 0)
+
+    def group_jobs_running(self, instance_group_id):
+        return self._group_jobs_running.get(instance_group_id, 0)
+
+    def group_jobs_total(self, instance_group_id):
+        if self._group_jobs_total is None:
+            self._group_jobs_total = self._count_by('instance_group_id')
+        return self._group_jobs_total.get(instance_group_id, 0)
+
+    @staticmethod
+    def _count_by(field):
+        return dict(UnifiedJob.objects.order_by().values_list(field).annotate(count=models.Count('id')))
+
+    def discrepancies(self):
+        """
+        Returns a list of (object, attribute, ledger value, actual value) for
+        every value of the ledger that does not match what the Instance and
+        InstanceGroup properties compute without it.  Jobs that changed state
+        after the ledger was built show up here too.
+        """
+        found = []
+        checks = [(i, ('consumed_capacity', 'jobs_running', 'jobs_total')) for i in Instance.objects.all()]
+        checks += [(g, ('jobs_running', 'jobs_total')) for g in InstanceGroup.objects.all()]
+        for obj, attrs in checks:
+            for attr in attrs:
+                obj.capacity_ledger = self
+                recorded = getattr(obj, attr)
+                obj.capacity_ledger = None
+                actual = getattr(obj, attr)
+                if recorded != actual:
+                    found.append((obj, attr, recorded, actual))
+        return found
+
+
 class InstanceGroup(HasPolicyEditsMixin, BaseModel, RelatedJobsMixin):
     """A model representing a Queue/Group of AWX Instances."""
 
@@ -196,12 +292,18 @@ class InstanceGroup(HasPolicyEditsMixin, BaseModel, RelatedJobsMixin):
     def capacity(self):
         return sum([inst.capacity for inst in self.instances.all()])
 
+    capacity_ledger = None
+
     @property
     def jobs_running(self):
+        if self.capacity_ledger is not None:
+            return self.capacity_ledger.group_jobs_running(self.pk)
         return UnifiedJob.objects.filter(status__in=('running', 'waiting'), instance_group=self).count()
 
     @property
     def jobs_total(self):
+        if self.capacity_ledger is not None:
+            return self.capacity_ledger.group_jobs_total(self.pk)
         return UnifiedJob.objects.filter(instance_group=self).count()
 
     '''
@@ -245,6 +347,38 @@ class TowerScheduleState(SingletonModel):
     schedule_last_run = models.DateTimeField(auto_now_add=True)
 
 
+class PeriodicTaskLease(models.Model):
+    """
+    The node that publishes a periodic task marked `'cluster': True` (see
+    awx.main.dispatch.periodic), until the lease expires.
+    """
+
+    class Meta:
+        app_label = 'main'
+
+    name = models.CharField(primary_key=True, max_length=512)
+    holder = models.CharField(max_length=250)
+    expires = models.DateTimeField()
+
+    @classmethod
+    def acquire(cls, name, holder, seconds):
+        """
+        Renew the lease `name` for `seconds` if `holder` holds it, or take it
+        if it expired; returns whether `holder` holds it.  Expiry is computed
+        by the database, so the clocks of the nodes do not matter.
+        """
+        expires = Now() + timedelta(seconds=seconds)
+        # postgres checks the condition again if another node updated the row meanwhile
+        if cls.objects.filter(Q(holder=holder) | Q(expires__lte=Now()), name=name).update(holder=holder, expires=expires):
+            return True
+        try:
+            with transaction.atomic():
+                cls.objects.create(name=name, holder=holder, expires=expires)
+        except IntegrityError:
+            return False
+        return True
+
+
 def schedule_policy_task():
     from awx.main.tasks import apply_cluster_membership_policies
 
@@ -19,6 +19,7 @@ from django.db import transaction
 from django.core.exceptions import ValidationError
 from django.utils.timezone import now
 from django.db.models import Q
+from django.db.models.functions import Coalesce
 
 # REST Framework
 from rest_framework.exceptions import ParseError
@@ -316,12 +317,12 @@ class Inventory(CommonModelNameNotUnique, ResourceMixin, RelatedJobsMixin):
 
         return data
 
-    def update_computed_fields(self):
+    def _count_computed_fields(self):
         """
-        Update model fields that are computed from database relationships.
+        Computed fields counted one query at a time; only used to verify
+        the results of update_computed_fields (see
+        AWX_VERIFY_INVENTORY_COMPUTED_FIELDS).
         """
-        logger.debug("Going to update inventory computed fields, pk={0}".format(self.pk))
-        start_time = time.time()
         active_hosts = self.hosts
         failed_hosts = active_hosts.filter(last_job_host_summary__failed=True)
         active_groups = self.groups
@@ -332,7 +333,7 @@ class Inventory(CommonModelNameNotUnique, ResourceMixin, RelatedJobsMixin):
         else:
             active_inventory_sources = self.inventory_sources.filter(source__in=CLOUD_INVENTORY_SOURCES)
         failed_inventory_sources = active_inventory_sources.filter(last_job_failed=True)
-        computed_fields = {
+        return {
             'has_active_failures': bool(failed_hosts.count()),
             'total_hosts': active_hosts.count(),
             'hosts_with_active_failures': failed_hosts.count(),
@@ -341,8 +342,59 @@ class Inventory(CommonModelNameNotUnique, ResourceMixin, RelatedJobsMixin):
             'total_inventory_sources': active_inventory_sources.count(),
             'inventory_sources_with_failures': failed_inventory_sources.count(),
         }
+
+    def update_computed_fields(self):
+        """
+        Update model fields that are computed from database relationships.
+        """
+        logger.debug("Going to update inventory computed fields, pk={0}".format(self.pk))
+        start_time = time.time()
+        # hosts are counted in a single pass; for smart inventories self.hosts
+        # is built from the host filter, so it cannot be a correlated subquery
+        host_counts = self.hosts.order_by().aggregate(
+            total_hosts=models.Count('pk'),
+            hosts_with_active_failures=models.Count('pk', filter=Q(last_job_host_summary__failed=True)),
+        )
+
+        def count(qs):
+            qs = qs.filter(inventory=models.OuterRef('pk')).order_by().values('inventory').annotate(count=models.Count('pk')).values('count')
+            return Coalesce(models.Subquery(qs, output_field=models.IntegerField()), 0)
+
+        # groups and inventory sources are counted in the query that fetches the inventory
         # CentOS python seems to have issues clobbering the inventory on poor timing during certain operations
-        iobj = Inventory.objects.get(id=self.id)
+        if self.kind == 'smart':
+            iobj = Inventory.objects.get(id=self.id)
+            group_counts = dict(total_groups=0, total_inventory_sources=0, inventory_sources_with_failures=0)
+        else:
+            cloud_sources = InventorySource.objects.filter(source__in=CLOUD_INVENTORY_SOURCES)
+            iobj = Inventory.objects.annotate(
+                computed_total_groups=count(Group.objects),
+                computed_total_inventory_sources=count(cloud_sources),
+                computed_inventory_sources_with_failures=count(cloud_sources.filter(last_job_failed=True)),
+            ).get(id=self.id)
+            group_counts = dict(
+                total_groups=iobj.computed_total_groups,
+                total_inventory_sources=iobj.computed_total_inventory_sources,
+                inventory_sources_with_failures=iobj.computed_inventory_sources_with_failures,
+            )
+        computed_fields = {
+            'has_active_failures': bool(host_counts['hosts_with_active_failures']),
+            'total_hosts': host_counts['total_hosts'],
+            'hosts_with_active_failures': host_counts['hosts_with_active_failures'],
+            'total_groups': group_counts['total_groups'],
+            'has_inventory_sources': bool(group_counts['total_inventory_sources']),
+            'total_inventory_sources': group_counts['total_inventory_sources'],
+            'inventory_sources_with_failures': group_counts['inventory_sources_with_failures'],
+        }
+        if settings.AWX_VERIFY_INVENTORY_COMPUTED_FIELDS:
+            expected = self._count_computed_fields()
+            if expected != computed_fields:
+                logger.error(
+                    'Computed fields of inventory pk={0} do not match, using counted values instead; aggregated={1} counted={2}'.format(
+                        self.pk, computed_fields, expected
+                    )
+                )
+                computed_fields = expected
         for field, value in list(computed_fields.items()):
             if getattr(iobj, field) != value:
                 setattr(iobj, field, value)
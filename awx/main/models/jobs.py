@@ -644,6 +644,21 @@ class Job(UnifiedJob, JobOptions, SurveyJobMixin, JobNotificationMixin, TaskMana
             raise ParseError(_('{status_value} is not a valid status option.').format(status_value=status))
         return self._get_hosts(**kwargs)
 
+    @classmethod
+    def prefetch_inventories(cls, jobs):
+        """
+        Load the inventories `task_impact` needs for all of `jobs` with one
+        query, instead of one query per job.
+        """
+        inventory_field = cls._meta.get_field('inventory')
+        unloaded = [j for j in jobs if j.inventory_id and j.launch_type != 'callback' and not inventory_field.is_cached(j)]
+        if not unloaded:
+            return
+        inventories = inventory_field.related_model.objects.in_bulk({j.inventory_id for j in unloaded})
+        for job in unloaded:
+            if job.inventory_id in inventories:
+                inventory_field.set_cached_value(job, inventories[job.inventory_id])
+
     @property
     def task_impact(self):
         if self.launch_type == 'callback':
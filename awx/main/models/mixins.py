@@ -19,7 +19,7 @@ from django.utils.translation import ugettext_lazy as _
 
 # AWX
 from awx.main.models.base import prevent_search
-from awx.main.models.rbac import Role, RoleAncestorEntry, get_roles_on_resource
+from awx.main.models.rbac import AccessibleObject, Role, RoleAncestorEntry, get_roles_on_resource
 from awx.main.utils import parse_yaml_or_json, get_custom_venv_choices, get_licenser, polymorphic
 from awx.main.utils.execution_environments import get_default_execution_environment
 from awx.main.utils.encryption import decrypt_value, get_encryption_key, is_encrypted
@@ -65,6 +65,14 @@ class ResourceMixin(models.Model):
     def accessible_pk_qs(cls, accessor, role_field):
         return ResourceMixin._accessible_pk_qs(cls, accessor, role_field)
 
+    @classmethod
+    def materialized_accessible_pk_qs(cls, user, role_field):
+        """
+        Like `accessible_pk_qs` for a user, but read from the user's
+        materialized AccessibleObject set; meant for large list views.
+        """
+        return AccessibleObject.accessible_pk_qs(user, role_field, [ContentType.objects.get_for_model(cls).id])
+
     @staticmethod
     def _accessible_pk_qs(cls, accessor, role_field, content_types=None):
         if type(accessor) == User:
@@ -507,16 +507,21 @@ class JobNotificationMixin(object):
 
         return (msg, body)
 
-    def send_notification_templates(self, status):
+    def send_notification_templates(self, status, notification_templates=None):
+        """
+        `notification_templates` is the result of get_notification_templates(),
+        for callers notifying many jobs of the same template.
+        """
         from awx.main.tasks import send_notifications  # avoid circular import
 
         if status not in ['running', 'succeeded', 'failed']:
             raise ValueError(_("status must be either running, succeeded or failed"))
-        try:
-            notification_templates = self.get_notification_templates()
-        except Exception:
-            logger.warn("No notification template defined for emitting notification")
-            return
+        if notification_templates is None:
+            try:
+                notification_templates = self.get_notification_templates()
+            except Exception:
+                logger.warn("No notification template defined for emitting notification")
+                return
 
         if not notification_templates:
             return
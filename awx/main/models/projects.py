@@ -515,20 +515,20 @@ class ProjectUpdate(UnifiedJob, ProjectOptions, JobNotificationMixin, TaskManage
     def _get_parent_field_name(self):
         return 'project'
 
-    def _update_parent_instance(self):
-        if not self.project:
-            return  # no parent instance to update
+    def _update_parent_instance_no_save(self, parent_instance, update_fields=None):
+        if update_fields is None:
+            update_fields = []
         if self.job_type == PERM_INVENTORY_DEPLOY:
             # Do not update project status if this is sync job
             # unless no other updates have happened or started
             first_update = False
-            if self.project.status == 'never updated' and self.status == 'running':
+            if parent_instance.status == 'never updated' and self.status == 'running':
                 first_update = True
-            elif self.project.current_job == self:
+            elif parent_instance.current_job == self:
                 first_update = True
             if not first_update:
-                return
-        return super(ProjectUpdate, self)._update_parent_instance()
+                return update_fields
+        return super(ProjectUpdate, self)._update_parent_instance_no_save(parent_instance, update_fields=update_fields)
 
     @classmethod
     def _get_task_class(cls):
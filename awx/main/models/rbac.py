@@ -2,15 +2,20 @@
 # All Rights Reserved.
 
 # Python
+import datetime
 import logging
 import threading
 import contextlib
 import re
 
 # Django
+from django.conf import settings
 from django.db import models, transaction, connection
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
+from django.utils.timezone import now
 from django.utils.translation import ugettext_lazy as _
 
 # AWX
@@ -19,6 +24,7 @@ from django.contrib.auth.models import User  # noqa
 
 __all__ = [
     'Role',
+    'AccessibleObject',
     'batch_role_ancestor_rebuilding',
     'get_roles_on_resource',
     'ROLE_SINGLETON_SYSTEM_ADMINISTRATOR',
@@ -31,6 +37,20 @@ logger = logging.getLogger('awx.main.models.rbac')
 ROLE_SINGLETON_SYSTEM_ADMINISTRATOR = 'system_administrator'
 ROLE_SINGLETON_SYSTEM_AUDITOR = 'system_auditor'
 
+# role fields for which AccessibleObject keeps per-user sets
+MATERIALIZED_ROLE_FIELDS = ('read_role',)
+
+# first key of the advisory locks taken while building a user's accessible objects
+ACCESSIBLE_OBJECTS_LOCK_ID = 0x41574F42
+
+# working tables of Role.rebuild_role_ancestor_list
+REBUILD_TEMPORARY_TABLES = (
+    ('tmp_rbac_seeds', 'id integer PRIMARY KEY'),
+    ('tmp_rbac_affected', 'id integer PRIMARY KEY'),
+    ('tmp_rbac_closure', 'descendent_id integer, ancestor_id integer, PRIMARY KEY (descendent_id, ancestor_id)'),
+    ('tmp_rbac_changed', 'id integer PRIMARY KEY'),
+)
+
 role_names = {
     'system_administrator': _('System Administrator'),
     'system_auditor': _('System Auditor'),
@@ -78,6 +98,7 @@ role_descriptions = {
 
 
 tls = threading.local()  # thread local storage
+accessible_objects_tables_exist = False
 
 
 def check_singleton(func):
@@ -229,63 +250,35 @@ class Role(models.Model):
         #   usage of this table simple in our queries as it enables us to do
         #   straight joins where we would have to do unions otherwise.
         #
-        # The simple version of what this function is doing
+        # Maintaining it
         # =================================================
         #
-        #   When something changes in our role "hierarchy", we need to update
-        #   the `Role.ancestors` mapping to reflect these changes. The basic
-        #   idea, which the code in this method is modeled after, is to do
-        #   this: When a change happens to a role's parents list, we update
-        #   that role's ancestry list, then we recursively update any child
-        #   roles ancestry lists.  Because our role relationships are not
-        #   strictly hierarchical, and can even have loops, this process may
-        #   necessarily visit the same nodes more than once. To handle this
-        #   without having to keep track of what should be updated (again) and
-        #   in what order, we simply use the termination condition of stopping
-        #   when our stored ancestry list matches what our list should be, eg,
-        #   when nothing changes. This can be simply implemented:
-        #
-        #      if actual_ancestors != stored_ancestors:
-        #          for id in actual_ancestors - stored_ancestors:
-        #              self.ancestors.add(id)
-        #          for id in stored_ancestors - actual_ancestors:
-        #              self.ancestors.remove(id)
-        #
-        #          for child in self.children.all():
-        #              child.rebuild_role_ancestor_list()
-        #
-        #   However this results in a lot of calls to the database, so the
-        #   optimized implementation below effectively does this same thing,
-        #   but we update all children at once, so effectively we sweep down
-        #   through our hierarchy one layer at a time instead of one node at a
-        #   time. Because of how this method works, we can also start from many
-        #   roots at once and sweep down a large set of roles, which we take
-        #   advantage of when performing bulk operations.
+        #   When the parents of some roles change (the `additions` and
+        #   `removals`, which are treated the same), only the ancestors of
+        #   those roles and of their descendents can change: the affected
+        #   roles.  Every other role keeps its stored ancestor list, which is
+        #   assumed to be correct.  Because our role relationships are not
+        #   strictly hierarchical, and can even have loops, the affected roles
+        #   are found with a recursive query over the parents table, not over
+        #   the (possibly stale) ancestors table.
         #
+        #   The ancestors of an affected role are then itself, plus the stored
+        #   ancestors of each parent that is not affected, plus the ancestors
+        #   of each parent that is affected, computed by the same rule.  A
+        #   second recursive query computes this closure for all affected roles
+        #   in one pass, sweeping down from the unaffected parents; the UNION
+        #   stops it once no new pairs are found, which also handles loops.
         #
-        # SQL Breakdown
-        # =============
-        #   We operate under the assumption that our parent's ancestor list is
-        #   correct, thus we can always compute what our ancestor list should
-        #   be by taking the union of our parent's ancestor lists and adding
-        #   our self reference entry where ancestor_id = descendent_id
-        #
-        #   The DELETE query deletes all entries in the ancestor table that
-        #   should no longer be there (as determined by the NOT EXISTS query,
-        #   which checks to see if the ancestor is still an ancestor of one
-        #   or more of our parents)
-        #
-        #   The INSERT query computes the list of what our ancestor maps should
-        #   be, and inserts any missing entries.
-        #
-        #   Once complete, we select all of the children for the roles we are
-        #   working with, this list becomes the new role list we are working
-        #   with.
-        #
-        #   When our delete or insert query return that they have not performed
-        #   any work, then we know that our children will also not need to be
-        #   updated, and so we can terminate our loop.
+        #   Finally only the difference is written: stored pairs of affected
+        #   roles missing from the closure are deleted, and closure pairs
+        #   missing from the table are inserted.  Unchanged pairs are not
+        #   touched, which keeps the number of rows locked and written
+        #   proportional to what actually changed.
         #
+        #   Role ids go through a temporary table filled with bound parameters,
+        #   and so do the intermediate results, so every statement is set
+        #   based no matter how many roles are involved.  The temporary tables
+        #   last as long as the database session.
         #
 
         if len(additions) == 0 and len(removals) == 0:
@@ -299,112 +292,170 @@ class Role(models.Model):
             getattr(tls, 'removals').update(set(removals))
             return
 
-        cursor = connection.cursor()
-        loop_ct = 0
+        sql_params = {
+            'ancestors_table': Role.ancestors.through._meta.db_table,
+            'parents_table': Role.parents.through._meta.db_table,
+            'roles_table': Role._meta.db_table,
+        }
+        seeds = list(set(additions) | set(removals))
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            # the temporary tables are created once per database session, and
+            # emptied by every commit on postgres; creating and dropping them
+            # for every change would churn the system catalogs
+            on_commit = ' ON COMMIT DELETE ROWS' if connection.vendor == 'postgresql' else ''
+            for table, columns in REBUILD_TEMPORARY_TABLES:
+                cursor.execute('CREATE TEMPORARY TABLE IF NOT EXISTS %s (%s)%s' % (table, columns, on_commit))
+                # rows of an earlier rebuild in the same transaction
+                cursor.execute('DELETE FROM %s' % table)
+
+            for i in range(0, len(seeds), 500):
+                ids = seeds[i : i + 500]
+                cursor.execute('INSERT INTO tmp_rbac_seeds (id) VALUES %s' % ','.join(['(%s)'] * len(ids)), ids)
+
+            # the roles whose ancestors may change: the seeds and all of their descendents
+            cursor.execute(
+                '''
+                WITH RECURSIVE affected(id) AS (
+                    SELECT id FROM tmp_rbac_seeds
+
+                    UNION
+
+                    SELECT parents.from_role_id
+                      FROM %(parents_table)s as parents
+                           INNER JOIN affected ON (parents.to_role_id = affected.id)
+                )
+                INSERT INTO tmp_rbac_affected (id) SELECT id FROM affected
+            '''
+                % sql_params
+            )
+
+            # what their ancestors should be
+            cursor.execute(
+                '''
+                WITH RECURSIVE closure(descendent_id, ancestor_id) AS (
+                    SELECT id, id FROM tmp_rbac_affected
+
+                    UNION
+
+                    SELECT parents.from_role_id, ancestors.ancestor_id
+                      FROM tmp_rbac_affected as affected
+                           INNER JOIN %(parents_table)s as parents
+                                   ON (parents.from_role_id = affected.id)
+                           INNER JOIN %(ancestors_table)s as ancestors
+                                   ON (ancestors.descendent_id = parents.to_role_id)
+                     WHERE parents.to_role_id NOT IN (SELECT id FROM tmp_rbac_affected)
+
+                    UNION
 
+                    SELECT parents.from_role_id, closure.ancestor_id
+                      FROM closure
+                           INNER JOIN %(parents_table)s as parents
+                                   ON (parents.to_role_id = closure.descendent_id)
+                )
+                INSERT INTO tmp_rbac_closure (descendent_id, ancestor_id) SELECT descendent_id, ancestor_id FROM closure
+            '''
+                % sql_params
+            )
+
+            # the roles whose stored ancestors are actually different
+            cursor.execute(
+                '''
+                INSERT INTO tmp_rbac_changed (id)
+                SELECT descendent_id
+                  FROM %(ancestors_table)s
+                 WHERE descendent_id IN (SELECT id FROM tmp_rbac_affected)
+                       AND NOT EXISTS (
+                           SELECT 1 FROM tmp_rbac_closure as closure
+                            WHERE closure.descendent_id = %(ancestors_table)s.descendent_id
+                                  AND closure.ancestor_id = %(ancestors_table)s.ancestor_id
+                       )
+
+                 UNION
+
+                SELECT descendent_id
+                  FROM tmp_rbac_closure as closure
+                 WHERE NOT EXISTS (
+                           SELECT 1 FROM %(ancestors_table)s
+                            WHERE %(ancestors_table)s.descendent_id = closure.descendent_id
+                                  AND %(ancestors_table)s.ancestor_id = closure.ancestor_id
+                       )
+            '''
+                % sql_params
+            )
+            cursor.execute('SELECT id FROM tmp_rbac_changed')
+            changed = [row[0] for row in cursor.fetchall()]
+
+            if changed:
+                cursor.execute(
+                    '''
+                    DELETE FROM %(ancestors_table)s
+                     WHERE descendent_id IN (SELECT id FROM tmp_rbac_changed)
+                           AND NOT EXISTS (
+                               SELECT 1 FROM tmp_rbac_closure as closure
+                                WHERE closure.descendent_id = %(ancestors_table)s.descendent_id
+                                      AND closure.ancestor_id = %(ancestors_table)s.ancestor_id
+                           )
+                '''
+                    % sql_params
+                )
+                cursor.execute(
+                    '''
+                    INSERT INTO %(ancestors_table)s (descendent_id, ancestor_id, role_field, content_type_id, object_id)
+                    SELECT closure.descendent_id,
+                           closure.ancestor_id,
+                           roles.role_field,
+                           COALESCE(roles.content_type_id, 0),
+                           COALESCE(roles.object_id, 0)
+                      FROM tmp_rbac_closure as closure
+                           INNER JOIN %(roles_table)s as roles
+                                   ON (roles.id = closure.descendent_id)
+                     WHERE closure.descendent_id IN (SELECT id FROM tmp_rbac_changed)
+                           AND NOT EXISTS (
+                               SELECT 1 FROM %(ancestors_table)s
+                                WHERE %(ancestors_table)s.descendent_id = closure.descendent_id
+                                      AND %(ancestors_table)s.ancestor_id = closure.ancestor_id
+                           )
+                '''
+                    % sql_params
+                )
+
+            AccessibleObject.invalidate_roles(changed)
+
+    @staticmethod
+    def verify_role_ancestor_list():
+        """
+        Compares the ancestors table with the ancestors computed from scratch
+        from the parents table, and returns the (descendent_id, ancestor_id)
+        pairs that are missing from it and those that should not be in it.
+        """
         sql_params = {
             'ancestors_table': Role.ancestors.through._meta.db_table,
             'parents_table': Role.parents.through._meta.db_table,
             'roles_table': Role._meta.db_table,
         }
+        closure = '''
+            WITH RECURSIVE closure(descendent_id, ancestor_id) AS (
+                SELECT id, id FROM %(roles_table)s
 
-        # SQLlite has a 1M sql statement limit.. since the django sqllite
-        # driver isn't letting us pass in the ids through the preferred
-        # parameter binding system, this function exists to obey this.
-        # est max 12 bytes per number, used up to 2 times in a query,
-        # minus 4k of padding for the other parts of the query, leads us
-        # to the magic number of 41496, or 40000 for a nice round number
-        def split_ids_for_sqlite(role_ids):
-            for i in range(0, len(role_ids), 40000):
-                yield role_ids[i : i + 40000]
+                UNION
 
-        with transaction.atomic():
-            while len(additions) > 0 or len(removals) > 0:
-                if loop_ct > 100:
-                    raise Exception('Role ancestry rebuilding error: infinite loop detected')
-                loop_ct += 1
-
-                delete_ct = 0
-                if len(removals) > 0:
-                    for ids in split_ids_for_sqlite(removals):
-                        sql_params['ids'] = ','.join(str(x) for x in ids)
-                        cursor.execute(
-                            '''
-                            DELETE FROM %(ancestors_table)s
-                            WHERE descendent_id IN (%(ids)s)
-                                  AND descendent_id != ancestor_id
-                                  AND NOT EXISTS (
-                                      SELECT 1
-                                        FROM %(parents_table)s as parents
-                                             INNER JOIN %(ancestors_table)s as inner_ancestors
-                                                     ON (parents.to_role_id = inner_ancestors.descendent_id)
-                                       WHERE parents.from_role_id = %(ancestors_table)s.descendent_id
-                                             AND %(ancestors_table)s.ancestor_id = inner_ancestors.ancestor_id
-                                  )
-                        '''
-                            % sql_params
-                        )
-
-                        delete_ct += cursor.rowcount
-
-                insert_ct = 0
-                if len(additions) > 0:
-                    for ids in split_ids_for_sqlite(additions):
-                        sql_params['ids'] = ','.join(str(x) for x in ids)
-                        cursor.execute(
-                            '''
-                            INSERT INTO %(ancestors_table)s (descendent_id, ancestor_id, role_field, content_type_id, object_id)
-                            SELECT from_id, to_id, new_ancestry_list.role_field, new_ancestry_list.content_type_id, new_ancestry_list.object_id FROM  (
-                                  SELECT roles.id from_id,
-                                         ancestors.ancestor_id to_id,
-                                         roles.role_field,
-                                         COALESCE(roles.content_type_id, 0) content_type_id,
-                                         COALESCE(roles.object_id, 0) object_id
-                                    FROM %(roles_table)s as roles
-                                         INNER JOIN %(parents_table)s as parents
-                                                 ON (parents.from_role_id = roles.id)
-                                         INNER JOIN %(ancestors_table)s as ancestors
-                                                 ON (parents.to_role_id = ancestors.descendent_id)
-                                   WHERE roles.id IN (%(ids)s)
-
-                                   UNION
-
-                                  SELECT id from_id,
-                                         id to_id,
-                                         role_field,
-                                         COALESCE(content_type_id, 0) content_type_id,
-                                         COALESCE(object_id, 0) object_id
-                                   from %(roles_table)s WHERE id IN (%(ids)s)
-                             ) new_ancestry_list
-                             WHERE NOT EXISTS (
-                                SELECT 1 FROM %(ancestors_table)s
-                                 WHERE %(ancestors_table)s.descendent_id = new_ancestry_list.from_id
-                                       AND %(ancestors_table)s.ancestor_id = new_ancestry_list.to_id
-                             )
-
-                        '''
-                            % sql_params
-                        )
-                        insert_ct += cursor.rowcount
-
-                if insert_ct == 0 and delete_ct == 0:
-                    break
-
-                new_additions = set()
-                for ids in split_ids_for_sqlite(additions):
-                    sql_params['ids'] = ','.join(str(x) for x in ids)
-                    # get all children for the roles we're operating on
-                    cursor.execute('SELECT DISTINCT from_role_id FROM %(parents_table)s WHERE to_role_id IN (%(ids)s)' % sql_params)
-                    new_additions.update([row[0] for row in cursor.fetchall()])
-                additions = list(new_additions)
-
-                new_removals = set()
-                for ids in split_ids_for_sqlite(removals):
-                    sql_params['ids'] = ','.join(str(x) for x in ids)
-                    # get all children for the roles we're operating on
-                    cursor.execute('SELECT DISTINCT from_role_id FROM %(parents_table)s WHERE to_role_id IN (%(ids)s)' % sql_params)
-                    new_removals.update([row[0] for row in cursor.fetchall()])
-                removals = list(new_removals)
+                SELECT closure.descendent_id, parents.to_role_id
+                  FROM closure
+                       INNER JOIN %(parents_table)s as parents
+                               ON (parents.from_role_id = closure.ancestor_id)
+            )
+        '''
+        with connection.cursor() as cursor:
+            cursor.execute(
+                (closure + 'SELECT descendent_id, ancestor_id FROM closure EXCEPT SELECT descendent_id, ancestor_id FROM %(ancestors_table)s') % sql_params
+            )
+            missing = cursor.fetchall()
+            cursor.execute(
+                (closure + 'SELECT descendent_id, ancestor_id FROM %(ancestors_table)s EXCEPT SELECT descendent_id, ancestor_id FROM closure') % sql_params
+            )
+            extra = cursor.fetchall()
+        return missing, extra
 
     @staticmethod
     def visible_roles(user):
@@ -460,6 +511,181 @@ class RoleAncestorEntry(models.Model):
     object_id = models.PositiveIntegerField(null=False)
 
 
+class AccessibleObjectsState(models.Model):
+    """
+    Tracks whether the AccessibleObject set of a user is up to date.
+    `generation` is bumped whenever a role change may affect the user, and
+    the set is current when `built_generation` matches it and it is not
+    older than AWX_ACCESSIBLE_OBJECTS_MAX_AGE, which bounds how long a set
+    built concurrently with a role change can stay stale.
+    """
+
+    class Meta:
+        app_label = 'main'
+        db_table = 'main_rbac_accessible_objects_state'
+
+    user = models.OneToOneField('auth.User', primary_key=True, on_delete=models.CASCADE, related_name='+')
+    generation = models.PositiveIntegerField(default=0)
+    built_generation = models.PositiveIntegerField(null=True, default=None)
+    built = models.DateTimeField(null=True, default=None)
+
+    def is_current(self):
+        if self.built_generation != self.generation or self.built is None:
+            return False
+        return now() - self.built < datetime.timedelta(seconds=settings.AWX_ACCESSIBLE_OBJECTS_MAX_AGE)
+
+
+class AccessibleObject(models.Model):
+    """
+    A materialized copy of the objects a user can access through the role
+    ancestry, for the role fields in MATERIALIZED_ROLE_FIELDS, so that list
+    views filter with a plain join instead of going through the user's roles
+    and RoleAncestorEntry with a DISTINCT.
+
+    Sets are built when first used and marked stale (see
+    AccessibleObjectsState) whenever the membership of one of the user's roles
+    or the ancestry of a role the user may hold changes, then rebuilt on
+    next use.
+    """
+
+    class Meta:
+        app_label = 'main'
+        db_table = 'main_rbac_accessible_objects'
+        unique_together = [("user", "content_type_id", "role_field", "object_id")]
+        index_together = [
+            ("content_type_id", "object_id", "role_field"),  # used by invalidate_roles
+        ]
+
+    user = models.ForeignKey('auth.User', null=False, on_delete=models.CASCADE, related_name='+', db_index=False)
+    role_field = models.TextField(null=False)
+    content_type_id = models.PositiveIntegerField(null=False)
+    object_id = models.PositiveIntegerField(null=False)
+
+    @staticmethod
+    def accessible_pk_qs(user, role_field, content_types):
+        """
+        Same result as ResourceMixin._accessible_pk_qs for a user, read from
+        the materialized set when possible.
+        """
+        if settings.AWX_MATERIALIZE_ACCESSIBLE_OBJECTS and role_field in MATERIALIZED_ROLE_FIELDS and AccessibleObject.build(user):
+            return AccessibleObject.objects.filter(user=user, role_field=role_field, content_type_id__in=content_types).values_list('object_id')
+        return (
+            RoleAncestorEntry.objects.filter(ancestor__in=user.roles.all(), role_field=role_field, content_type_id__in=content_types)
+            .values_list('object_id')
+            .distinct()
+        )
+
+    @staticmethod
+    def build(user):
+        """
+        Build the set of `user` if it is not current; returns False if it
+        could not be built right now.
+
+        This runs inside the transaction of the (often GET) request, so rows
+        that are still accessible are kept and missing ones are inserted
+        ignoring conflicts, and a request that finds another one of the same
+        user building the set does not wait for it to commit.
+        """
+        state, _ = AccessibleObjectsState.objects.get_or_create(user=user)
+        if state.is_current():
+            return True
+        sql_params = {
+            'accessible_table': AccessibleObject._meta.db_table,
+            'ancestors_table': RoleAncestorEntry._meta.db_table,
+            'members_table': Role.members.through._meta.db_table,
+            'role_fields': ','.join('%s' for role_field in MATERIALIZED_ROLE_FIELDS),
+        }
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                if connection.vendor == 'postgresql':
+                    # held until the request commits, like the rows written below
+                    cursor.execute('SELECT pg_try_advisory_xact_lock(%s, %s)', [ACCESSIBLE_OBJECTS_LOCK_ID, user.id])
+                    if not cursor.fetchone()[0]:
+                        logger.debug('Accessible objects of user {} are being built by another request'.format(user.id))
+                        return False
+                cursor.execute(
+                    '''
+                    DELETE FROM %(accessible_table)s
+                     WHERE user_id = %%s
+                           AND NOT EXISTS (
+                               SELECT 1
+                                 FROM %(ancestors_table)s as ancestors
+                                      INNER JOIN %(members_table)s as members
+                                              ON (members.role_id = ancestors.ancestor_id)
+                                WHERE members.user_id = %(accessible_table)s.user_id
+                                      AND ancestors.content_type_id = %(accessible_table)s.content_type_id
+                                      AND ancestors.object_id = %(accessible_table)s.object_id
+                                      AND ancestors.role_field = %(accessible_table)s.role_field
+                           )
+                '''
+                    % sql_params,
+                    [user.id],
+                )
+                cursor.execute(
+                    '''
+                    INSERT INTO %(accessible_table)s (user_id, role_field, content_type_id, object_id)
+                    SELECT DISTINCT members.user_id, ancestors.role_field, ancestors.content_type_id, ancestors.object_id
+                      FROM %(ancestors_table)s as ancestors
+                           INNER JOIN %(members_table)s as members
+                                   ON (members.role_id = ancestors.ancestor_id)
+                     WHERE members.user_id = %%s
+                           AND ancestors.role_field IN (%(role_fields)s)
+                    ON CONFLICT DO NOTHING
+                '''
+                    % sql_params,
+                    [user.id] + list(MATERIALIZED_ROLE_FIELDS),
+                )
+            # if the set was invalidated meanwhile it stays stale, and is rebuilt on next use
+            AccessibleObjectsState.objects.filter(user=user, generation=state.generation).update(built_generation=state.generation, built=now())
+        return True
+
+    @staticmethod
+    def tables_exist():
+        # role changes made by migrations that run before these tables are created
+        global accessible_objects_tables_exist
+        if not accessible_objects_tables_exist:
+            accessible_objects_tables_exist = AccessibleObjectsState._meta.db_table in connection.introspection.table_names()
+        return accessible_objects_tables_exist
+
+    @staticmethod
+    def invalidate_users(user_ids):
+        if user_ids and AccessibleObject.tables_exist():
+            AccessibleObjectsState.objects.filter(user_id__in=user_ids).update(generation=F('generation') + 1)
+
+    @staticmethod
+    def invalidate_roles(role_ids):
+        """
+        Mark stale the sets of every user that may have gained access through
+        `role_ids` (members of their ancestors) or lost it (users with one of
+        their objects in their set).
+        """
+        if not role_ids or not AccessibleObject.tables_exist():
+            return
+        role_ids = list(role_ids)
+        gained = Role.members.through.objects.filter(role_id__in=RoleAncestorEntry.objects.filter(descendent_id__in=role_ids).values('ancestor_id'))
+        # start from the touched roles, few of them are materialized
+        lost = RawSQL(
+            '''
+            SELECT accessible.user_id
+              FROM %(roles_table)s as roles
+                   INNER JOIN %(accessible_table)s as accessible
+                           ON (accessible.content_type_id = roles.content_type_id
+                               AND accessible.object_id = roles.object_id
+                               AND accessible.role_field = roles.role_field)
+             WHERE roles.id IN (%(role_ids)s)
+                   AND roles.role_field IN (%(role_fields)s)
+        '''
+            % {
+                'roles_table': Role._meta.db_table,
+                'accessible_table': AccessibleObject._meta.db_table,
+                'role_ids': ','.join('%s' for role_id in role_ids),
+                'role_fields': ','.join('%s' for role_field in MATERIALIZED_ROLE_FIELDS),
+            },
+            role_ids + list(MATERIALIZED_ROLE_FIELDS),
+        )
+        AccessibleObjectsState.objects.filter(Q(user_id__in=gained.values('user_id')) | Q(user_id__in=lost)).update(generation=F('generation') + 1)
+
+
 def get_roles_on_resource(resource, accessor):
     """
     Returns a string list of the roles a accessor has for a given resource.
@@ -34,8 +34,10 @@ from polymorphic.models import PolymorphicModel
 from awx.main.models.base import CommonModelNameNotUnique, PasswordFieldsModel, NotificationFieldsModel, prevent_search
 from awx.main.dispatch import get_local_queuename
 from awx.main.dispatch.control import Control as ControlDispatcher
+from awx.main.dispatch.cancel import notify_cancel
 from awx.main.registrar import activity_stream_registrar
 from awx.main.models.mixins import ResourceMixin, TaskManagerUnifiedJobMixin, ExecutionEnvironmentMixin
+from awx.main.models.rbac import AccessibleObject
 from awx.main.utils import (
     camelcase_to_underscore,
     get_model_for_type,
@@ -210,6 +212,12 @@ class UnifiedJobTemplate(PolymorphicModel, CommonModelNameNotUnique, ExecutionEn
             return super(UnifiedJobTemplate, cls).accessible_pk_qs(accessor, role_field)
         return ResourceMixin._accessible_pk_qs(cls, accessor, role_field, content_types=cls._submodels_with_roles())
 
+    @classmethod
+    def materialized_accessible_pk_qs(cls, user, role_field):
+        if cls != UnifiedJobTemplate:
+            return super(UnifiedJobTemplate, cls).materialized_accessible_pk_qs(user, role_field)
+        return AccessibleObject.accessible_pk_qs(user, role_field, cls._submodels_with_roles())
+
     def _perform_unique_checks(self, unique_checks):
         # Handle the list of unique fields returned above. Replace with an
         # appropriate error message for the remaining field(s) in the unique
@@ -1413,6 +1421,8 @@ class UnifiedJob(
                     self.job_explanation = job_explanation
                     cancel_fields.append('job_explanation')
                 self.save(update_fields=cancel_fields)
+                if self.status == 'running':
+                    notify_cancel(self)
                 self.websocket_emit_status("canceled")
         return self.cancel_flag
 
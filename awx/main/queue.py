@@ -4,6 +4,9 @@
 # Python
 import json
 import logging
+import threading
+import time
+
 import redis
 
 # Django
@@ -24,11 +27,63 @@ class AnsibleJSONEncoder(json.JSONEncoder):
 
 
 class CallbackQueueDispatcher(object):
+    """
+    Publishes job events to the callback receiver.
+
+    Events are buffered and pushed to redis with a single RPUSH, once
+    CALLBACK_QUEUE_BATCH_SIZE events are waiting or the oldest of them is
+    CALLBACK_QUEUE_BATCH_MAX_AGE seconds old, whichever comes first.  Events
+    that finish a run (EOF and playbook_on_stats) are always pushed right
+    away, together with everything buffered before them, so the callback
+    receiver sees events in the order they were dispatched.
+    """
+
+    FINAL_EVENTS = ('EOF', 'playbook_on_stats')
+
     def __init__(self):
         self.queue = getattr(settings, 'CALLBACK_QUEUE', '')
         self.logger = logging.getLogger('awx.main.queue.CallbackQueueDispatcher')
         self.connection = redis.Redis.from_url(settings.BROKER_URL)
         self.subsystem_metrics = s_metrics.Metrics()
+        self.batch_size = getattr(settings, 'CALLBACK_QUEUE_BATCH_SIZE', 1)
+        self.max_age = getattr(settings, 'CALLBACK_QUEUE_BATCH_MAX_AGE', 0)
+        self.buffer = []
+        self.buffer_started = None
+        self.lock = threading.Lock()
+        self.timer = None
 
     def dispatch(self, obj):
-        self.connection.rpush(self.queue, json.dumps(obj, cls=AnsibleJSONEncoder))
+        message = json.dumps(obj, cls=AnsibleJSONEncoder)
+        with self.lock:
+            self.buffer.append(message)
+            if self.buffer_started is None:
+                self.buffer_started = time.monotonic()
+            if obj.get('event') in self.FINAL_EVENTS or len(self.buffer) >= self.batch_size or time.monotonic() - self.buffer_started >= self.max_age:
+                self._flush()
+            elif self.timer is None:
+                # make sure buffered events are not held back when the next
+                # event is a long time coming (e.g., a long running task)
+                self.timer = threading.Timer(self.max_age, self._flush_later)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        # must be called with the lock held; on failure the events stay
+        # buffered and are retried by the next flush
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if self.buffer:
+            self.connection.rpush(self.queue, *self.buffer)
+            self.buffer = []
+            self.buffer_started = None
+
+    def _flush_later(self):
+        try:
+            self.flush()
+        except Exception:
+            self.logger.exception('Failed to publish {} buffered events'.format(len(self.buffer)))
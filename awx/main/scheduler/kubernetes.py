@@ -1,6 +1,9 @@
 import collections
 import json
 import logging
+import tempfile
+import threading
+import time
 from base64 import b64encode
 from urllib import parse as urlparse
 
@@ -40,19 +43,11 @@ class PodManager(object):
     def list_active_jobs(self, instance_group):
         task = collections.namedtuple('Task', 'id instance_group')(id='', instance_group=instance_group)
         pm = PodManager(task)
-        pods = {}
         try:
-            for pod in pm.kube_api.list_namespaced_pod(pm.namespace, label_selector='ansible-awx={}'.format(settings.INSTALL_UUID)).to_dict().get('items', []):
-                job = pod['metadata'].get('labels', {}).get('ansible-awx-job-id')
-                if job:
-                    try:
-                        pods[int(job)] = pod['metadata']['name']
-                    except ValueError:
-                        pass
+            return pod_index.active_jobs(pm)
         except Exception:
             logger.exception('Failed to list pods for container group {}'.format(instance_group))
-
-        return pods
+            return {}
 
     def create_secret(self, job):
         registry_cred = job.execution_environment.credential
@@ -158,19 +153,7 @@ class PodManager(object):
 
     @cached_property
     def kube_api(self):
-        # this feels a little janky, but it's what k8s' own code does
-        # internally when it reads kube config files from disk:
-        # https://github.com/kubernetes-client/python-base/blob/0b208334ef0247aad9afcaae8003954423b61a0d/config/kube_config.py#L643
-        if self.credential:
-            loader = config.kube_config.KubeConfigLoader(config_dict=self.kube_config)
-            cfg = type.__call__(client.Configuration)
-            loader.load_and_set(cfg)
-            api = client.CoreV1Api(api_client=client.ApiClient(configuration=cfg))
-        else:
-            config.load_incluster_config()
-            api = client.CoreV1Api()
-
-        return api
+        return pod_index.api(self)
 
     @property
     def pod_name(self):
@@ -194,6 +177,109 @@ class PodManager(object):
         return pod_spec
 
 
+class PodIndex(object):
+    """
+    Process-wide cache of Kubernetes API clients, one per container group
+    credential (or in-cluster authentication), and of the job pods of this
+    installation in each namespace they are used with.  Container groups
+    sharing a credential and namespace share one pod listing, refreshed at
+    most every AWX_CONTAINER_GROUP_POD_INDEX_TTL seconds; API clients are
+    rebuilt when their credential is modified.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.clients = {}
+        self.pods = {}
+
+    def clear(self):
+        with self.lock:
+            self.clients.clear()
+            self.pods.clear()
+
+    @staticmethod
+    def credential_key(pod_manager):
+        credential = pod_manager.credential
+        if credential is None:
+            return (None, None)
+        return (credential.pk, credential.modified)
+
+    def build_api(self, pod_manager):
+        # this feels a little janky, but it's what k8s' own code does
+        # internally when it reads kube config files from disk:
+        # https://github.com/kubernetes-client/python-base/blob/0b208334ef0247aad9afcaae8003954423b61a0d/config/kube_config.py#L643
+        if pod_manager.credential:
+            loader = config.kube_config.KubeConfigLoader(config_dict=pod_manager.kube_config)
+            cfg = type.__call__(client.Configuration)
+            loader.load_and_set(cfg)
+            ca_file = None
+            if cfg.ssl_ca_cert:
+                # the dispatcher removes the k8s client's temporary files after
+                # every task, keep a copy for as long as the client is cached
+                ca_file = tempfile.NamedTemporaryFile(prefix='awx_k8s_ca_')
+                with open(cfg.ssl_ca_cert, 'rb') as f:
+                    ca_file.write(f.read())
+                ca_file.flush()
+                cfg.ssl_ca_cert = ca_file.name
+            return client.CoreV1Api(api_client=client.ApiClient(configuration=cfg)), ca_file
+        else:
+            config.load_incluster_config()
+            return client.CoreV1Api(), None
+
+    def api(self, pod_manager):
+        pk, modified = self.credential_key(pod_manager)
+        with self.lock:
+            entry = self.clients.get(pk)
+            if entry is None or entry[0] != modified:
+                entry = self.clients[pk] = (modified,) + self.build_api(pod_manager)
+            return entry[1]
+
+    def active_jobs(self, pod_manager):
+        """
+        Returns {job id: pod name} for the job pods in the namespace of
+        `pod_manager`'s container group.
+        """
+        key = self.credential_key(pod_manager) + (pod_manager.namespace,)
+        with self.lock:
+            entry = self.pods.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return dict(entry[1])
+
+        pods = {}
+        response = self.api(pod_manager).list_namespaced_pod(
+            pod_manager.namespace,
+            label_selector='ansible-awx={}'.format(settings.INSTALL_UUID),
+            _request_timeout=settings.AWX_CONTAINER_GROUP_K8S_API_TIMEOUT,
+        )
+        for pod in response.to_dict().get('items', []):
+            job = pod['metadata'].get('labels', {}).get('ansible-awx-job-id')
+            if job:
+                try:
+                    pods[int(job)] = pod['metadata']['name']
+                except ValueError:
+                    pass
+
+        now = time.monotonic()
+        with self.lock:
+            for k in [k for k, (expires, _) in self.pods.items() if expires <= now]:
+                del self.pods[k]
+            self.pods[key] = (now + settings.AWX_CONTAINER_GROUP_POD_INDEX_TTL, pods)
+        return dict(pods)
+
+    def discard(self, pod_manager, job_id):
+        """
+        Forgets the pod of `job_id`, once it has been deleted.
+        """
+        key = self.credential_key(pod_manager) + (pod_manager.namespace,)
+        with self.lock:
+            entry = self.pods.get(key)
+            if entry is not None:
+                entry[1].pop(job_id, None)
+
+
+pod_index = PodIndex()
+
+
 def generate_tmp_kube_config(credential, namespace):
     host_input = credential.get_input('host')
     config = {
@@ -19,6 +19,7 @@ from django.db.models import Q
 from awx.main.dispatch.reaper import reap_job
 from awx.main.models import (
     AdHocCommand,
+    CapacityLedger,
     Instance,
     InstanceGroup,
     InventorySource,
@@ -38,6 +39,7 @@ from awx.main.utils import get_type_for_model, task_manager_bulk_reschedule, sch
 from awx.main.utils.common import create_partition
 from awx.main.signals import disable_activity_stream
 from awx.main.scheduler.dependency_graph import DependencyGraph
+from awx.main.scheduler.task_resolver import TaskResolver
 from awx.main.utils import decrypt_field
 
 
@@ -69,7 +71,7 @@ class TaskManager:
         """
         Init AFTER we know this instance of the task manager will run because the lock is acquired.
         """
-        instances = Instance.objects.filter(~Q(hostname=None), enabled=True)
+        instances = CapacityLedger().attach(list(Instance.objects.filter(~Q(hostname=None), enabled=True)))
         self.real_instances = {i.hostname: i for i in instances}
 
         instances_partial = [
@@ -280,7 +282,7 @@ class TaskManager:
                 task.instance_group = rampart_group
                 if match is None:
                     logger.warn('No available capacity to run containerized <{}>.'.format(task.log_format))
-                elif task.can_run_containerized and any(ig.is_container_group for ig in task.preferred_instance_groups):
+                elif task.can_run_containerized and any(ig.is_container_group for ig in self.resolver.preferred_instance_groups(task)):
                     task.controller_node = match.hostname
                 else:
                     # project updates and inventory updates don't *actually* run in pods, so
@@ -473,7 +475,7 @@ class TaskManager:
                         task.job_explanation = job_explanation
                         tasks_to_update_job_explanation.append(task)
                 continue
-            preferred_instance_groups = task.preferred_instance_groups
+            preferred_instance_groups = self.resolver.preferred_instance_groups(task)
 
             found_acceptable_queue = False
             if isinstance(task, WorkflowJob):
@@ -602,6 +604,7 @@ class TaskManager:
     def _schedule(self):
         finished_wfjs = []
         all_sorted_tasks = self.get_tasks()
+        self.resolver = TaskResolver(all_sorted_tasks)
 
         self.after_lock_init()
 
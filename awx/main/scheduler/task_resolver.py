@@ -0,0 +1,66 @@
+from collections import defaultdict
+
+from awx.main.models import Job
+from awx.main.models.ha import (
+    InventoryInstanceGroupMembership,
+    OrganizationInstanceGroupMembership,
+    UnifiedJobTemplateInstanceGroupMembership,
+)
+
+
+class TaskResolver(object):
+    """
+    Answers the questions the task manager asks about every task on every
+    cycle (preferred instance groups and task impact) for a whole list of
+    tasks at once.
+
+    Instance group assignments for every job template, inventory and
+    organization referenced by the jobs are loaded with one query each, and the
+    result is memoized per (job template, inventory, organization).  The
+    inventory of each job is loaded in bulk so that `Job.task_impact` does not
+    have to fetch it.
+
+    A resolver is only meant to live for a single task manager cycle; changes
+    to instance group assignments are picked up by the next cycle.
+    """
+
+    def __init__(self, tasks):
+        jobs = [t for t in tasks if type(t) is Job]
+
+        self.template_groups = self._load_groups(UnifiedJobTemplateInstanceGroupMembership, 'unifiedjobtemplate_id', {j.job_template_id for j in jobs})
+        self.inventory_groups = self._load_groups(InventoryInstanceGroupMembership, 'inventory_id', {j.inventory_id for j in jobs})
+        self.organization_groups = self._load_groups(OrganizationInstanceGroupMembership, 'organization_id', {j.organization_id for j in jobs})
+        self._global_instance_groups = None
+        self._preferred = dict()
+
+        Job.prefetch_inventories(jobs)
+
+    @staticmethod
+    def _load_groups(membership_model, key, ids):
+        ids.discard(None)
+        groups = defaultdict(list)
+        if ids:
+            memberships = membership_model.objects.filter(**{'{}__in'.format(key): ids}).select_related('instancegroup').order_by(key, 'position')
+            for membership in memberships:
+                groups[getattr(membership, key)].append(membership.instancegroup)
+        return groups
+
+    def global_instance_groups(self, task):
+        if self._global_instance_groups is None:
+            self._global_instance_groups = task.global_instance_groups
+        return self._global_instance_groups
+
+    def preferred_instance_groups(self, task):
+        """
+        Same as `task.preferred_instance_groups`, without the per-task queries
+        for jobs.
+        """
+        if type(task) is not Job:
+            return task.preferred_instance_groups
+        key = (task.job_template_id, task.inventory_id, task.organization_id)
+        if key not in self._preferred:
+            selected_groups = self.template_groups.get(key[0], []) + self.inventory_groups.get(key[1], []) + self.organization_groups.get(key[2], [])
+            if not selected_groups:
+                selected_groups = self.global_instance_groups(task)
+            self._preferred[key] = selected_groups
+        return self._preferred[key]
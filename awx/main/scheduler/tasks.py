@@ -9,7 +9,7 @@ from awx.main.dispatch import get_local_queuename
 logger = logging.getLogger('awx.main.scheduler')
 
 
-@task(queue=get_local_queuename)
+@task(queue=get_local_queuename, coalesce=True)
 def run_task_manager():
     logger.debug("Running task manager.")
     TaskManager().schedule()
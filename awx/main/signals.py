@@ -30,6 +30,7 @@ from crum.signals import current_user_getter
 
 # AWX
 from awx.main.models import (
+    AccessibleObject,
     ActivityStream,
     ExecutionEnvironment,
     Group,
@@ -157,6 +158,18 @@ def sync_rbac_to_superuser_status(instance, sender, **kwargs):
                 user.save(update_fields=['is_superuser'])
 
 
+def invalidate_accessible_objects(instance, sender, **kwargs):
+    'When role membership changes, mark the materialized accessible objects of the affected users stale'
+    action = kwargs['action']
+    if hasattr(instance, 'singleton_name'):  # duck typing, role.members.add() vs user.roles.add()
+        if action in ['post_add', 'post_remove']:
+            AccessibleObject.invalidate_users(kwargs['pk_set'])
+        elif action == 'pre_clear':
+            AccessibleObject.invalidate_users(list(instance.members.values_list('id', flat=True)))
+    elif action in ['post_add', 'post_remove', 'post_clear']:
+        AccessibleObject.invalidate_users([instance.id])
+
+
 def rbac_activity_stream(instance, sender, **kwargs):
     # Only if we are associating/disassociating
     if kwargs['action'] in ['pre_add', 'pre_remove']:
@@ -235,6 +248,7 @@ m2m_changed.connect(rbac_activity_stream, Role.members.through)
 m2m_changed.connect(rbac_activity_stream, Role.parents.through)
 post_save.connect(sync_superuser_status_to_rbac, sender=User)
 m2m_changed.connect(sync_rbac_to_superuser_status, Role.members.through)
+m2m_changed.connect(invalidate_accessible_objects, Role.members.through)
 pre_delete.connect(cleanup_detached_labels_on_deleted_parent, sender=UnifiedJob)
 pre_delete.connect(cleanup_detached_labels_on_deleted_parent, sender=UnifiedJobTemplate)
 
@@ -349,6 +363,100 @@ def disable_activity_stream():
         activity_stream_enabled.enabled = previous_value
 
 
+class ActivityStreamBuffer(threading.local):
+    def __init__(self):
+        self.depth = 0
+        self.entries = []
+
+
+activity_stream_buffer = ActivityStreamBuffer()
+
+
+@contextlib.contextmanager
+def buffer_activity_stream():
+    """
+    Context manager to collect the activity stream entries recorded inside
+    it and write them in bulk when the outermost block exits, or whenever
+    ACTIVITY_STREAM_BUFFER_SIZE of them are held.  Use it inside the
+    transaction making the changes, so that the entries are committed (or
+    rolled back) with them.
+    """
+    activity_stream_buffer.depth += 1
+    try:
+        yield
+    except BaseException:
+        if activity_stream_buffer.depth == 1:
+            activity_stream_buffer.entries = []
+        raise
+    finally:
+        activity_stream_buffer.depth -= 1
+    if activity_stream_buffer.depth == 0:
+        flush_activity_stream_buffer()
+
+
+def flush_activity_stream_buffer():
+    entries, activity_stream_buffer.entries = activity_stream_buffer.entries, []
+    if connection.in_atomic_block and connection.needs_rollback:
+        return  # the changes they describe are rolled back too
+    # objects may have been deleted since their entries were recorded
+    write_activity_stream_entries(entries, check_related=True)
+
+
+def record_activity_stream_entries(entries):
+    """
+    Writes activity stream entries, or buffers them until the enclosing
+    buffer_activity_stream() block exits.  `entries` is a list of
+    (activity_entry, related) where related is a list of
+    (many to many field name, pk) to add to the entry.
+    """
+    if activity_stream_buffer.depth:
+        activity_stream_buffer.entries.extend(entries)
+        if len(activity_stream_buffer.entries) >= settings.ACTIVITY_STREAM_BUFFER_SIZE:
+            # e.g., large inventory imports
+            flush_activity_stream_buffer()
+    else:
+        write_activity_stream_entries(entries)
+
+
+def can_bulk_create_activity_stream(model):
+    # historical models during migrations, and databases that do not return
+    # the primary keys of bulk inserted rows, cannot
+    return hasattr(model, 'set_denormalized_fields') and connection.features.can_return_ids_from_bulk_insert
+
+
+def write_activity_stream_entries(entries, check_related=False):
+    if not entries:
+        return
+    batch_size = settings.ACTIVITY_STREAM_BUFFER_SIZE
+    activity_entries = [activity_entry for activity_entry, related in entries]
+    model = type(activity_entries[0])
+    if can_bulk_create_activity_stream(model):
+        for activity_entry in activity_entries:
+            activity_entry.set_denormalized_fields()
+        model.objects.bulk_create(activity_entries, batch_size=batch_size)
+    else:
+        for activity_entry in activity_entries:
+            activity_entry.save()
+
+    rows = {}
+    for activity_entry, related in entries:
+        for name, pk in related:
+            rows.setdefault(name, set()).add((activity_entry.pk, pk))
+    for name, pairs in rows.items():
+        field = model._meta.get_field(name)
+        through = field.remote_field.through
+        if check_related:
+            pks = list(set(pk for entry_pk, pk in pairs))
+            existing = set()
+            for i in range(0, len(pks), batch_size):
+                existing.update(field.related_model._base_manager.filter(pk__in=pks[i : i + batch_size]).values_list('pk', flat=True))
+            pairs = [(entry_pk, pk) for entry_pk, pk in pairs if pk in existing]
+        source, target = field.m2m_field_name() + '_id', field.m2m_reverse_field_name() + '_id'
+        through.objects.bulk_create([through(**{source: entry_pk, target: pk}) for entry_pk, pk in sorted(pairs)], batch_size=batch_size)
+
+    connection.on_commit(lambda: emit_activity_stream_changes(activity_entries))
+
+
 @contextlib.contextmanager
 def disable_computed_fields():
     post_save.disconnect(emit_update_inventory_on_created_or_deleted, sender=Host)
@@ -426,6 +534,11 @@ def emit_activity_stream_change(instance):
     )
 
 
+def emit_activity_stream_changes(instances):
+    for instance in instances:
+        emit_activity_stream_change(instance)
+
+
 def activity_stream_create(sender, instance, created, **kwargs):
     if created and activity_stream_enabled:
         _type = type(instance)
@@ -446,12 +559,10 @@ def activity_stream_create(sender, instance, created, **kwargs):
         #      it might actually be a good idea to remove all of these FK references since
         #      we don't really use them anyway.
         if instance._meta.model_name != 'setting':  # Is not conf.Setting instance
-            activity_entry.save()
-            getattr(activity_entry, object1).add(instance.pk)
+            record_activity_stream_entries([(activity_entry, [(object1, instance.pk)])])
         else:
             activity_entry.setting = conf_to_dict(instance)
-            activity_entry.save()
-        connection.on_commit(lambda: emit_activity_stream_change(activity_entry))
+            record_activity_stream_entries([(activity_entry, [])])
 
 
 def activity_stream_update(sender, instance, **kwargs):
@@ -474,12 +585,10 @@ def activity_stream_update(sender, instance, **kwargs):
     object1 = camelcase_to_underscore(instance.__class__.__name__)
     activity_entry = get_activity_stream_class()(operation='update', object1=object1, changes=json.dumps(changes), actor=get_current_user_or_none())
     if instance._meta.model_name != 'setting':  # Is not conf.Setting instance
-        activity_entry.save()
-        getattr(activity_entry, object1).add(instance.pk)
+        record_activity_stream_entries([(activity_entry, [(object1, instance.pk)])])
     else:
         activity_entry.setting = conf_to_dict(instance)
-        activity_entry.save()
-    connection.on_commit(lambda: emit_activity_stream_change(activity_entry))
+        record_activity_stream_entries([(activity_entry, [])])
 
 
 def activity_stream_delete(sender, instance, **kwargs):
@@ -505,8 +614,7 @@ def activity_stream_delete(sender, instance, **kwargs):
     if type(instance) == OAuth2AccessToken:
         changes['token'] = CENSOR_VALUE
     activity_entry = get_activity_stream_class()(operation='delete', changes=json.dumps(changes), object1=object1, actor=get_current_user_or_none())
-    activity_entry.save()
-    connection.on_commit(lambda: emit_activity_stream_change(activity_entry))
+    record_activity_stream_entries([(activity_entry, [])])
 
 
 def activity_stream_associate(sender, instance, **kwargs):
@@ -526,13 +634,18 @@ def activity_stream_associate(sender, instance, **kwargs):
         object1 = camelcase_to_underscore(obj1.__class__.__name__)
         obj_rel = sender.__module__ + "." + sender.__name__
 
-        for entity_acted in kwargs['pk_set']:
-            obj2 = kwargs['model']
-            obj2_id = entity_acted
-            obj2_actual = obj2.objects.filter(id=obj2_id)
-            if not obj2_actual.exists():
-                continue
-            obj2_actual = obj2_actual[0]
+        obj2 = kwargs['model']
+        objects2 = obj2.objects.filter(id__in=kwargs['pk_set']).order_by('id')
+        if issubclass(obj2, Role):
+            objects2 = objects2.prefetch_related('content_object')
+        actor = get_current_user_or_none()
+        role = kwargs.get('role')
+        if role is not None and role.content_object is not None:
+            obj_rel = '.'.join([role.content_object.__module__, role.content_object.__class__.__name__, role.role_field])
+
+        entries = []
+        for obj2_actual in objects2:
+            obj2_id = obj2_actual.id
             _type = type(obj2_actual)
             if getattr(_type, '_deferred', False):
                 return
@@ -549,32 +662,33 @@ def activity_stream_associate(sender, instance, **kwargs):
             if isinstance(obj1, SystemJob) or isinstance(obj2_actual, SystemJob):
                 continue
             activity_entry = get_activity_stream_class()(
-                changes=json.dumps(dict(object1=object1, object1_pk=obj1.pk, object2=object2, object2_pk=obj2_id, action=action, relationship=obj_rel)),
+                changes=json.dumps(
+                    dict(
+                        object1=object1,
+                        object1_pk=obj1.pk,
+                        object2=object2,
+                        object2_pk=obj2_id,
+                        action=action,
+                        relationship=sender.__module__ + "." + sender.__name__,
+                    )
+                ),
                 operation=action,
                 object1=object1,
                 object2=object2,
                 object_relationship_type=obj_rel,
-                actor=get_current_user_or_none(),
+                actor=actor,
             )
-            activity_entry.save()
-            getattr(activity_entry, object1).add(obj1.pk)
-            getattr(activity_entry, object2).add(obj2_actual.pk)
+            related = [(object1, obj1.pk), (object2, obj2_actual.pk)]
 
             # Record the role for RBAC changes
-            if 'role' in kwargs:
-                role = kwargs['role']
-                if role.content_object is not None:
-                    obj_rel = '.'.join([role.content_object.__module__, role.content_object.__class__.__name__, role.role_field])
-
+            if role is not None:
                 # If the m2m is from the User side we need to
                 # set the content_object of the Role for our entry.
                 if type(instance) == User and role.content_object is not None:
-                    getattr(activity_entry, role.content_type.name.replace(' ', '_')).add(role.content_object)
-
-                activity_entry.role.add(role)
-                activity_entry.object_relationship_type = obj_rel
-                activity_entry.save()
-            connection.on_commit(lambda: emit_activity_stream_change(activity_entry))
+                    related.append((role.content_type.name.replace(' ', '_'), role.content_object.pk))
+                related.append(('role', role.pk))
+            entries.append((activity_entry, related))
+        record_activity_stream_entries(entries)
 
 
 @receiver(current_user_getter)
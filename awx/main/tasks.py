@@ -61,6 +61,7 @@ from awx.main.constants import PRIVILEGE_ESCALATION_METHODS, STANDARD_INVENTORY_
 from awx.main.access import access_registry
 from awx.main.redact import UriCleaner
 from awx.main.models import (
+    DashboardRollup,
     Schedule,
     TowerScheduleState,
     Instance,
@@ -87,6 +88,7 @@ from awx.main.exceptions import AwxTaskError, PostRunError
 from awx.main.queue import CallbackQueueDispatcher
 from awx.main.dispatch.publish import task
 from awx.main.dispatch import get_local_queuename, reaper
+from awx.main.dispatch.cancel import cancel_listener
 from awx.main.utils.common import (
     update_scm_url,
     ignore_inventory_computed_fields,
@@ -105,6 +107,7 @@ from awx.main.utils.external_logging import reconfigure_rsyslog
 from awx.main.utils.safe_yaml import safe_dump, sanitize_jinja
 from awx.main.utils.reload import stop_local_services
 from awx.main.utils.pglock import advisory_lock
+from awx.main.utils.checkouts import CheckoutStore, TreeCopier
 from awx.main.utils.handlers import SpecialInventoryHandler
 from awx.main.consumers import emit_channel_notification
 from awx.main import analytics
@@ -316,6 +319,10 @@ def delete_project_files(project_path):
             logger.debug('Success removing {}'.format(lock_file))
         except Exception:
             logger.exception('Could not remove lock file {}'.format(lock_file))
+    try:
+        CheckoutStore().evict(os.path.basename(os.path.normpath(project_path)))
+    except Exception:
+        logger.exception('Could not remove stored checkouts of {}'.format(project_path))
 
 
 @task(queue='tower_broadcast_all')
@@ -500,7 +507,7 @@ def awx_k8s_reaper():
     if not settings.RECEPTOR_RELEASE_WORK:
         return
 
-    from awx.main.scheduler.kubernetes import PodManager  # prevent circular import
+    from awx.main.scheduler.kubernetes import PodManager, pod_index  # prevent circular import
 
     for group in InstanceGroup.objects.filter(is_container_group=True).iterator():
         logger.debug("Checking for orphaned k8s pods for {}.".format(group))
@@ -510,6 +517,7 @@ def awx_k8s_reaper():
             try:
                 pm = PodManager(job)
                 pm.kube_api.delete_namespaced_pod(name=pods[job.id], namespace=pm.namespace, _request_timeout=settings.AWX_CONTAINER_GROUP_K8S_API_TIMEOUT)
+                pod_index.discard(pm, job.id)
             except Exception:
                 logger.exception("Failed to delete orphaned pod {} from {}".format(job.log_format, group))
 
@@ -648,7 +656,7 @@ def handle_success_and_failure_notifications(job_id):
     logger.warn(f"Failed to even try to send notifications for job '{uj}' due to job not being in finished state.")
 
 
-@task(queue=get_local_queuename)
+@task(queue=get_local_queuename, coalesce=True)
 def update_inventory_computed_fields(inventory_id):
     """
     Signal handler and wrapper around inventory.update_computed_fields to
@@ -689,7 +697,7 @@ def update_smart_memberships_for_inventory(smart_inventory):
     return False
 
 
-@task(queue=get_local_queuename)
+@task(queue=get_local_queuename, coalesce=True)
 def update_host_smart_inventory_memberships():
     smart_inventories = Inventory.objects.filter(kind='smart', host_filter__isnull=False, pending_deletion=False)
     changed_inventories = set([])
@@ -705,6 +713,15 @@ def update_host_smart_inventory_memberships():
         smart_inventory.update_computed_fields()
 
 
+@task(queue=get_local_queuename, coalesce=True)
+def refresh_dashboard_rollups():
+    with advisory_lock('dashboard_rollup_refresh', wait=False) as acquired:
+        if acquired is False:
+            logger.debug('Dashboard rollups are already being refreshed')
+            return
+        DashboardRollup.refresh()
+
+
 @task(queue=get_local_queuename)
 def delete_inventory(inventory_id, user_id, retries=5):
     # Delete inventory as user
@@ -768,6 +785,7 @@ class BaseTask(object):
         self.guid = GuidMiddleware.get_guid()
         self.job_created = None
         self.recent_event_timings = deque(maxlen=settings.MAX_WEBSOCKET_EVENT_RATE)
+        self.dispatcher = None
 
     def update_model(self, pk, _attempt=0, **updates):
         """Reload the model instance from the database and update the
@@ -1437,6 +1455,13 @@ class BaseTask(object):
         except Exception:
             logger.exception('{} Post run hook errored.'.format(self.instance.log_format))
 
+        if self.dispatcher is not None:
+            # events are published in batches, make sure nothing is left behind
+            try:
+                self.dispatcher.flush()
+            except Exception:
+                logger.exception('{} Failed to publish buffered events.'.format(self.instance.log_format))
+
         self.instance = self.update_model(pk)
         self.instance = self.update_model(pk, status=status, emitted_events=self.event_ct, **extra_update_fields)
 
@@ -2224,31 +2249,26 @@ class RunProjectUpdate(BaseTask):
 
         if p.scm_type == 'git':
             git_repo = git.Repo(project_path)
-            if not os.path.exists(destination_folder):
-                os.mkdir(destination_folder, stat.S_IREAD | stat.S_IWRITE | stat.S_IEXEC)
-            tmp_branch_name = 'awx_internal/{}'.format(uuid4())
             # always clone based on specific job revision
             if not p.scm_revision:
                 raise RuntimeError('Unexpectedly could not determine a revision to run from project.')
-            source_branch = git_repo.create_head(tmp_branch_name, p.scm_revision)
-            # git clone must take file:// syntax for source repo or else options like depth will be ignored
-            source_as_uri = Path(project_path).as_uri()
-            git.Repo.clone_from(
-                source_as_uri,
-                destination_folder,
-                branch=source_branch,
-                depth=1,
-                single_branch=True,  # shallow, do not copy full history
-            )
-            # submodules copied in loop because shallow copies from local HEADs are ideal
-            # and no git clone submodule options are compatible with minimum requirements
-            for submodule in git_repo.submodules:
-                subrepo_path = os.path.abspath(os.path.join(project_path, submodule.path))
-                subrepo_destination_folder = os.path.abspath(os.path.join(destination_folder, submodule.path))
-                subrepo_uri = Path(subrepo_path).as_uri()
-                git.Repo.clone_from(subrepo_uri, subrepo_destination_folder, depth=1, single_branch=True)
-            # force option is necessary because remote refs are not counted, although no information is lost
-            git_repo.delete_head(tmp_branch_name, force=True)
+
+            def clone(destination):
+                RunProjectUpdate.clone_revision(git_repo, project_path, p.scm_revision, destination)
+
+            if settings.AWX_PROJECT_CHECKOUT_STORE_ENABLED and not git_repo.submodules:
+                # the content of a revision never changes, so it is cloned once
+                # into the checkout store and copied from there; submodules
+                # are cloned from whatever the project folder has checked out,
+                # so those checkouts cannot be reused
+                copier = CheckoutStore().checkout(os.path.basename(os.path.normpath(project_path)), p.scm_revision, destination_folder, clone)
+                logger.debug(
+                    '{0} {1} prepared {2} from the checkout store ({3} files linked, {4} copied)'.format(
+                        type(p).__name__, p.pk, destination_folder, copier.linked, copier.copied
+                    )
+                )
+            else:
+                clone(destination_folder)
         else:
             copy_tree(project_path, destination_folder, preserve_symlinks=1)
 
@@ -2263,9 +2283,35 @@ class RunProjectUpdate(BaseTask):
             cache_subpath = os.path.join(cache_path, subfolder)
             if os.path.exists(cache_subpath):
                 dest_subpath = os.path.join(job_private_data_dir, subfolder)
-                copy_tree(cache_subpath, dest_subpath, preserve_symlinks=1)
+                # a cache folder is never changed once written, so it can be linked
+                TreeCopier(settings.AWX_PROJECT_CHECKOUT_LINK_MODE).copy_tree(cache_subpath, dest_subpath)
                 logger.debug('{0} {1} prepared {2} from cache'.format(type(p).__name__, p.pk, dest_subpath))
 
+    @staticmethod
+    def clone_revision(git_repo, project_path, scm_revision, destination_folder):
+        if not os.path.exists(destination_folder):
+            os.mkdir(destination_folder, stat.S_IREAD | stat.S_IWRITE | stat.S_IEXEC)
+        tmp_branch_name = 'awx_internal/{}'.format(uuid4())
+        source_branch = git_repo.create_head(tmp_branch_name, scm_revision)
+        # git clone must take file:// syntax for source repo or else options like depth will be ignored
+        source_as_uri = Path(project_path).as_uri()
+        git.Repo.clone_from(
+            source_as_uri,
+            destination_folder,
+            branch=source_branch,
+            depth=1,
+            single_branch=True,  # shallow, do not copy full history
+        )
+        # submodules copied in loop because shallow copies from local HEADs are ideal
+        # and no git clone submodule options are compatible with minimum requirements
+        for submodule in git_repo.submodules:
+            subrepo_path = os.path.abspath(os.path.join(project_path, submodule.path))
+            subrepo_destination_folder = os.path.abspath(os.path.join(destination_folder, submodule.path))
+            subrepo_uri = Path(subrepo_path).as_uri()
+            git.Repo.clone_from(subrepo_uri, subrepo_destination_folder, depth=1, single_branch=True)
+        # force option is necessary because remote refs are not counted, although no information is lost
+        git_repo.delete_head(tmp_branch_name, force=True)
+
     def post_run_hook(self, instance, status):
         super(RunProjectUpdate, self).post_run_hook(instance, status)
         # To avoid hangs, very important to release lock even if errors happen here
@@ -3029,7 +3075,9 @@ class AWXReceptorJob:
     @property
     def receptor_params(self):
         if self.task.instance.is_container_group_task:
-            spec_yaml = yaml.dump(self.pod_definition, explicit_start=True)
+            # building the pod definition may create an image pull secret, do it once
+            pod_definition = self.pod_definition
+            spec_yaml = yaml.dump(pod_definition, explicit_start=True)
 
             receptor_params = {
                 "secret_kube_pod": spec_yaml,
@@ -3037,7 +3085,9 @@ class AWXReceptorJob:
             }
 
             if self.credential:
-                kubeconfig_yaml = yaml.dump(self.kube_config, explicit_start=True)
+                from awx.main.scheduler.kubernetes import generate_tmp_kube_config  # prevent circular import
+
+                kubeconfig_yaml = yaml.dump(generate_tmp_kube_config(self.credential, pod_definition['metadata']['namespace']), explicit_start=True)
                 receptor_params["secret_kube_config"] = kubeconfig_yaml
         else:
             private_data_dir = self.runner_params['private_data_dir']
@@ -3059,15 +3109,30 @@ class AWXReceptorJob:
 
     @cleanup_new_process
     def cancel_watcher(self, processor_future):
-        while True:
-            if processor_future.done():
-                return processor_future.result()
-
-            if self.task.cancel_callback():
-                result = namedtuple('result', ['status', 'rc'])
-                return result('canceled', 1)
-
-            time.sleep(1)
+        # Cancellation is pushed to us by the cancel listener; the database is
+        # only polled as a safety net (or every second without a listener)
+        unified_job_id = self.task.instance.pk
+        wakeup = cancel_listener.register(unified_job_id)
+        processor_future.add_done_callback(lambda f: wakeup.set())
+        try:
+            next_check = 0
+            while True:
+                if processor_future.done():
+                    return processor_future.result()
+
+                if wakeup.is_set() or time.monotonic() >= next_check:
+                    wakeup.clear()
+                    if self.task.cancel_callback():
+                        result = namedtuple('result', ['status', 'rc'])
+                        return result('canceled', 1)
+                    if cancel_listener.connected:
+                        next_check = time.monotonic() + settings.AWX_CANCEL_POLL_INTERVAL
+                    else:
+                        next_check = time.monotonic() + 1
+
+                wakeup.wait(max(next_check - time.monotonic(), 0))
+        finally:
+            cancel_listener.unregister(unified_job_id, wakeup)
 
     @property
     def pod_definition(self):
@@ -3123,21 +3188,6 @@ class AWXReceptorJob:
 
     @property
     def kube_config(self):
-        host_input = self.credential.get_input('host')
-        config = {
-            "apiVersion": "v1",
-            "kind": "Config",
-            "preferences": {},
-            "clusters": [{"name": host_input, "cluster": {"server": host_input}}],
-            "users": [{"name": host_input, "user": {"token": self.credential.get_input('bearer_token')}}],
-            "contexts": [{"name": host_input, "context": {"cluster": host_input, "user": host_input, "namespace": self.namespace}}],
-            "current-context": host_input,
-        }
+        from awx.main.scheduler.kubernetes import generate_tmp_kube_config  # prevent circular import
 
-        if self.credential.get_input('verify_ssl') and 'ssl_ca_cert' in self.credential.inputs:
-            config["clusters"][0]["cluster"]["certificate-authority-data"] = b64encode(
-                self.credential.get_input('ssl_ca_cert').encode()  # encode to bytes
-            ).decode()  # decode the base64 data into a str
-        else:
-            config["clusters"][0]["cluster"]["insecure-skip-tls-verify"] = True
-        return config
+        return generate_tmp_kube_config(self.credential, self.namespace)
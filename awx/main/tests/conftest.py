@@ -16,6 +16,8 @@ from awx.main.tests.factories import (
 
 from django.core.cache import cache
 
+from awx.main.utils.common import _memoize_local_cache
+
 
 def pytest_addoption(parser):
     parser.addoption("--genschema", action="store_true", default=False, help="execute schema validator")
@@ -129,6 +131,12 @@ def mock_cache():
         def set(self, key, value, timeout=60):
             self.cache[key] = value
 
+        def add(self, key, value, timeout=60):
+            if key in self.cache:
+                return False
+            self.cache[key] = value
+            return True
+
         def delete(self, key):
             del self.cache[key]
 
@@ -140,6 +148,7 @@ def pytest_runtest_teardown(item, nextitem):
     # NOTE: this should not be memcache (as it is deprecated), nor should it be redis.
     # This is a local test cache, so we want every test to start with an empty cache
     cache.clear()
+    _memoize_local_cache.clear()
 
 
 @pytest.fixture(scope='session', autouse=True)
@@ -1,3 +1,4 @@
+import gzip
 import pytest
 import tempfile
 import os
@@ -87,7 +88,7 @@ def test_copy_tables_unified_job_query(sqlite_copy_expert, project, inventory, j
 
     with tempfile.TemporaryDirectory() as tmpdir:
         collectors.unified_jobs_table(time_start, tmpdir, until=now() + timedelta(seconds=1))
-        with open(os.path.join(tmpdir, "unified_jobs_table.csv")) as f:
+        with gzip.open(os.path.join(tmpdir, "unified_jobs_table.csv.gz"), "rt") as f:
             lines = "".join([line for line in f])
 
             assert project_update_name in lines
@@ -132,7 +133,7 @@ def test_copy_tables_workflow_job_node_query(sqlite_copy_expert, workflow_job):
 
     with tempfile.TemporaryDirectory() as tmpdir:
         collectors.workflow_job_node_table(time_start, tmpdir, until=now() + timedelta(seconds=1))
-        with open(os.path.join(tmpdir, "workflow_job_node_table.csv")) as f:
+        with gzip.open(os.path.join(tmpdir, "workflow_job_node_table.csv.gz"), "rt") as f:
             reader = csv.reader(f)
             # Pop the headers
             next(reader)
@@ -6,7 +6,7 @@ from unittest import mock
 import pytest
 
 from django.conf import settings
-from awx.main.analytics import gather, register
+from awx.main.analytics import collectors, gather, register
 
 
 @register('example', '1.0')
@@ -24,6 +24,26 @@ def throws_error(since, **kwargs):
     raise ValueError()
 
 
+def one_slice(key, since, until, last_gather):
+    return [(since or last_gather, until)]
+
+
+@register('example_table', '1.0', format='csv', expensive=one_slice)
+def example_table(since, full_path, until, **kwargs):
+    dump = collectors.FileSplitter(filespec=os.path.join(full_path, 'example_table.csv'))
+    for line in ('id,name\n', '1,awx\n', '2,ansible\n'):
+        dump.write(line)
+    return dump.file_list()
+
+
+@register('plain_table', '1.0', format='csv', expensive=one_slice)
+def plain_table(since, full_path, until, **kwargs):
+    path = os.path.join(full_path, 'plain_table.csv')
+    with open(path, 'w') as f:
+        f.write('id\n1\n')
+    return [path]
+
+
 def _valid_license():
     pass
 
@@ -57,3 +77,37 @@ def test_gather(mock_valid_license):
             os.remove(tgz)
     except Exception:
         pass
+
+
+def read_archives(tgzfiles):
+    contents = []
+    for tgz in tgzfiles:
+        with tarfile.open(tgz, "r:gz") as archive:
+            contents.append(dict((member.name, archive.extractfile(member).read()) for member in archive.getmembers()))
+        os.remove(tgz)
+    return contents
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('workers', [1, 4])
+def test_gather_tables(mock_valid_license, settings, workers):
+    settings.AUTOMATION_ANALYTICS_GATHER_WORKERS = workers
+
+    archives = read_archives(gather(module=importlib.import_module(__name__), subset=['example_table', 'plain_table'], collection_type='dry-run'))
+    assert len(archives) == 3
+    tables = dict((name, files[name]) for files in archives for name in files if name.endswith('.csv'))
+    assert tables == {'./example_table.csv': b'id,name\n1,awx\n2,ansible\n', './plain_table.csv': b'id\n1\n'}
+    for files in archives:
+        assert './config.json' in files
+        assert './manifest.json' in files
+
+
+@pytest.mark.django_db
+def test_gather_split_table(mock_valid_license):
+    with mock.patch.object(collectors, 'MAX_TABLE_SIZE', 10):
+        archives = read_archives(gather(module=importlib.import_module(__name__), subset=['example_table'], collection_type='dry-run'))
+    splits = [files['./example_table.csv'].decode('utf-8').splitlines() for files in archives[1:]]
+    assert len(splits) > 1
+    # every split repeats the header
+    assert all(lines[0] == 'id,name' for lines in splits)
+    assert [row for lines in splits for row in lines[1:]] == ['1,awx', '2,ansible']
@@ -0,0 +1,73 @@
+from unittest import mock
+
+import pytest
+
+from awx.api.versioning import reverse
+from awx.main.models import DashboardRollup, Inventory, Organization, Project
+
+
+COUNTED_KEYS = ('inventories', 'inventory_sources', 'groups', 'hosts', 'projects', 'scm_types', 'credentials', 'job_templates', 'teams')
+
+
+@pytest.fixture
+def dashboard_data(organization, inventory, project, team):
+    other_org = Organization.objects.create(name='other-org')
+    other_inventory = Inventory.objects.create(name='other-inv', organization=other_org)
+    for inv in (inventory, other_inventory):
+        for i in range(3):
+            inv.hosts.create(name='host-{}'.format(i))
+        inv.groups.create(name='group')
+        inv.inventory_sources.create(name='ec2', source='ec2')
+    Project.objects.create(name='other-proj', organization=other_org, scm_type='git')
+    return other_inventory
+
+
+@pytest.fixture
+def refresh():
+    with mock.patch('awx.main.tasks.refresh_dashboard_rollups.delay') as delay:
+        yield delay
+
+
+def dashboard(get, user):
+    data = get(reverse('api:dashboard_view'), user, expect=200).data
+    return dict((key, data[key]) for key in COUNTED_KEYS)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('role', ['superuser', 'org_auditor', 'inventory_reader', 'nothing'])
+def test_rollups_match_direct_counts(get, dashboard_data, organization, admin, rando, refresh, role):
+    user = admin
+    if role == 'org_auditor':
+        user = rando
+        organization.auditor_role.members.add(rando)
+        dashboard_data.read_role.members.add(rando)
+    elif role == 'inventory_reader':
+        user = rando
+        dashboard_data.read_role.members.add(rando)
+    elif role == 'nothing':
+        user = rando
+
+    direct = dashboard(get, user)
+    assert refresh.call_count == 1  # no rollups yet
+    DashboardRollup.refresh()
+    assert dashboard(get, user) == direct
+
+
+@pytest.mark.django_db
+def test_stale_rollups_are_not_used(get, dashboard_data, admin, refresh, settings):
+    DashboardRollup.refresh()
+    dashboard_data.hosts.create(name='new-host')
+    assert dashboard(get, admin)['hosts']['total'] == 6
+    assert refresh.call_count == 0
+
+    settings.DASHBOARD_ROLLUP_MAX_AGE = 0
+    assert dashboard(get, admin)['hosts']['total'] == 7
+    assert refresh.call_count == 1
+
+
+@pytest.mark.django_db
+def test_superuser_queries(get, dashboard_data, admin, refresh, django_assert_max_num_queries):
+    DashboardRollup.refresh()
+    # rollups, users and organizations, besides authentication and session queries
+    with django_assert_max_num_queries(12):
+        get(reverse('api:dashboard_view'), admin, expect=200)
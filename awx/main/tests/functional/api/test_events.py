@@ -1,7 +1,7 @@
 import pytest
 
 from awx.api.versioning import reverse
-from awx.main.models import AdHocCommand, AdHocCommandEvent, JobEvent
+from awx.main.models import AdHocCommand, AdHocCommandEvent, Host, Inventory, Job, JobEvent
 
 
 @pytest.mark.django_db
@@ -46,3 +46,28 @@ def test_ad_hoc_events_sublist_truncation(get, organization_factory, job_templat
 
     response = get(url, user=objs.superusers.admin, expect=200)
     assert (len(response.data['results'][0]['stdout']) == 1025) == expected
+
+
+@pytest.mark.django_db
+def test_host_job_events_include_smart_inventory_jobs(get, admin, inventory):
+    smart = Inventory.objects.create(name='smart', kind='smart', host_filter='name=host1', organization=inventory.organization)
+    old = Job.objects.create(inventory=smart)
+    host = Host.objects.create(name='host1', inventory=inventory)
+    JobEvent.create_from_data(job_id=old.pk, host_id=host.pk, uuid='abc123', event='runner_on_ok', job_created=old.created).save()
+    Job.objects.create(inventory=inventory)
+
+    url = reverse('api:host_job_events_list', kwargs={'pk': host.pk})
+    response = get(url, user=admin, expect=200)
+    assert [event['job'] for event in response.data['results']] == [old.pk]
+
+
+@pytest.mark.django_db
+def test_host_job_events_skip_jobs_finished_before_the_host(get, admin, inventory):
+    done = Job.objects.create(inventory=inventory)
+    Job.objects.filter(pk=done.pk).update(finished=done.created)
+    host = Host.objects.create(name='host1', inventory=inventory)
+    # cannot happen, but shows that the job is outside of the bound
+    JobEvent.create_from_data(job_id=done.pk, host_id=host.pk, uuid='abc123', event='runner_on_ok', job_created=done.created).save()
+
+    url = reverse('api:host_job_events_list', kwargs={'pk': host.pk})
+    assert get(url, user=admin, expect=200).data['results'] == []
@@ -0,0 +1,79 @@
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from awx.api.versioning import reverse
+from awx.main.models import Inventory, JobHostSummary, JobTemplate, Label, WorkflowJobTemplate
+
+
+# list views that should not run queries for each row of a page
+ENDPOINTS = (
+    'api:host_list',
+    'api:job_list',
+    'api:job_template_list',
+    'api:inventory_list',
+    'api:unified_job_list',
+    'api:workflow_job_node_list',
+)
+
+ROWS = 12
+
+
+@pytest.fixture
+def object_graph(organization, project, machine_credential, credential, team, rando):
+    """
+    ROWS inventories with hosts, groups and a source, each used by a job
+    template with credentials and labels that ran twice, and a workflow job
+    with a node for each template.  rando audits the organization through a
+    team, and can only run half of the templates.
+    """
+    # other kinds of unified jobs, listed first
+    project.update()
+    wfjt = WorkflowJobTemplate.objects.create(name='workflow', organization=organization)
+    for i in range(ROWS):
+        inventory = Inventory.objects.create(name='inventory-{}'.format(i), organization=organization)
+        inventory.inventory_sources.create(name='source-{}'.format(i), source='ec2')
+        group = inventory.groups.create(name='group-{}'.format(i))
+        hosts = [inventory.hosts.create(name='host-{}-{}'.format(i, j)) for j in range(2)]
+        group.hosts.add(*hosts)
+        if i == 0:
+            inventory.inventory_sources.first().create_unified_job()
+        jt = JobTemplate.objects.create(
+            name='template-{}'.format(i), organization=organization, project=project, inventory=inventory, playbook='helloworld.yml'
+        )
+        jt.credentials.add(machine_credential, credential)
+        jt.labels.add(Label.objects.create(name='label-{}'.format(i), organization=organization))
+        if i % 2:
+            team.member_role.children.add(jt.execute_role)
+        for k in range(2):
+            job = jt.create_unified_job(_eager_fields={'status': 'successful'})
+            for host in hosts:
+                summary = JobHostSummary.objects.create(job=job, host=host, ok=1)
+                host.last_job, host.last_job_host_summary = job, summary
+                host.save(update_fields=['last_job', 'last_job_host_summary'])
+        wfjt.workflow_job_template_nodes.create(unified_job_template=jt)
+    wfjt.create_unified_job()
+    team.member_role.children.add(organization.auditor_role)
+    team.member_role.members.add(rando)
+
+
+def count_queries(get, url, user, page_size):
+    with CaptureQueriesContext(connection) as context:
+        response = get('{}?page_size={}&order_by=id'.format(url, page_size), user, expect=200)
+    return len(response.data['results']), len(context)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('endpoint', ENDPOINTS)
+@pytest.mark.parametrize('username', ['admin', 'rando'])
+def test_queries_do_not_grow_with_page_size(get, object_graph, admin, rando, endpoint, username):
+    user = admin if username == 'admin' else rando
+    url = reverse(endpoint)
+    # settings, memoized and materialized access lookups are warmed up by
+    # the first request
+    get(url, user, expect=200)
+    rows, queries = count_queries(get, url, user, 3)
+    more_rows, more_queries = count_queries(get, url, user, ROWS)
+    assert rows < more_rows
+    assert queries == more_queries
@@ -105,3 +105,65 @@ class TestUnifiedJobEventPagination:
     @pytest.mark.django_db
     def test_adhoc_command(self, get, admin, ad_hoc_command):
         self._test_unified_job(get, admin, ad_hoc_command, 'ad_hoc_command_id', 'ad_hoc_command_ad_hoc_command_events_list')
+
+
+class TestKeysetEventPagination:
+    @pytest.fixture
+    def job(self, job_template):
+        job = job_template.create_unified_job()
+        for i in range(1, 21):
+            job.event_class.create_from_data(job_id=job.pk, counter=i).save()
+        return job
+
+    def _counters(self, resp):
+        return [e['counter'] for e in resp.data['results']]
+
+    @pytest.mark.django_db
+    def test_walk_forward_and_back(self, get, admin, job):
+        url = reverse('api:job_job_events_list', kwargs={'pk': job.pk}) + '?cursor=&page_size=7'
+        resp = get(url, user=admin, expect=200)
+        assert 'count' not in resp.data
+        assert resp.data['previous'] is None
+        assert self._counters(resp) == list(range(1, 8))
+
+        resp = get(resp.data['next'], user=admin, expect=200)
+        assert self._counters(resp) == list(range(8, 15))
+
+        resp = get(resp.data['next'], user=admin, expect=200)
+        assert self._counters(resp) == list(range(15, 21))
+        assert resp.data['next'] is None
+
+        resp = get(resp.data['previous'], user=admin, expect=200)
+        assert self._counters(resp) == list(range(8, 15))
+
+        resp = get(resp.data['previous'], user=admin, expect=200)
+        assert self._counters(resp) == list(range(1, 8))
+        assert resp.data['previous'] is None
+
+    @pytest.mark.django_db
+    def test_descending(self, get, admin, job):
+        url = reverse('api:job_job_events_list', kwargs={'pk': job.pk}) + '?cursor=&page_size=15&order_by=-counter'
+        resp = get(url, user=admin, expect=200)
+        assert self._counters(resp) == list(range(20, 5, -1))
+
+        resp = get(resp.data['next'], user=admin, expect=200)
+        assert self._counters(resp) == list(range(5, 0, -1))
+        assert resp.data['next'] is None
+
+    @pytest.mark.django_db
+    def test_unsupported_ordering(self, get, admin, job):
+        url = reverse('api:job_job_events_list', kwargs={'pk': job.pk}) + '?cursor=&order_by=stdout'
+        get(url, user=admin, expect=400)
+
+    @pytest.mark.django_db
+    def test_invalid_cursor(self, get, admin, job):
+        url = reverse('api:job_job_events_list', kwargs={'pk': job.pk}) + '?cursor=garbage'
+        get(url, user=admin, expect=404)
+
+    @pytest.mark.django_db
+    def test_approximate_count(self, get, admin, job):
+        job.emitted_events = 20
+        job.save(update_fields=['emitted_events'])
+        url = reverse('api:job_job_events_list', kwargs={'pk': job.pk}) + '?cursor=&approximate_count=1'
+        resp = get(url, user=admin, expect=200)
+        assert resp.data['count'] == 20
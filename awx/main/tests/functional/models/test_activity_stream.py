@@ -9,7 +9,7 @@ from awx.main.models import ActivityStream, Organization, JobTemplate, Credentia
 # other AWX
 from awx.main.utils import model_to_dict, model_instance_diff
 from awx.main.utils.common import get_allowed_fields
-from awx.main.signals import model_serializer_mapping
+from awx.main.signals import buffer_activity_stream, model_serializer_mapping
 
 # Django
 from django.contrib.auth.models import AnonymousUser
@@ -278,3 +278,76 @@ def test_credential_defaults_idempotency():
     CredentialType.setup_tower_managed_defaults()
     assert CredentialType.objects.get(name='Red Hat Ansible Automation Platform', kind='cloud').inputs == old_inputs
     assert ActivityStream.objects.count() == prior_count
+
+
+@pytest.mark.django_db
+class TestBufferedActivityStream:
+    def test_entries_written_at_exit(self, inventory):
+        hosts = [inventory.hosts.create(name='host-{}'.format(i)) for i in range(5)]
+        group = inventory.groups.create(name='group')
+        with buffer_activity_stream():
+            group.hosts.add(*hosts)
+            assert not ActivityStream.objects.filter(operation='associate').exists()
+        entries = ActivityStream.objects.filter(operation='associate', object1='group', object2='host')
+        assert entries.count() == 5
+        assert set(entries.values_list('host', flat=True)) == set(host.pk for host in hosts)
+        for entry in entries:
+            assert list(entry.group.all()) == [group]
+
+    def test_role_entries(self, inventory, alice):
+        with buffer_activity_stream():
+            alice.roles.add(inventory.admin_role)
+        entry = ActivityStream.objects.get(operation='associate', object1='user')
+        assert list(entry.user.all()) == [alice]
+        assert list(entry.inventory.all()) == [inventory]
+        assert list(entry.role.all()) == [inventory.admin_role]
+        assert entry.object_relationship_type == 'awx.main.models.inventory.Inventory.admin_role'
+
+    def test_deleted_objects(self, inventory):
+        with buffer_activity_stream():
+            host = inventory.hosts.create(name='gone')
+            host.delete()
+        entry = ActivityStream.objects.get(operation='create', object1='host')
+        assert not entry.host.exists()
+
+    def test_discarded_on_error(self, organization):
+        prior_count = ActivityStream.objects.count()
+        with pytest.raises(RuntimeError):
+            with buffer_activity_stream():
+                organization.description = 'changed'
+                organization.save()
+                raise RuntimeError()
+        assert ActivityStream.objects.count() == prior_count
+
+    def test_flushed_when_full(self, inventory, settings):
+        settings.ACTIVITY_STREAM_BUFFER_SIZE = 3
+        with buffer_activity_stream():
+            for i in range(4):
+                inventory.hosts.create(name='host-{}'.format(i))
+            assert ActivityStream.objects.filter(operation='create', object1='host').count() == 3
+        assert ActivityStream.objects.filter(operation='create', object1='host').count() == 4
+
+    def test_bulk_create(self, inventory, settings):
+        settings.ACTIVITY_STREAM_BUFFER_SIZE = 2
+        batches = []
+
+        def bulk_create(objs, batch_size=None):
+            # what postgres does: the primary keys of the inserted rows are
+            # set on the objects, which sqlite cannot do
+            batches.append((len(objs), batch_size))
+            for obj in objs:
+                super(ActivityStream, obj).save()
+            return objs
+
+        hosts = [inventory.hosts.create(name='host-{}'.format(i)) for i in range(2)]
+        group = inventory.groups.create(name='group')
+        with mock.patch('awx.main.signals.can_bulk_create_activity_stream', return_value=True):
+            with mock.patch.object(ActivityStream.objects, 'bulk_create', side_effect=bulk_create):
+                with buffer_activity_stream():
+                    group.hosts.add(*hosts)
+                    hosts[1].delete()
+        assert batches == [(2, 2), (1, 2)]
+        entries = ActivityStream.objects.filter(operation='associate', object1='group', object2='host')
+        assert set(entries.values_list('host', flat=True)) == set([hosts[0].pk, None])
+        for entry in entries:
+            assert list(entry.group.all()) == [group]
@@ -288,6 +288,62 @@ def test_inventory_update_excessively_long_name(inventory, inventory_source):
     assert iu.name.startswith(inventory.name)
 
 
+@pytest.mark.django_db
+class TestComputedFields:
+    @pytest.fixture
+    def populated_inventory(self, inventory, group_factory):
+        job = Job.objects.create(inventory=inventory)
+        for i in range(5):
+            host = inventory.hosts.create(name='host-{}'.format(i))
+            host.last_job_host_summary = host.job_host_summaries.create(job=job, failures=i % 2)
+            host.save(update_fields=['last_job_host_summary'])
+        group_factory('test_group')
+        inventory.inventory_sources.create(name='ec2', source='ec2')
+        source = inventory.inventory_sources.create(name='gce', source='gce')
+        source.last_job_failed = True
+        source.save(update_fields=['last_job_failed'])
+        inventory.inventory_sources.create(name='scm', source='scm')
+        return inventory
+
+    def test_aggregated_counts(self, populated_inventory, django_assert_max_num_queries):
+        with django_assert_max_num_queries(3):
+            populated_inventory.update_computed_fields()
+        populated_inventory.refresh_from_db()
+        computed = {field: getattr(populated_inventory, field) for field in populated_inventory._count_computed_fields()}
+        assert computed == populated_inventory._count_computed_fields()
+        assert computed == {
+            'has_active_failures': True,
+            'total_hosts': 5,
+            'hosts_with_active_failures': 2,
+            'total_groups': 1,
+            'has_inventory_sources': True,
+            'total_inventory_sources': 2,
+            'inventory_sources_with_failures': 1,
+        }
+
+    def test_empty_inventory(self, inventory):
+        inventory.total_hosts = 3
+        inventory.save(update_fields=['total_hosts'])
+        inventory.update_computed_fields()
+        assert inventory.total_hosts == 0
+        assert inventory.total_groups == 0
+        assert inventory.has_inventory_sources is False
+
+    def test_smart_inventory(self, setup_ec2_gce, organization):
+        smart_inventory = Inventory.objects.create(name='smart', organization=organization, kind='smart', host_filter='inventory_sources__source=ec2')
+        smart_inventory.update_computed_fields()
+        assert smart_inventory.total_hosts == 2
+        assert smart_inventory.total_inventory_sources == 0
+
+    def test_verification_corrects_mismatch(self, populated_inventory, settings):
+        settings.AWX_VERIFY_INVENTORY_COMPUTED_FIELDS = True
+        with mock.patch.object(Inventory, '_count_computed_fields', return_value=dict(populated_inventory._count_computed_fields(), total_groups=7)):
+            with mock.patch('awx.main.models.inventory.logger') as logger:
+                populated_inventory.update_computed_fields()
+        assert logger.error.call_count == 1
+        assert Inventory.objects.get(pk=populated_inventory.pk).total_groups == 7
+
+
 @pytest.mark.django_db
 class TestHostManager:
     def test_host_filter_not_smart(self, setup_ec2_gce, organization):
@@ -5,7 +5,11 @@ from collections import namedtuple
 from unittest import mock  # noqa
 import pytest
 
-from awx.main.tasks import AWXReceptorJob
+from django.conf import settings
+
+from awx.main.models import InstanceGroup
+from awx.main.scheduler.kubernetes import PodIndex, PodManager, pod_index
+from awx.main.tasks import AWXReceptorJob, awx_k8s_reaper
 from awx.main.utils import (
     create_temporary_fifo,
 )
@@ -53,3 +57,103 @@ def test_kubectl_ssl_verification(containerized_job, default_job_execution_envir
     receptor_job = AWXReceptorJob(rj, runner_params={'settings': {}})
     ca_data = receptor_job.kube_config['clusters'][0]['cluster']['certificate-authority-data']
     assert cert.stdout == base64.b64decode(ca_data.encode())
+
+
+class FakePodList(object):
+    def __init__(self, items):
+        self.items = items
+
+    def to_dict(self):
+        return {'items': self.items}
+
+
+class FakeCoreV1Api(object):
+    """
+    In-process stand in for the pod calls of the Kubernetes API.
+    """
+
+    def __init__(self):
+        self.pods = {}
+        self.calls = []
+
+    def add_job_pod(self, namespace, job_id):
+        name = 'automation-job-{}'.format(job_id)
+        self.pods[(namespace, name)] = {'ansible-awx': settings.INSTALL_UUID, 'ansible-awx-job-id': str(job_id)}
+        return name
+
+    def list_namespaced_pod(self, namespace, label_selector, **kwargs):
+        self.calls.append(('list', namespace))
+        label, value = label_selector.split('=')
+        return FakePodList(
+            [{'metadata': {'name': name, 'labels': labels}} for (ns, name), labels in self.pods.items() if ns == namespace and labels.get(label) == value]
+        )
+
+    def delete_namespaced_pod(self, name, namespace, **kwargs):
+        self.calls.append(('delete', namespace))
+        del self.pods[(namespace, name)]
+
+
+@pytest.fixture
+def fake_k8s(default_job_execution_environment):
+    api = FakeCoreV1Api()
+    pod_index.clear()
+    with mock.patch.object(PodIndex, 'build_api', return_value=(api, None)) as build_api:
+        api.build_api = build_api
+        yield api
+    pod_index.clear()
+
+
+@pytest.mark.django_db
+class TestPodIndex:
+    def test_listing_is_shared(self, fake_k8s, containerized_job, kube_credential):
+        other = InstanceGroup.objects.create(name='other', is_container_group=True, credential=kube_credential)
+        name = fake_k8s.add_job_pod('default', containerized_job.id)
+        assert PodManager.list_active_jobs(containerized_job.instance_group) == {containerized_job.id: name}
+        assert PodManager.list_active_jobs(other) == {containerized_job.id: name}
+        assert fake_k8s.calls == [('list', 'default')]
+        assert fake_k8s.build_api.call_count == 1
+
+    def test_listing_expires(self, fake_k8s, containerized_job, settings):
+        settings.AWX_CONTAINER_GROUP_POD_INDEX_TTL = 0
+        assert PodManager.list_active_jobs(containerized_job.instance_group) == {}
+        name = fake_k8s.add_job_pod('default', containerized_job.id)
+        assert PodManager.list_active_jobs(containerized_job.instance_group) == {containerized_job.id: name}
+        assert len(fake_k8s.calls) == 2
+
+    def test_namespaces_are_listed_separately(self, fake_k8s, containerized_job):
+        fake_k8s.add_job_pod('default', containerized_job.id)
+        group = containerized_job.instance_group
+        group.pod_spec_override = 'metadata:\n  namespace: other\n'
+        group.save()
+        assert PodManager.list_active_jobs(group) == {}
+        assert fake_k8s.calls == [('list', 'other')]
+
+    def test_client_rebuilt_for_modified_credential(self, fake_k8s, containerized_job, kube_credential):
+        PodManager.list_active_jobs(containerized_job.instance_group)
+        kube_credential.inputs['host'] = 'other.cluster'
+        kube_credential.save()
+        containerized_job.instance_group.refresh_from_db()
+        PodManager.list_active_jobs(containerized_job.instance_group)
+        assert fake_k8s.build_api.call_count == 2
+
+    def test_list_failure(self, fake_k8s, containerized_job):
+        with mock.patch.object(fake_k8s, 'list_namespaced_pod', side_effect=RuntimeError('unreachable')):
+            assert PodManager.list_active_jobs(containerized_job.instance_group) == {}
+        fake_k8s.add_job_pod('default', containerized_job.id)
+        # failures are not cached
+        assert containerized_job.id in PodManager.list_active_jobs(containerized_job.instance_group)
+
+    def test_reaper(self, fake_k8s, containerized_job, job_template_factory, settings):
+        settings.RECEPTOR_RELEASE_WORK = True
+        finished = containerized_job.job_template.create_unified_job()
+        finished.instance_group = containerized_job.instance_group
+        finished.status = 'successful'
+        finished.save()
+        fake_k8s.add_job_pod('default', containerized_job.id)
+        fake_k8s.add_job_pod('default', finished.id)
+
+        awx_k8s_reaper()
+        assert list(fake_k8s.pods) == [('default', 'automation-job-{}'.format(containerized_job.id))]
+        # the deleted pod is dropped from the listing, which is reused
+        assert PodManager.list_active_jobs(containerized_job.instance_group) == {containerized_job.id: 'automation-job-{}'.format(containerized_job.id)}
+        assert fake_k8s.calls == [('list', 'default'), ('delete', 'default')]
@@ -0,0 +1,60 @@
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from awx.main.models import Job
+from awx.main.scheduler.task_resolver import TaskResolver
+
+
+def pending_jobs(job_template, count):
+    jobs = []
+    for i in range(count):
+        job = job_template.create_unified_job()
+        job.status = 'pending'
+        job.save()
+        jobs.append(job)
+    return jobs
+
+
+def fresh(jobs):
+    return list(Job.objects.filter(pk__in=[j.pk for j in jobs]).order_by('pk'))
+
+
+@pytest.mark.django_db
+def test_preferred_instance_groups_match_model(job_template_factory, instance_group_factory, default_instance_group):
+    ig1 = instance_group_factory('ig1')
+    ig2 = instance_group_factory('ig2')
+    ig3 = instance_group_factory('ig3')
+    objects = job_template_factory('jt1', organization='org1', project='proj1', inventory='inv1', credential='cred1')
+    job_template = objects.job_template
+    job_template.instance_groups.add(ig2)
+    job_template.instance_groups.add(ig1)
+    job_template.inventory.instance_groups.add(ig3)
+    job_template.organization.instance_groups.add(ig1)
+    other = job_template_factory('jt2', organization='org2', project='proj2', inventory='inv2', credential='cred2').job_template
+
+    jobs = fresh(pending_jobs(job_template, 2) + pending_jobs(other, 1))
+    resolver = TaskResolver(jobs)
+    for job in jobs:
+        assert resolver.preferred_instance_groups(job) == Job.objects.get(pk=job.pk).preferred_instance_groups
+    assert resolver.preferred_instance_groups(jobs[0]) == [ig2, ig1, ig3, ig1]
+    assert resolver.preferred_instance_groups(jobs[2]) == [default_instance_group]
+
+
+@pytest.mark.django_db
+def test_query_count_does_not_grow_with_jobs(job_template_factory, instance_group_factory, default_instance_group):
+    job_template = job_template_factory('jt1', organization='org1', project='proj1', inventory='inv1', credential='cred1').job_template
+    job_template.instance_groups.add(instance_group_factory('ig1'))
+
+    def count_queries(jobs):
+        jobs = fresh(jobs)
+        with CaptureQueriesContext(connection) as ctx:
+            resolver = TaskResolver(jobs)
+            for job in jobs:
+                resolver.preferred_instance_groups(job)
+                job.task_impact
+        return len(ctx.captured_queries)
+
+    few = pending_jobs(job_template, 2)
+    assert count_queries(few) == count_queries(few + pending_jobs(job_template, 10))
@@ -0,0 +1,48 @@
+import pytest
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from awx.main.access import JobAccess
+from awx.main.consumers import EventConsumer
+from awx.main.models import Job
+
+
+@pytest.fixture
+def consumer(rando):
+    consumer = EventConsumer(scope={'type': 'websocket', 'user': rando})
+    return consumer
+
+
+def authorized_object_ids(consumer, oids):
+    # call the synchronous implementation underneath database_sync_to_async
+    return EventConsumer.authorized_object_ids.func(consumer, JobAccess, 'job_events', oids)
+
+
+@pytest.mark.django_db
+def test_authorized_ids_single_query(consumer, rando, job_template):
+    job_template.execute_role.members.add(rando)
+    visible = [job_template.create_unified_job() for i in range(5)]
+    hidden = Job.objects.create(name='hidden')
+    oids = set(j.pk for j in visible) | {hidden.pk}
+
+    with CaptureQueriesContext(connection) as first:
+        assert authorized_object_ids(consumer, oids) == set(j.pk for j in visible)
+    # one query for the user, one for the access check of every ID
+    assert len(first) == 2
+
+    with CaptureQueriesContext(connection) as second:
+        assert authorized_object_ids(consumer, set(j.pk for j in visible)) == set(j.pk for j in visible)
+    # already authorized on this connection
+    assert len(second) == 0
+
+
+@pytest.mark.django_db
+def test_authorization_cache_expires(consumer, rando, job_template, settings):
+    settings.WEBSOCKET_AUTHORIZATION_CACHE_SECONDS = 0
+    job_template.execute_role.members.add(rando)
+    job = job_template.create_unified_job()
+    assert authorized_object_ids(consumer, {job.pk}) == {job.pk}
+
+    job_template.execute_role.members.remove(rando)
+    assert authorized_object_ids(consumer, {job.pk}) == set()
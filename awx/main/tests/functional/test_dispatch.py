@@ -2,17 +2,21 @@ import datetime
 import multiprocessing
 import random
 import signal
+import threading
 import time
 from unittest import mock
 
+from django.db import connection
 from django.utils.timezone import now as tz_now
 import pytest
 
-from awx.main.models import Job, WorkflowJob, Instance
+from awx.main.models import Job, WorkflowJob, Instance, PeriodicTaskLease
 from awx.main.dispatch import reaper
+from awx.main.dispatch.periodic import Scheduler
 from awx.main.dispatch.pool import StatefulPoolWorker, WorkerPool, AutoscalePool
 from awx.main.dispatch.publish import task
 from awx.main.dispatch.worker import BaseWorker, TaskWorker
+from awx.main.dispatch.worker.base import AWXConsumerBase
 
 
 '''
@@ -56,6 +60,11 @@ def multiply(a, b):
     return a * b
 
 
+@task(queue='hard-math', coalesce=True)
+def recalculate(pk):
+    return pk
+
+
 class SimpleWorker(BaseWorker):
     def perform_work(self, body, *args):
         pass
@@ -338,6 +347,72 @@ class TestTaskPublisher:
         message, queue = add.apply_async([2, 2], queue=lambda: 'called')
         assert queue == 'called'
 
+    def test_coalesce_defined_in_task_decorator(self):
+        message, queue = recalculate.apply_async([1])
+        assert message['coalesce'] is True
+        message, queue = multiply.apply_async([2, 2])
+        assert 'coalesce' not in message
+
+
+@pytest.mark.usefixtures("disable_database_settings")
+class TestCoalescing:
+    def setup_method(self, test_method):
+        self.pool = WorkerPool(min_workers=1)
+        # workers are never started, so every message stays pending
+        self.pool.workers = [StatefulPoolWorker(1000, SimpleWorker().work_loop, tuple())]
+        with mock.patch.object(WorkerPool, 'init_workers'):
+            self.consumer = AWXConsumerBase('dispatcher', SimpleWorker(), pool=self.pool)
+        self.consumer.record_statistics = mock.Mock()
+
+    def publish(self, *args, **kw):
+        message, queue = recalculate.apply_async(list(args), **kw)
+        self.consumer.process_task(message)
+
+    @property
+    def pending(self):
+        return list(self.pool.workers[0].managed_tasks.values())
+
+    def start(self, n=1):
+        # what the worker process does when it takes messages off its queue
+        self.pool.workers[0].started.value += n
+
+    def test_duplicates_of_pending_messages_are_dropped(self):
+        for i in range(5):
+            self.publish(1)
+        assert len(self.pending) == 1
+        assert self.consumer.coalesced_messages == 4
+
+    def test_messages_with_different_arguments_are_kept(self):
+        for pk in (1, 2, 1, 2):
+            self.publish(pk)
+        assert [m['args'] for m in self.pending] == [[1], [2]]
+        self.start()
+        self.publish(1)
+        self.publish(3)
+        assert [m['args'] for m in self.pending] == [[1], [2], [1], [3]]
+
+    def test_started_messages_are_not_coalesced_into(self):
+        self.publish(1)
+        self.publish(2)
+        # the worker finished the first message and started the second one,
+        # but the dispatcher has not been told it finished yet
+        self.start(2)
+        self.publish(2)
+        assert [m['args'] for m in self.pending] == [[1], [2], [2]]
+        assert self.consumer.coalesced_messages == 0
+
+    def test_messages_with_callbacks_are_kept(self):
+        for i in range(3):
+            self.publish(1, callbacks=[{'task': 'awx.main.tests.functional.test_dispatch.add', 'args': [1, 1]}])
+        assert len(self.pending) == 3
+        assert self.consumer.coalesced_messages == 0
+
+    def test_tasks_that_do_not_opt_in_are_kept(self):
+        for i in range(3):
+            message, queue = multiply.apply_async([2, 2])
+            self.consumer.process_task(message)
+        assert len(self.pending) == 3
+
 
 yesterday = tz_now() - datetime.timedelta(days=1)
 
@@ -417,3 +492,113 @@ class TestJobReaper(object):
         reaper.reap(i)
 
         assert WorkflowJob.objects.first().status == 'running'
+
+    def test_reap_many(self, job_template, django_assert_max_num_queries):
+        i = Instance(hostname='awx')
+        i.save()
+        started = tz_now() - datetime.timedelta(minutes=5)
+        for n in range(20):
+            Job.objects.create(status='running', execution_node='awx', start_args='SENSITIVE', job_template=job_template, started=started)
+        Job.objects.create(status='successful', execution_node='awx', job_template=job_template)
+
+        with mock.patch.object(Job, 'get_notification_templates', autospec=True, return_value={}) as get_notification_templates:
+            # a constant number of queries, however many jobs are reaped
+            with django_assert_max_num_queries(25):
+                reaped = reaper.reap(i)
+        assert len(reaped) == 20
+        assert get_notification_templates.call_count == 1
+
+        for job in Job.objects.filter(id__in=reaped):
+            assert job.status == 'failed'
+            assert job.failed
+            assert job.start_args == ''
+            assert 'marked as failed' in job.job_explanation
+            assert job.finished is not None
+            assert job.elapsed >= 300
+        job_template.refresh_from_db()
+        assert job_template.last_job_id == max(reaped)
+        assert job_template.last_job_failed
+
+    def test_reap_many_clears_current_job(self, job_template):
+        i = Instance(hostname='awx')
+        i.save()
+        current = Job.objects.create(status='running', execution_node='awx', job_template=job_template)
+        later = Job.objects.create(status='running', execution_node='awx', job_template=job_template)
+        job_template.current_job = current
+        job_template.save(update_fields=['current_job'])
+
+        assert reaper.reap(i) == [current.id, later.id]
+        job_template.refresh_from_db()
+        assert job_template.current_job is None
+        assert job_template.last_job_id == later.id
+        assert job_template.last_job_failed
+
+    def test_reap_many_project_updates(self, project):
+        i = Instance(hostname='awx')
+        i.save()
+        update = project.project_updates.create(status='running', execution_node='awx', job_type='check')
+        # a sync update started for a job does not change the project status
+        project.project_updates.create(status='running', execution_node='awx', job_type='run')
+        project.current_job = update
+        project.status = 'running'
+        project.save(update_fields=['current_job', 'status'])
+
+        assert len(reaper.reap(i)) == 2
+        project.refresh_from_db()
+        assert project.current_job is None
+        assert project.last_job_id == update.id
+        assert project.status == 'failed'
+
+    def test_reap_metrics(self):
+        i = Instance(hostname='awx')
+        i.save()
+        Job.objects.create(status='running', execution_node='awx')
+        with mock.patch('awx.main.analytics.subsystem_metrics.add_local_counters') as add_local_counters:
+            reaper.reap(i)
+            reaper.reap(i)
+        # nothing is recorded when nothing was reaped
+        assert add_local_counters.call_count == 1
+        counters = add_local_counters.call_args[0][0]
+        assert counters['dispatcher_jobs_reaped'] == 1
+        assert counters['dispatcher_reap_seconds'] >= 0
+
+
+@pytest.mark.django_db(transaction=True)
+class TestPeriodicTaskLease:
+    def run_pending(self, node, hostname, settings):
+        # each node schedules from its own thread, and so its own connection
+        def run():
+            try:
+                node.run_pending(redis)
+            finally:
+                connection.close()
+
+        redis = mock.Mock(**{'set.return_value': True})
+        settings.CLUSTER_HOST_ID = hostname
+        thread = threading.Thread(target=run)
+        thread.start()
+        thread.join()
+        return [t.name for t in node.tasks if t.task.apply_async.called]
+
+    def node(self):
+        s = Scheduler()
+        s.add('task_manager', {'task': 'awx.main.tasks.cluster_node_heartbeat', 'schedule': datetime.timedelta(seconds=20), 'cluster': True})
+        s.add('heartbeat', {'task': 'awx.main.tasks.cluster_node_heartbeat', 'schedule': datetime.timedelta(seconds=20)})
+        for t in s.tasks:
+            t.due = time.time()
+            t.task = mock.Mock()
+        return s
+
+    def test_cluster_tasks_run_on_one_node(self, settings):
+        first, second = self.node(), self.node()
+        with mock.patch('awx.main.analytics.subsystem_metrics.set_local_gauges'):
+            assert self.run_pending(first, 'awx-1', settings) == ['task_manager', 'heartbeat']
+            assert self.run_pending(second, 'awx-2', settings) == ['heartbeat']
+            assert PeriodicTaskLease.objects.get(name='task_manager').holder == 'awx-1'
+
+            # awx-1 went away and its lease expired
+            PeriodicTaskLease.objects.update(expires=tz_now() - datetime.timedelta(seconds=1))
+            second = self.node()
+            assert self.run_pending(second, 'awx-2', settings) == ['task_manager', 'heartbeat']
+            first = self.node()
+            assert self.run_pending(first, 'awx-1', settings) == ['heartbeat']
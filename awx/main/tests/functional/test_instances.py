@@ -2,10 +2,12 @@ import pytest
 from unittest import mock
 
 from awx.main.models import AdHocCommand, InventoryUpdate, JobTemplate, ProjectUpdate
-from awx.main.models.ha import Instance, InstanceGroup
+from awx.main.models.ha import CapacityLedger, Instance, InstanceGroup
 from awx.main.tasks import apply_cluster_membership_policies
 from awx.api.versioning import reverse
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.utils.timezone import now
 
 
@@ -336,3 +338,63 @@ class TestInstanceGroupOrdering:
         assert job.preferred_instance_groups == [ig_inv, ig_org]
         job.job_template.instance_groups.add(ig_tmp)
         assert job.preferred_instance_groups == [ig_tmp, ig_inv, ig_org]
+
+
+@pytest.mark.django_db
+class TestCapacityLedger:
+    @pytest.fixture
+    def cluster(self, instance_factory, instance_group_factory, job_factory):
+        i1 = instance_factory("i1")
+        i2 = instance_factory("i2")
+        ig1 = instance_group_factory("ig1", instances=[i1])
+        ig2 = instance_group_factory("ig2", instances=[i1, i2])
+        for status, node, ig in [
+            ('running', 'i1', ig1),
+            ('waiting', 'i1', ig2),
+            ('running', 'i2', ig2),
+            ('successful', 'i2', ig2),
+            ('pending', '', ig1),
+        ]:
+            job = job_factory(initial_state=status)
+            job.execution_node = node
+            job.instance_group = ig
+            job.save()
+        return i1, i2, ig1, ig2
+
+    def test_matches_per_object_values(self, cluster):
+        i1, i2, ig1, ig2 = cluster
+        ledger = CapacityLedger()
+        for instance in (i1, i2):
+            expected = (instance.consumed_capacity, instance.jobs_running, instance.jobs_total)
+            ledger.attach([instance])
+            assert (instance.consumed_capacity, instance.jobs_running, instance.jobs_total) == expected
+        assert (i1.jobs_running, i1.jobs_total, i2.jobs_running, i2.jobs_total) == (2, 2, 1, 2)
+        for group in (ig1, ig2):
+            expected = (group.jobs_running, group.jobs_total)
+            ledger.attach([group])
+            assert (group.jobs_running, group.jobs_total) == expected
+        assert (ig1.jobs_running, ig1.jobs_total, ig2.jobs_running, ig2.jobs_total) == (1, 2, 2, 3)
+        assert ledger.discrepancies() == []
+
+    def test_stale_ledger_is_reported(self, cluster, job_factory):
+        i1, i2, ig1, ig2 = cluster
+        ledger = CapacityLedger()
+        job = job_factory(initial_state='running')
+        job.execution_node = 'i2'
+        job.save()
+        assert sorted((obj.hostname, attr) for obj, attr, recorded, actual in ledger.discrepancies()) == [
+            ('i2', 'consumed_capacity'),
+            ('i2', 'jobs_running'),
+            ('i2', 'jobs_total'),
+        ]
+
+    def test_instance_list_query_count(self, cluster, instance_factory, get, admin):
+        url = reverse('api:instance_list')
+        with CaptureQueriesContext(connection) as few:
+            get(url, user=admin, expect=200)
+        for i in range(10):
+            instance_factory("extra-{}".format(i))
+        with CaptureQueriesContext(connection) as many:
+            resp = get(url, user=admin, expect=200)
+        assert resp.data['count'] == 12
+        assert len(many.captured_queries) == len(few.captured_queries)
@@ -0,0 +1,61 @@
+from unittest import mock
+
+import pytest
+
+from django.db import connection
+from django.db.migrations.recorder import MigrationRecorder
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from awx.main.middleware import MigrationRanCheckMiddleware
+
+
+@pytest.fixture
+def middleware():
+    MigrationRanCheckMiddleware.migrated_marker = MigrationRanCheckMiddleware.not_migrated
+    return MigrationRanCheckMiddleware()
+
+
+def queries_per_request(middleware, path='/api/v2/ping/'):
+    request = RequestFactory().get(path)
+    with CaptureQueriesContext(connection) as context:
+        response = middleware.process_request(request)
+    return response, len(context.captured_queries)
+
+
+@pytest.mark.django_db
+def test_migrations_checked_once(middleware):
+    response, queries = queries_per_request(middleware)
+    assert response is None
+    assert queries > 1  # django_migrations
+    for i in range(3):
+        # only the django_migrations marker
+        assert queries_per_request(middleware) == (None, 1)
+
+
+@pytest.mark.django_db
+def test_migrations_checked_again_when_applied_elsewhere(middleware):
+    assert queries_per_request(middleware)[0] is None
+    assert queries_per_request(middleware) == (None, 1)
+
+    # another node recording a migration changes the shared marker
+    MigrationRecorder.Migration.objects.create(app='main', name='9999_applied_elsewhere')
+    with mock.patch('awx.main.middleware.MigrationExecutor.migration_plan', return_value=[]) as migration_plan:
+        assert queries_per_request(middleware)[0] is None
+        assert migration_plan.call_count == 1
+        assert queries_per_request(middleware) == (None, 1)
+        assert migration_plan.call_count == 1
+
+
+@pytest.mark.django_db
+def test_pending_migrations_redirect(middleware):
+    with mock.patch('awx.main.middleware.MigrationExecutor.migration_plan', return_value=[('main', 'migration')]):
+        for i in range(2):
+            response, queries = queries_per_request(middleware)
+            assert response.status_code == 302
+            assert response.url.endswith('/migrations_notran/')
+        assert queries_per_request(middleware, '/migrations_notran/')[0] is None
+
+    # checked again until nothing is pending
+    assert queries_per_request(middleware)[0] is None
+    assert queries_per_request(middleware) == (None, 1)
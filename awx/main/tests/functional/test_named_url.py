@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
 
 from django.core.exceptions import ImproperlyConfigured
@@ -225,3 +227,41 @@ def test_403_vs_404(get):
 
     get(f'/api/v2/users/{cindy.pk}/', expect=401)
     get('/api/v2/users/cindy/', expect=404)
+
+
+@pytest.mark.django_db
+def test_named_url_resolves_current_names(django_assert_num_queries):
+    test_org = Organization.objects.create(name='test_org')
+    test_inv = Inventory.objects.create(name='test_inv', organization=test_org)
+    url = '/api/v2/inventories/{}/'.format(test_inv.pk)
+    with django_assert_num_queries(1):
+        assert URLModificationMiddleware._convert_named_url('/api/v2/inventories/test_inv++test_org/') == url
+
+    test_org.name = 'renamed_org'
+    test_org.save()
+    assert URLModificationMiddleware._convert_named_url('/api/v2/inventories/test_inv++test_org/') == '/api/v2/inventories/0/'
+    assert URLModificationMiddleware._convert_named_url('/api/v2/inventories/test_inv++renamed_org/') == url
+
+    test_inv.delete()
+    assert URLModificationMiddleware._convert_named_url('/api/v2/inventories/test_inv++renamed_org/') == '/api/v2/inventories/0/'
+
+
+@pytest.mark.django_db
+def test_generate_named_url_threads():
+    test_org = Organization.objects.create(name='test_org')
+    hosts = []
+    for i in range(5):
+        test_inv = Inventory.objects.create(name='test_inv_{}'.format(i), organization=test_org)
+        hosts.append(Host.objects.create(name='test_host_{}'.format(i), inventory=test_inv))
+    node = settings.NAMED_URL_GRAPH[Host]
+    assert node.related_paths == ('inventory', 'inventory__organization')
+    # no queries from the threads
+    hosts = list(Host.objects.filter(pk__in=[host.pk for host in hosts]).select_related(*node.related_paths).order_by('name'))
+
+    def generate(host):
+        return [node.generate_named_url(host) for i in range(200)]
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        results = list(executor.map(generate, hosts))
+    for i, named_urls in enumerate(results):
+        assert set(named_urls) == {'test_host_{0}++test_inv_{0}++test_org'.format(i)}
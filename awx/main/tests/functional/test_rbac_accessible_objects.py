@@ -0,0 +1,101 @@
+import pytest
+from unittest import mock
+
+from django.db.models import F
+
+from awx.main.access import UnifiedJobAccess
+from awx.main.models import AccessibleObject, Inventory, JobTemplate, Organization
+from awx.main.models.rbac import AccessibleObjectsState
+
+
+def accessible(user, model):
+    return set(pk for (pk,) in model.materialized_accessible_pk_qs(user, 'read_role'))
+
+
+def expected(user, model):
+    return set(pk for (pk,) in model.accessible_pk_qs(user, 'read_role'))
+
+
+@pytest.mark.django_db
+class TestAccessibleObjects:
+    def test_matches_role_ancestry(self, inventory, rando):
+        other = Inventory.objects.create(name='other', organization=Organization.objects.create(name='other'))
+        inventory.organization.auditor_role.members.add(rando)
+        other.use_role.members.add(rando)
+        assert accessible(rando, Inventory) == expected(rando, Inventory) == {inventory.pk, other.pk}
+        assert AccessibleObject.objects.filter(user=rando).exists()
+
+    def test_set_is_reused(self, inventory, rando, django_assert_num_queries):
+        inventory.read_role.members.add(rando)
+        accessible(rando, Inventory)
+        with django_assert_num_queries(2):
+            # the state lookup and the list itself
+            accessible(rando, Inventory)
+
+    def test_membership_changes(self, inventory, rando):
+        assert accessible(rando, Inventory) == set()
+        inventory.admin_role.members.add(rando)
+        assert accessible(rando, Inventory) == {inventory.pk}
+        rando.roles.remove(inventory.admin_role)
+        assert accessible(rando, Inventory) == set()
+
+    def test_team_and_parent_changes(self, inventory, team, rando):
+        team.member_role.members.add(rando)
+        assert accessible(rando, Inventory) == set()
+        inventory.read_role.parents.add(team.member_role)
+        assert accessible(rando, Inventory) == {inventory.pk}
+        inventory.read_role.parents.remove(team.member_role)
+        assert accessible(rando, Inventory) == set()
+
+    def test_new_objects(self, organization, rando):
+        organization.admin_role.members.add(rando)
+        assert accessible(rando, JobTemplate) == set()
+        jt = JobTemplate.objects.create(name='new', organization=organization)
+        assert accessible(rando, JobTemplate) == {jt.pk}
+
+    def test_rebuild_keeps_accessible_rows(self, inventory, rando):
+        other = Inventory.objects.create(name='other', organization=inventory.organization)
+        inventory.read_role.members.add(rando)
+        other.read_role.members.add(rando)
+        assert accessible(rando, Inventory) == {inventory.pk, other.pk}
+        kept = AccessibleObject.objects.get(user=rando, object_id=inventory.pk).pk
+        other.read_role.members.remove(rando)
+        assert accessible(rando, Inventory) == {inventory.pk}
+        assert AccessibleObject.objects.get(user=rando, object_id=inventory.pk).pk == kept
+
+    def test_lost_access_invalidates_holders_only(self, inventory, rando, alice):
+        other = Inventory.objects.create(name='other', organization=inventory.organization)
+        inventory.read_role.members.add(rando)
+        other.read_role.members.add(alice)
+        accessible(rando, Inventory)
+        accessible(alice, Inventory)
+        AccessibleObject.invalidate_roles([inventory.read_role.id, inventory.admin_role.id])
+        assert not AccessibleObjectsState.objects.get(user=rando).is_current()
+        assert AccessibleObjectsState.objects.get(user=alice).is_current()
+
+    def test_invalidated_while_building(self, inventory, rando):
+        inventory.read_role.members.add(rando)
+        real_filter = AccessibleObjectsState.objects.filter
+
+        def invalidate_then_filter(*args, **kwargs):
+            # a role change committed after the set was computed
+            real_filter(user=rando).update(generation=F('generation') + 1)
+            return real_filter(*args, **kwargs)
+
+        with mock.patch.object(AccessibleObjectsState.objects, 'filter', side_effect=invalidate_then_filter):
+            AccessibleObject.build(rando)
+        assert not AccessibleObjectsState.objects.get(user=rando).is_current()
+
+    def test_disabled(self, inventory, rando, settings):
+        settings.AWX_MATERIALIZE_ACCESSIBLE_OBJECTS = False
+        inventory.read_role.members.add(rando)
+        assert accessible(rando, Inventory) == {inventory.pk}
+        assert not AccessibleObject.objects.filter(user=rando).exists()
+
+    def test_unified_job_list(self, job_template_factory, rando):
+        objects = job_template_factory('jt', organization='org1', project='prj', inventory='inv', credential='cred')
+        job = objects.job_template.create_unified_job()
+        access = UnifiedJobAccess(rando)
+        assert not access.get_queryset().filter(pk=job.pk).exists()
+        objects.job_template.read_role.members.add(rando)
+        assert access.get_queryset().filter(pk=job.pk).exists()
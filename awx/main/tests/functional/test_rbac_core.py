@@ -1,5 +1,8 @@
 import pytest
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
 from awx.main.models import (
     Role,
     Organization,
@@ -211,3 +214,52 @@ def test_update_parents_keeps_teams(team, project):
     assert team.member_role in project.update_role  # test prep sanity check
     update_role_parentage_for_instance(project)
     assert team.member_role in project.update_role  # actual assertion
+
+
+@pytest.mark.django_db
+def test_incremental_ancestry_matches_full_rebuild():
+    A, B, C, D, E = [Role.objects.create() for i in range(5)]
+    assert Role.verify_role_ancestor_list() == ([], [])
+
+    B.parents.add(A)
+    C.parents.add(B)
+    D.parents.add(C)
+    E.parents.add(A)
+    assert Role.verify_role_ancestor_list() == ([], [])
+    assert A.ancestors.count() == 1
+    assert set(D.ancestors.all()) == {A, B, C, D}
+
+    # loops
+    A.parents.add(D)
+    assert Role.verify_role_ancestor_list() == ([], [])
+    assert set(E.ancestors.all()) == {A, B, C, D, E}
+    C.parents.remove(B)
+    assert Role.verify_role_ancestor_list() == ([], [])
+    assert set(B.ancestors.all()) == {A, B, C, D}
+    assert set(E.ancestors.all()) == {A, C, D, E}
+    A.parents.remove(D)
+    assert Role.verify_role_ancestor_list() == ([], [])
+    assert set(B.ancestors.all()) == {A, B}
+    assert set(D.ancestors.all()) == {C, D}
+
+
+@pytest.mark.django_db
+def test_ancestry_rebuild_keeps_temporary_tables():
+    A, B, C = [Role.objects.create() for i in range(3)]
+    with CaptureQueriesContext(connection) as context:
+        B.parents.add(A)
+        C.parents.add(B)
+    assert not [q for q in context.captured_queries if 'DROP TABLE' in q['sql']]
+    assert set(C.ancestors.all()) == {A, B, C}
+
+
+@pytest.mark.django_db
+def test_verify_role_ancestry(organization):
+    entry = Role.ancestors.through.objects.filter(descendent=organization.member_role, ancestor=organization.admin_role)
+    entry.delete()
+    missing, extra = Role.verify_role_ancestor_list()
+    assert missing == [(organization.member_role.id, organization.admin_role.id)]
+    assert extra == []
+
+    Role.rebuild_role_ancestor_list([organization.member_role.id], [])
+    assert Role.verify_role_ancestor_list() == ([], [])
@@ -0,0 +1,174 @@
+import json
+import threading
+import concurrent.futures
+from queue import Empty as QueueEmpty
+from unittest import mock
+
+import pytest
+
+from awx.main.dispatch.cancel import CancelListener, cancel_channel, cancel_notification_job_id
+from awx.main.dispatch.pool import StatefulPoolWorker, WorkerPool
+from awx.main.tasks import AWXReceptorJob
+
+
+class FakeTask(object):
+    def __init__(self, pk):
+        self.instance = mock.Mock(pk=pk)
+        self.queries = 0
+        self.cancel_flag = False
+
+    def cancel_callback(self):
+        # stands in for the SELECT done by BaseTask.update_model
+        self.queries += 1
+        return self.cancel_flag
+
+
+class FakeWakeup(threading.Event):
+    """
+    Returned to the watcher by the listener; waiting advances the clock and
+    runs the next step of the test instead of sleeping.
+    """
+
+    def __init__(self, clock, steps):
+        super(FakeWakeup, self).__init__()
+        self.clock = clock
+        self.steps = steps
+        self.timeouts = []
+
+    def wait(self, timeout=None):
+        self.timeouts.append(timeout)
+        self.clock[0] += timeout
+        if self.steps:
+            self.steps.pop(0)()
+        return self.is_set()
+
+
+class FakeQueue(object):
+    def __init__(self, items, when_empty):
+        self.items = items
+        self.when_empty = when_empty
+
+    def get(self, timeout=None):
+        if self.items:
+            return self.items.pop(0)
+        self.when_empty()
+        raise QueueEmpty()
+
+
+@pytest.fixture
+def listener():
+    listener = CancelListener()
+    listener.queue = FakeQueue([], lambda: None)
+    with mock.patch.object(CancelListener, 'ensure_running'), mock.patch('awx.main.tasks.cancel_listener', listener):
+        yield listener
+
+
+def run_watcher(listener, steps, settings):
+    """
+    Run the cancel watcher of a job in this thread; `steps` are called, in
+    order, each time the watcher waits.
+    """
+    settings.AWX_CANCEL_POLL_INTERVAL = 30
+    clock = [0]
+    job = AWXReceptorJob(None)
+    job.task = FakeTask(1)
+    processor_future = concurrent.futures.Future()
+
+    def register(unified_job_id):
+        job.wakeup = FakeWakeup(clock, [lambda step=step: step(job, processor_future) for step in steps])
+        listener.watchers.setdefault(unified_job_id, set()).add(job.wakeup)
+        return job.wakeup
+
+    with mock.patch.object(listener, 'register', side_effect=register), mock.patch('awx.main.tasks.time.monotonic', side_effect=lambda: clock[0]):
+        result = AWXReceptorJob.cancel_watcher.__wrapped__(job, processor_future)
+    return job, result
+
+
+def finish(job, processor_future):
+    processor_future.set_result(mock.Mock(status='successful'))
+
+
+def test_cancel_channel_fits_in_an_identifier():
+    assert cancel_channel('awx-1') == 'awx_cancel_awx-1'
+    assert len(cancel_channel('x' * 100)) == 63
+
+
+def test_malformed_notifications_are_ignored():
+    assert cancel_notification_job_id('not json') is None
+    assert cancel_notification_job_id(json.dumps({'pk': 1})) is None
+    assert cancel_notification_job_id(json.dumps({'id': 1})) == 1
+
+
+def test_wake_only_wakes_the_watchers_of_the_job(listener):
+    first, second = listener.register(1), listener.register(2)
+    listener.wake(2)
+    assert not first.is_set()
+    assert second.is_set()
+    listener.wake()
+    assert first.is_set()
+
+
+def test_run_wakes_forwarded_jobs_until_no_watcher_is_left(listener):
+    first, second = listener.register(1), listener.register(2)
+    listener.thread = mock.Mock()
+
+    def unregister():
+        listener.unregister(1, first)
+        listener.unregister(2, second)
+
+    listener.queue = FakeQueue([2, 3], unregister)
+    listener.run()
+    assert not first.is_set()
+    assert second.is_set()
+    assert listener.thread is None
+    assert listener.connected
+
+
+def test_run_falls_back_to_polling_on_failure(listener):
+    wakeup = listener.register(1)
+    listener.queue = mock.Mock(get=mock.Mock(side_effect=OSError))
+    listener.run()
+    assert wakeup.is_set()
+    assert not listener.connected
+
+
+def test_cancel_is_pushed_without_polling(listener, settings):
+    def cancel(job, processor_future):
+        job.task.cancel_flag = True
+        listener.wake(job.task.instance.pk)
+
+    job, result = run_watcher(listener, [cancel], settings)
+    assert result.status == 'canceled'
+    # the check done on start and the one the wakeup asked for
+    assert job.task.queries == 2
+    assert job.wakeup.timeouts == [30]
+    assert listener.watchers == {}
+
+
+def test_spurious_wakeup_does_not_cancel(listener, settings):
+    def wake(job, processor_future):
+        listener.wake(job.task.instance.pk)
+
+    job, result = run_watcher(listener, [wake, finish], settings)
+    assert result.status == 'successful'
+    assert job.task.queries == 2
+
+
+def test_watchers_poll_every_second_without_listener(listener, settings):
+    listener.queue = None
+    job, result = run_watcher(listener, [lambda *args: None, lambda *args: None, finish], settings)
+    assert result.status == 'successful'
+    assert job.task.queries == 3
+    assert job.wakeup.timeouts == [1, 1, 1]
+
+
+def test_pool_forwards_cancels_to_the_worker_running_the_job():
+    pool = WorkerPool(min_workers=1)
+    pool.workers = [StatefulPoolWorker(1000, lambda: None, (idx,)) for idx in range(2)]
+    pool.workers[0].managed_tasks['a'] = dict(uuid='a', task='awx.main.tasks.RunJob', args=[7])
+    pool.workers[1].managed_tasks['b'] = dict(uuid='b', task='awx.main.tasks.RunJob', args=[8])
+    pool.forward_cancel(8)
+    assert pool.workers[1].cancels.get(timeout=5) == 8
+    assert pool.workers[0].cancels.empty()
+    pool.forward_cancel(None)
+    assert [w.cancels.get(timeout=5) for w in pool.workers] == [None, None]
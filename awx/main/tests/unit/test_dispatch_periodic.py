@@ -0,0 +1,154 @@
+from contextlib import contextmanager
+from datetime import timedelta
+from unittest import mock
+
+import pytest
+
+from awx.main.dispatch import periodic
+from awx.main.dispatch.periodic import Scheduler, finished, running_key
+
+
+class FakeRedis(object):
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if key in self.expires and self.expires[key] <= periodic.time.time():
+            self.delete(key)
+        if nx and key in self.data:
+            return None
+        self.data[key] = value
+        if ex is not None:
+            self.expires[key] = periodic.time.time() + ex
+        return True
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+
+
+@pytest.fixture
+def conn():
+    return FakeRedis()
+
+
+@pytest.fixture(autouse=True)
+def broker(conn):
+    with mock.patch('awx.main.dispatch.periodic.redis.Redis.from_url', return_value=conn):
+        yield
+
+
+@pytest.fixture
+def clock():
+    with mock.patch('awx.main.dispatch.periodic.time') as time:
+        time.time.return_value = 1000.0
+        yield time
+
+
+@pytest.fixture
+def gauges():
+    with mock.patch('awx.main.analytics.subsystem_metrics.set_local_gauges') as set_local_gauges:
+        yield set_local_gauges
+
+
+def scheduler(**entries):
+    s = Scheduler()
+    for name, entry in entries.items():
+        s.add(name, dict(entry, task='awx.main.tasks.cluster_node_heartbeat'))
+        s.tasks[-1].task = mock.Mock()
+    return s
+
+
+@pytest.fixture(autouse=True)
+def node(settings):
+    settings.CLUSTER_HOST_ID = 'awx-1'
+    settings.DISPATCHER_PERIODIC_RUNNING_INTERVALS = 3
+
+
+def published(s):
+    return dict((task.name, task.task.apply_async.call_count) for task in s.tasks)
+
+
+def test_runs_do_not_drift(conn, clock, gauges):
+    s = scheduler(heartbeat={'schedule': timedelta(seconds=10)})
+    for now in (1009.0, 1012.5, 1021.0, 1025.0, 1047.0):
+        clock.time.return_value = now
+        s.run_pending(conn)
+        finished('heartbeat')
+    # due at 1010, 1020, 1030 and 1050; 1040 is missed, not made up
+    assert published(s) == {'heartbeat': 3}
+    assert s.tasks[0].due == 1050.0
+    lags = [c[0][0]['periodic_heartbeat_lag_seconds'] for c in gauges.call_args_list]
+    assert lags == [2.5, 1.0, 17.0]
+
+
+def test_skipped_while_previous_run_has_not_finished(conn, clock, gauges):
+    s = scheduler(heartbeat={'schedule': timedelta(seconds=10)})
+    with mock.patch('awx.main.analytics.subsystem_metrics.add_local_counters') as add_local_counters:
+        for now in (1010.0, 1020.0):
+            clock.time.return_value = now
+            s.run_pending(conn)
+        assert published(s) == {'heartbeat': 1}
+        add_local_counters.assert_called_once_with({'periodic_tasks_skipped': 1})
+
+    finished('heartbeat')
+    clock.time.return_value = 1030.0
+    s.run_pending(conn)
+    assert published(s) == {'heartbeat': 2}
+
+
+def test_run_carries_its_periodic_name(conn, clock, gauges):
+    s = scheduler(heartbeat={'schedule': timedelta(seconds=10)})
+    clock.time.return_value = 1010.0
+    s.run_pending(conn)
+    kwargs = s.tasks[0].task.apply_async.call_args[1]
+    assert kwargs['periodic'] == 'heartbeat'
+    assert conn.data[running_key('heartbeat')] == kwargs['uuid']
+
+
+def test_cluster_tasks_run_on_the_leader_only(conn, clock, gauges):
+    entries = dict(heartbeat={'schedule': timedelta(seconds=10)}, task_manager={'schedule': timedelta(seconds=10), 'cluster': True})
+    s = scheduler(**entries)
+    clock.time.return_value = 1010.0
+    with mock.patch('awx.main.dispatch.periodic.PeriodicTaskLease.acquire', return_value=False) as acquire:
+        s.run_pending(conn)
+    acquire.assert_called_once_with('task_manager', 'awx-1', 21.0)
+    assert published(s) == {'heartbeat': 1, 'task_manager': 0}
+    assert running_key('task_manager') not in conn.data
+
+
+def test_lease_is_not_renewed_while_skipping(conn, clock, gauges):
+    s = scheduler(task_manager={'schedule': timedelta(seconds=10), 'cluster': True})
+    with mock.patch('awx.main.dispatch.periodic.PeriodicTaskLease.acquire', return_value=True) as acquire:
+        for now in (1010.0, 1020.0):
+            clock.time.return_value = now
+            s.run_pending(conn)
+    # the run published at 1010 is still running, another node may take over
+    assert acquire.call_count == 1
+    assert published(s) == {'task_manager': 1}
+
+
+def test_run_that_never_finishes_blocks_a_few_intervals(conn, clock, gauges):
+    s = scheduler(heartbeat={'schedule': timedelta(seconds=10)})
+    # the message published at 1010 is lost with its worker
+    for now in (1010.0, 1020.0, 1030.0, 1040.0):
+        clock.time.return_value = now
+        s.run_pending(conn)
+    assert published(s) == {'heartbeat': 2}
+
+
+@contextmanager
+def failing_batch():
+    yield
+    raise RuntimeError('could not notify')
+
+
+def test_markers_are_released_when_publishing_fails(conn, clock, gauges):
+    s = scheduler(heartbeat={'schedule': timedelta(seconds=10)})
+    clock.time.return_value = 1010.0
+    with mock.patch.object(periodic.publisher, 'batch', failing_batch):
+        with pytest.raises(RuntimeError):
+            s.run_pending(conn)
+    assert running_key('heartbeat') not in conn.data
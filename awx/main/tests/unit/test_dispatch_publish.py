@@ -0,0 +1,124 @@
+import os
+import threading
+from unittest import mock
+
+import psycopg2
+import pytest
+
+from awx.main.dispatch.publish import NotifyPublisher
+
+
+class FakeCursor(object):
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, sql, params):
+        if self.conn.broken:
+            self.conn.closed = 2
+            raise psycopg2.OperationalError('server closed the connection unexpectedly')
+        self.conn.executed.append((sql, params))
+
+
+class FakeConnection(object):
+    def __init__(self):
+        self.closed = 0
+        self.broken = False
+        self.executed = []
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        self.closed = 1
+
+
+@pytest.fixture
+def connections():
+    return []
+
+
+@pytest.fixture
+def publisher(connections):
+    def connect():
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    return NotifyPublisher(connect=connect)
+
+
+def test_connection_is_reused(publisher, connections):
+    for i in range(5):
+        publisher.notify('tower', str(i))
+    assert len(connections) == 1
+    assert [params for sql, params in connections[0].executed] == [['tower', str(i)] for i in range(5)]
+
+
+def test_dropped_connection_is_replaced(publisher, connections):
+    publisher.notify('tower', 'one')
+    connections[0].broken = True
+    publisher.notify('tower', 'two')
+    assert len(connections) == 2
+    assert connections[0].closed
+    assert connections[1].executed == [('SELECT pg_notify(%s, %s);', ['tower', 'two'])]
+
+
+def test_connection_closed_while_idle_is_replaced(publisher, connections):
+    publisher.notify('tower', 'one')
+    connections[0].closed = 2
+    publisher.notify('tower', 'two')
+    assert len(connections) == 2
+    assert connections[1].executed == [('SELECT pg_notify(%s, %s);', ['tower', 'two'])]
+
+
+def test_error_is_raised_when_reconnecting_does_not_help(publisher, connections):
+    def connect():
+        connections.append(FakeConnection())
+        connections[-1].broken = True
+        return connections[-1]
+
+    publisher.connect = connect
+    with pytest.raises(psycopg2.OperationalError):
+        publisher.notify('tower', 'one')
+    assert len(connections) == 2
+    assert publisher.conn is None
+
+
+def test_inherited_connection_is_not_used_or_closed(publisher, connections):
+    publisher.notify('tower', 'one')
+    with mock.patch('awx.main.dispatch.publish.os.getpid', return_value=os.getpid() + 1):
+        publisher.notify('tower', 'two')
+    assert len(connections) == 2
+    assert not connections[0].closed
+    assert len(connections[0].executed) == 1
+    assert connections[1].executed == [('SELECT pg_notify(%s, %s);', ['tower', 'two'])]
+
+
+def test_batch_sends_one_statement(publisher, connections):
+    with publisher.batch():
+        publisher.notify('tower', 'one')
+        with publisher.batch():
+            publisher.notify('awx-1', 'two')
+        assert connections == []
+    assert connections[0].executed == [('SELECT pg_notify(%s, %s), pg_notify(%s, %s);', ['tower', 'one', 'awx-1', 'two'])]
+
+
+def test_batch_is_split(publisher, connections):
+    publisher.max_batch_size = 2
+    with publisher.batch():
+        for i in range(5):
+            publisher.notify('tower', str(i))
+    assert [len(params) // 2 for sql, params in connections[0].executed] == [2, 2, 1]
+
+
+def test_batch_is_per_thread(publisher, connections):
+    with publisher.batch():
+        t = threading.Thread(target=publisher.notify, args=('tower', 'other thread'))
+        t.start()
+        t.join()
+        assert connections[0].executed == [('SELECT pg_notify(%s, %s);', ['tower', 'other thread'])]
@@ -0,0 +1,60 @@
+import json
+import time
+from unittest import mock
+
+import pytest
+
+from awx.main.queue import CallbackQueueDispatcher
+
+
+class FakeRedis(object):
+    def __init__(self):
+        self.pushes = []
+
+    def rpush(self, queue, *values):
+        self.pushes.append([json.loads(v) for v in values])
+
+
+@pytest.fixture
+def dispatcher(settings):
+    settings.CALLBACK_QUEUE_BATCH_SIZE = 3
+    settings.CALLBACK_QUEUE_BATCH_MAX_AGE = 60
+    with mock.patch('awx.main.queue.s_metrics.Metrics'):
+        dispatcher = CallbackQueueDispatcher()
+    dispatcher.connection = FakeRedis()
+    yield dispatcher
+    if dispatcher.timer:
+        dispatcher.timer.cancel()
+
+
+def test_events_are_pushed_in_batches(dispatcher):
+    for counter in range(7):
+        dispatcher.dispatch({'counter': counter})
+    assert [[e['counter'] for e in push] for push in dispatcher.connection.pushes] == [[0, 1, 2], [3, 4, 5]]
+    dispatcher.flush()
+    assert [e['counter'] for e in dispatcher.connection.pushes[-1]] == [6]
+
+
+@pytest.mark.parametrize('event', ['EOF', 'playbook_on_stats'])
+def test_final_events_flush_everything_in_order(dispatcher, event):
+    dispatcher.dispatch({'counter': 1})
+    dispatcher.dispatch({'event': event})
+    assert dispatcher.connection.pushes == [[{'counter': 1}, {'event': event}]]
+    assert dispatcher.buffer == []
+
+
+def test_old_events_are_flushed_without_new_events(dispatcher):
+    dispatcher.max_age = 0.05
+    dispatcher.dispatch({'counter': 1})
+    assert dispatcher.connection.pushes == []
+    time.sleep(0.5)
+    assert dispatcher.connection.pushes == [[{'counter': 1}]]
+
+
+def test_failed_push_is_retried(dispatcher):
+    dispatcher.connection.rpush = mock.Mock(side_effect=ConnectionError)
+    with pytest.raises(ConnectionError):
+        dispatcher.dispatch({'event': 'EOF'})
+    dispatcher.connection = FakeRedis()
+    dispatcher.flush()
+    assert dispatcher.connection.pushes == [[{'event': 'EOF'}]]
@@ -0,0 +1,87 @@
+import json
+
+from awx.main.wsbroadcast import (
+    BroadcastMessageBuffer,
+    GroupRateLimiter,
+    decode_broadcast_frame,
+    encode_broadcast_batch,
+    wrap_broadcast_msg,
+)
+
+
+def test_batch_round_trip():
+    messages = [('job_events-1', json.dumps({'stdout': 'a\nb\tc'})), ('jobs-status_changed', '{"status": "running"}')]
+    assert decode_broadcast_frame(encode_broadcast_batch(messages)) == messages
+
+
+def test_decode_wrapped_message():
+    assert decode_broadcast_frame(wrap_broadcast_msg('metrics', '{"x": 1}')) == [('metrics', '{"x": 1}')]
+
+
+def test_rate_limiter():
+    limiter = GroupRateLimiter(2)
+    assert limiter.allow('a', now=0)
+    assert limiter.allow('a', now=0)
+    assert not limiter.allow('a', now=0)
+    # other groups have their own budget
+    assert limiter.allow('b', now=0)
+    # half a second refills one token
+    assert limiter.allow('a', now=0.5)
+    assert not limiter.allow('a', now=0.5)
+
+
+def test_rate_limiter_disabled():
+    limiter = GroupRateLimiter(0)
+    assert all(limiter.allow('a', now=0) for i in range(1000))
+
+
+def test_buffer_coalesces_groups():
+    buffer = BroadcastMessageBuffer(rate_limit=0, max_messages=10)
+    buffer.add('job_events-1', '{"counter": 1}')
+    buffer.add('job_events-2', '{"counter": 1}')
+    buffer.add('job_events-1', '{"counter": 2}')
+    frames = buffer.drain()
+    assert len(frames) == 1
+    assert decode_broadcast_frame(frames[0]) == [
+        ('job_events-1', '{"counter": 1}'),
+        ('job_events-2', '{"counter": 1}'),
+        ('job_events-1', '{"counter": 2}'),
+    ]
+    assert buffer.drain() == []
+
+
+def test_buffer_drops_only_droppable_messages():
+    buffer = BroadcastMessageBuffer(rate_limit=1, max_messages=10)
+    buffer.add('job_events-1', '{"counter": 1}', droppable=True)
+    buffer.add('job_events-1', '{"counter": 2}', droppable=True)
+    buffer.add('job_events-1', '{"event": "playbook_on_stats"}')
+    assert buffer.size == 2
+    frames = buffer.drain()
+    assert [m for g, m in decode_broadcast_frame(frames[0])] == ['{"counter": 1}', '{"event": "playbook_on_stats"}']
+    assert buffer.pop_counters() == {
+        'broadcast_websocket_messages_sent': 2,
+        'broadcast_websocket_frames_sent': 1,
+        'broadcast_websocket_messages_dropped': 1,
+    }
+
+
+def test_buffer_full():
+    buffer = BroadcastMessageBuffer(rate_limit=0, max_messages=2)
+    buffer.add('a', '{}')
+    assert not buffer.full
+    buffer.add('b', '{}')
+    assert buffer.full
+
+
+def test_buffer_keeps_insertion_order():
+    buffer = BroadcastMessageBuffer(rate_limit=0, max_messages=10)
+    buffer.add('jobs-1', '{"counter": 1}')
+    buffer.add('other', '{"x": 1}')
+    buffer.add('jobs-1', '{"status":\n"successful"}')
+    buffer.add('jobs-1', '{"counter": 2}')
+    frames = buffer.drain()
+    assert [decode_broadcast_frame(frame) for frame in frames] == [
+        [('jobs-1', '{"counter": 1}'), ('other', '{"x": 1}')],
+        [('jobs-1', '{"status":\n"successful"}')],
+        [('jobs-1', '{"counter": 2}')],
+    ]
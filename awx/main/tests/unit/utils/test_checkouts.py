@@ -0,0 +1,110 @@
+import errno
+import fcntl
+import os
+from unittest import mock
+
+import pytest
+
+from awx.main.utils.checkouts import CheckoutStore, TreeCopier
+
+
+def make_tree(path):
+    os.makedirs(os.path.join(path, 'roles', 'common'))
+    with open(os.path.join(path, 'site.yml'), 'w') as f:
+        f.write('- hosts: all\n')
+    with open(os.path.join(path, 'roles', 'common', 'main.yml'), 'w') as f:
+        f.write('- debug: msg=hello\n')
+    os.symlink('site.yml', os.path.join(path, 'playbook.yml'))
+
+
+@pytest.fixture
+def populate():
+    calls = []
+
+    def populate(path):
+        calls.append(path)
+        make_tree(path)
+
+    populate.calls = calls
+    return populate
+
+
+def test_revision_is_populated_once(tmp_path, populate):
+    store = CheckoutStore(path=str(tmp_path / 'store'), keep=3, mode='copy')
+    for i in range(4):
+        store.checkout('_1__demo', 'abc123', str(tmp_path / 'job_{}'.format(i)), populate)
+    assert len(populate.calls) == 1
+    for i in range(4):
+        dest = tmp_path / 'job_{}'.format(i)
+        assert (dest / 'roles' / 'common' / 'main.yml').read_text() == '- debug: msg=hello\n'
+        assert os.readlink(str(dest / 'playbook.yml')) == 'site.yml'
+
+
+@pytest.mark.parametrize('mode', ['reflink', 'copy'])
+def test_jobs_are_isolated(tmp_path, populate, mode):
+    store = CheckoutStore(path=str(tmp_path / 'store'), keep=3, mode=mode)
+    store.checkout('_1__demo', 'abc123', str(tmp_path / 'job_1'), populate)
+    (tmp_path / 'job_1' / 'site.yml').write_text('changed by a job')
+    store.checkout('_1__demo', 'abc123', str(tmp_path / 'job_2'), populate)
+    assert (tmp_path / 'job_2' / 'site.yml').read_text() == '- hosts: all\n'
+
+
+def test_hardlink_shares_files(tmp_path, populate):
+    store = CheckoutStore(path=str(tmp_path / 'store'), keep=3, mode='hardlink')
+    copier = store.checkout('_1__demo', 'abc123', str(tmp_path / 'job_1'), populate)
+    assert copier.linked == 2
+    assert os.path.samefile(str(tmp_path / 'job_1' / 'site.yml'), os.path.join(store.checkout_path('_1__demo', 'abc123'), 'site.yml'))
+
+
+def test_failed_links_fall_back_to_copies(tmp_path, populate):
+    make_tree(str(tmp_path / 'src'))
+    copier = TreeCopier('hardlink')
+    with mock.patch('awx.main.utils.checkouts.os.link', side_effect=OSError(errno.EXDEV, 'Invalid cross-device link')):
+        copier.copy_tree(str(tmp_path / 'src'), str(tmp_path / 'dst'))
+    assert (copier.linked, copier.copied) == (0, 2)
+    assert (tmp_path / 'dst' / 'site.yml').read_text() == '- hosts: all\n'
+
+
+def test_least_recently_used_checkouts_are_evicted(tmp_path, populate):
+    store = CheckoutStore(path=str(tmp_path / 'store'), keep=2, mode='copy')
+    for i, revision in enumerate(['one', 'two', 'one', 'three']):
+        store.checkout('_1__demo', revision, str(tmp_path / 'job_{}'.format(i)), populate)
+        # mtime resolution is too coarse to order checkouts made this quickly
+        os.utime(store.checkout_path('_1__demo', revision), (i, i))
+    store.checkout('_2__other', 'one', str(tmp_path / 'job_other'), populate)
+    assert sorted(os.listdir(store.path)) == ['_1__demo.lock', '_1__demo_one', '_1__demo_three', '_2__other.lock', '_2__other_one']
+
+
+def test_checkouts_in_use_are_not_evicted(tmp_path, populate):
+    store = CheckoutStore(path=str(tmp_path / 'store'), keep=1, mode='copy')
+    store.checkout('_1__demo', 'one', str(tmp_path / 'job_1'), populate)
+    with store.lock('_1__demo', shared=True):
+        store.evict('_1__demo')
+    assert os.path.isdir(store.checkout_path('_1__demo', 'one'))
+    store.evict('_1__demo')
+    assert os.listdir(store.path) == []
+
+
+def test_lock_removed_while_waiting_is_reopened(tmp_path, populate):
+    store = CheckoutStore(path=str(tmp_path / 'store'), keep=1, mode='copy')
+    store.checkout('_1__demo', 'one', str(tmp_path / 'job_1'), populate)
+    flock = fcntl.flock
+    calls = []
+
+    def evicted_while_waiting(fd, flags):
+        calls.append(fd)
+        if len(calls) == 1:
+            # another process evicts the project, lock file included,
+            # between this one opening the lock file and locking it
+            store.evict('_1__demo')
+        return flock(fd, flags)
+
+    with mock.patch('awx.main.utils.checkouts.fcntl.flock', side_effect=evicted_while_waiting):
+        with store.lock('_1__demo', shared=True) as acquired:
+            assert acquired
+            assert len(calls) == 3  # the removed file, evict(), the new file
+            assert os.path.exists(store.lock_path('_1__demo'))
+            # the lock held is the one on the file other processes open
+            with mock.patch('awx.main.utils.checkouts.fcntl.flock', side_effect=flock):
+                with store.lock('_1__demo', blocking=False) as exclusive:
+                    assert not exclusive
@@ -138,13 +138,15 @@ def memoized_function(mocker, mock_cache):
 
 def test_memoize_track_function(memoized_function, mock_cache):
     assert memoized_function('scott', 'scotterson') == 'scotterson'
-    assert mock_cache.get('myfunction') == {u'scott-scotterson': 'scotterson'}
+    generation = mock_cache.get('myfunction')
+    assert mock_cache.get('myfunction-{}-scott-scotterson'.format(generation)) == 'scotterson'
     assert memoized_function('scott', 'scotterson') == 'scotterson'
 
     assert memoized_function.calls['scott'] == 1
 
     assert memoized_function('john', 'smith') == 'smith'
-    assert mock_cache.get('myfunction') == {u'scott-scotterson': 'scotterson', u'john-smith': 'smith'}
+    assert mock_cache.get('myfunction-{}-john-smith'.format(generation)) == 'smith'
+    assert mock_cache.get('myfunction-{}-scott-scotterson'.format(generation)) == 'scotterson'
     assert memoized_function('john', 'smith') == 'smith'
 
     assert memoized_function.calls['john'] == 1
@@ -155,9 +157,9 @@ def test_memoize_delete(memoized_function, mock_cache):
     assert memoized_function('john', 'smith') == 'smith'
     assert memoized_function.calls['john'] == 1
 
-    assert mock_cache.get('myfunction') == {u'john-smith': 'smith'}
+    assert mock_cache.get('myfunction') is not None
 
-    with mock.patch('awx.main.utils.common.memoize_delete', side_effect=mock_cache.delete):
+    with mock.patch('awx.main.utils.common.get_memoize_cache', return_value=mock_cache):
         common.memoize_delete('myfunction')
 
     assert mock_cache.get('myfunction') is None
@@ -166,6 +168,104 @@ def test_memoize_delete(memoized_function, mock_cache):
     assert memoized_function.calls['john'] == 2
 
 
+def test_memoize_local_tier(memoized_function, mock_cache):
+    assert memoized_function('john', 'smith') == 'smith'
+    # wiping the shared cache does not matter while the local entry is valid
+    mock_cache.cache.clear()
+    assert memoized_function('john', 'smith') == 'smith'
+    assert memoized_function.calls['john'] == 1
+
+    common._memoize_local_cache.clear()
+    assert memoized_function('john', 'smith') == 'smith called 2 times'
+
+
+def test_memoize_shared_tier(memoized_function, mock_cache):
+    assert memoized_function('john', 'smith') == 'smith'
+    # another process has the value in the shared cache
+    common._memoize_local_cache.clear()
+    assert memoized_function('john', 'smith') == 'smith'
+    assert memoized_function.calls['john'] == 1
+
+
+def test_memoize_waits_for_recompute(mock_cache):
+    calls = []
+
+    @common.memoize(cache=mock_cache, cache_key='slow')
+    def slow():
+        calls.append(1)
+        return 'computed'
+
+    # another process holds the recompute lock and stores the value
+    mock_cache.add('slow-lock', 1)
+
+    def sleep(seconds):
+        mock_cache.set('slow', 'from-other-process')
+
+    with mock.patch('awx.main.utils.common.time.sleep', side_effect=sleep):
+        assert slow() == 'from-other-process'
+    assert calls == []
+
+
+def test_memoize_computes_when_lock_is_released_without_value(mock_cache):
+    @common.memoize(cache=mock_cache, cache_key='failing')
+    def failing():
+        return 'computed'
+
+    mock_cache.add('failing-lock', 1)
+
+    def sleep(seconds):
+        # the process holding the lock failed
+        mock_cache.delete('failing-lock')
+
+    with mock.patch('awx.main.utils.common.time.sleep', side_effect=sleep) as slept:
+        assert failing() == 'computed'
+    assert slept.call_count == 1
+    assert mock_cache.get('failing-lock') is None
+
+
+def test_memoize_returns_copies(mock_cache):
+    @common.memoize(cache=mock_cache, cache_key='mutable')
+    def mutable():
+        return {'a': [1]}
+
+    mutable()['a'].append(2)
+    value = mutable()
+    assert value == {'a': [1]}
+    value['b'] = 1
+    assert mutable() == {'a': [1]}
+
+
+def test_memoize_without_stats(mock_cache):
+    @common.memoize(cache=mock_cache, cache_key='quiet', record_stats=False)
+    def quiet():
+        return 1
+
+    before = common._memoize_stats.snapshot()
+    assert quiet() == quiet() == 1
+    assert common._memoize_stats.snapshot() == before
+
+
+def test_local_memoize_cache_is_bounded():
+    local = common.LocalMemoizeCache(maxsize=2)
+    local.set(('a', ''), 1, 60)
+    local.set(('b', ''), 2, 60)
+    assert local.get(('a', '')) == (True, 1)
+    local.set(('c', ''), 3, 60)
+    # 'b' was the least recently used entry
+    assert local.get(('b', '')) == (False, None)
+    assert local.get(('a', '')) == (True, 1)
+    assert local.get(('c', '')) == (True, 3)
+    assert len(local) == 2
+
+
+def test_local_memoize_cache_expires():
+    local = common.LocalMemoizeCache(maxsize=2)
+    with mock.patch('awx.main.utils.common.time.monotonic', return_value=100):
+        local.set(('a', ''), 1, 10)
+    with mock.patch('awx.main.utils.common.time.monotonic', return_value=111):
+        assert local.get(('a', '')) == (False, None)
+
+
 def test_memoize_parameter_error():
 
     with pytest.raises(common.IllegalArgumentError):
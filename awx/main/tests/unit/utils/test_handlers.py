@@ -0,0 +1,111 @@
+import logging
+import os
+import socket
+import time
+from unittest import mock
+
+import pytest
+
+from awx.main.utils.handlers import RSysLogHandler
+
+
+@pytest.fixture
+def log_settings():
+    with mock.patch('awx.main.utils.handlers.settings') as settings:
+        settings.LOG_AGGREGATOR_ENABLED = True
+        settings.LOG_AGGREGATOR_QUEUE_SIZE = 100
+        settings.SUBSYSTEM_METRICS_INTERVAL_SAVE_TO_REDIS = 0.1
+        yield settings
+
+
+@pytest.fixture
+def rsyslogd(tmp_path):
+    address = str(tmp_path / 'rsyslog.sock')
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+    server.bind(address)
+    server.settimeout(5)
+    yield address, server
+    server.close()
+
+
+def record(msg):
+    return logging.LogRecord('awx.analytics.test', logging.INFO, __file__, 1, msg, None, None)
+
+
+def wait_for(condition):
+    for i in range(100):
+        if condition():
+            return
+        time.sleep(0.05)
+    raise AssertionError('timed out')
+
+
+def test_records_sent_in_background(log_settings, rsyslogd):
+    address, server = rsyslogd
+    handler = RSysLogHandler(address=address)
+    for i in range(5):
+        handler.handle(record('message {}'.format(i)))
+    received = [server.recv(1024) for i in range(5)]
+    assert received == [b'<14>message %d' % i for i in range(5)]
+    handler.close()
+
+
+def test_disabled(log_settings, rsyslogd):
+    log_settings.LOG_AGGREGATOR_ENABLED = False
+    address, server = rsyslogd
+    handler = RSysLogHandler(address=address)
+    handler.handle(record('message'))
+    assert handler.queue is None
+
+
+def test_full_queue_drops_records(log_settings, tmp_path, capsys):
+    log_settings.LOG_AGGREGATOR_QUEUE_SIZE = 2
+    address = str(tmp_path / 'missing.sock')
+    with mock.patch('awx.main.analytics.subsystem_metrics.add_local_counters', side_effect=Exception):
+        handler = RSysLogHandler(address=address)
+        for i in range(10):
+            handler.handle(record('message {}'.format(i)))
+        # the sender holds one record while it retries, the queue two more
+        assert handler.counters['external_logger_records_dropped'] >= 7
+        wait_for(lambda: handler.counters['external_logger_send_errors'] > 1)
+
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        server.bind(address)
+        server.settimeout(5)
+        try:
+            assert server.recv(1024).startswith(b'<14>message')
+            wait_for(lambda: handler.queue.empty())
+            handler.close()
+        finally:
+            server.close()
+    stderr = capsys.readouterr().err
+    assert stderr.count('rsyslogd was unresponsive') == 1
+    assert 'responsive again' in stderr
+
+
+def test_metrics_reported(log_settings, rsyslogd):
+    address, server = rsyslogd
+    with mock.patch('awx.main.analytics.subsystem_metrics.add_local_counters') as add_local_counters:
+        handler = RSysLogHandler(address=address)
+        handler.handle(record('message'))
+        server.recv(1024)
+        handler.close()
+    counters = {}
+    for call in add_local_counters.call_args_list:
+        for field, value in call[0][0].items():
+            counters[field] = counters.get(field, 0) + value
+    assert counters['external_logger_records_queued'] == 1
+    assert counters['external_logger_records_sent'] == 1
+
+
+def test_sender_restarted_after_fork(log_settings, rsyslogd):
+    address, server = rsyslogd
+    handler = RSysLogHandler(address=address)
+    handler.handle(record('message'))
+    sender = handler.sender
+    with mock.patch('awx.main.utils.handlers.os.getpid', return_value=os.getpid() + 1):
+        handler.handle(record('message'))
+        assert handler.sender is not sender
+        handler.close()
+    handler.stopping = True
+    sender.join(timeout=5)
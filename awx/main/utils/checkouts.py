@@ -0,0 +1,185 @@
+import errno
+import fcntl
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger('awx.main.utils.checkouts')
+
+# from linux/fs.h
+FICLONE = 0x40049409
+
+LINK_MODES = ('reflink', 'hardlink', 'copy')
+
+
+class TreeCopier(object):
+    """
+    Copies a directory tree file by file, either as reflinks (copy-on-write
+    clones, on filesystems that support them), as hardlinks or as plain
+    copies.  When links cannot be made (unsupported filesystem, or source and
+    destination on different devices) it falls back to plain copies.
+
+    Reflinks and plain copies are fully independent of their source.
+    Hardlinks share their content with it, so a job that modifies a file in
+    place modifies it for every job using the same checkout.
+    """
+
+    def __init__(self, mode='reflink'):
+        if mode not in LINK_MODES:
+            raise ValueError('{} is not one of {}'.format(mode, ', '.join(LINK_MODES)))
+        self.mode = mode
+        self.linked = 0
+        self.copied = 0
+
+    def copy_file(self, src, dst):
+        if self.mode == 'reflink':
+            try:
+                with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+                    fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+                shutil.copystat(src, dst)
+                self.linked += 1
+                return dst
+            except OSError as e:
+                if e.errno not in (errno.EOPNOTSUPP, errno.EXDEV, errno.EINVAL, errno.ENOTTY, errno.ENOSYS):
+                    raise
+                self.mode = 'copy'
+        elif self.mode == 'hardlink':
+            try:
+                os.link(src, dst)
+                self.linked += 1
+                return dst
+            except OSError as e:
+                if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                    raise
+                self.mode = 'copy'
+        self.copied += 1
+        return shutil.copy2(src, dst)
+
+    def copy_tree(self, src, dst):
+        # like distutils' copy_tree(..., preserve_symlinks=1), dst may exist
+        os.makedirs(dst, exist_ok=True)
+        for name in os.listdir(src):
+            src_name, dst_name = os.path.join(src, name), os.path.join(dst, name)
+            if os.path.islink(src_name):
+                if os.path.lexists(dst_name):
+                    os.unlink(dst_name)
+                os.symlink(os.readlink(src_name), dst_name)
+            elif os.path.isdir(src_name):
+                self.copy_tree(src_name, dst_name)
+            else:
+                if os.path.lexists(dst_name):
+                    os.unlink(dst_name)
+                self.copy_file(src_name, dst_name)
+        shutil.copystat(src, dst)
+
+
+class CheckoutStore(object):
+    """
+    Keeps one checkout of every recently used project revision under
+    AWX_PROJECT_CHECKOUT_STORE_PATH, so that jobs running the same revision
+    get their copy of the project from it (see TreeCopier) instead of each
+    cloning the project again.
+
+    Checkouts are named <project local_path>_<revision> and are only ever
+    created whole (populated in a temporary directory, then renamed), so a
+    stored checkout is never modified.  A per-project lock file is held
+    shared while copying out of the store and exclusively while populating
+    or evicting, which keeps checkouts that are being copied from being
+    removed; lock() reopens the lock file if it was locked just as evict()
+    removed it.  Only the AWX_PROJECT_CHECKOUT_STORE_KEEP most recently used
+    checkouts of each project are kept.
+    """
+
+    def __init__(self, path=None, keep=None, mode=None):
+        self.path = path or settings.AWX_PROJECT_CHECKOUT_STORE_PATH or os.path.join(settings.PROJECTS_ROOT, '.__awx_checkouts')
+        self.keep = settings.AWX_PROJECT_CHECKOUT_STORE_KEEP if keep is None else keep
+        self.mode = mode or settings.AWX_PROJECT_CHECKOUT_LINK_MODE
+
+    def lock_path(self, project_key):
+        return os.path.join(self.path, '{}.lock'.format(project_key))
+
+    @contextmanager
+    def lock(self, project_key, shared=False, blocking=True):
+        os.makedirs(self.path, exist_ok=True)
+        lock_path = self.lock_path(project_key)
+        flags = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        while True:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT)
+            try:
+                fcntl.flock(fd, flags)
+            except BlockingIOError:
+                os.close(fd)
+                yield False
+                return
+            # evict() unlinks the lock file while holding it exclusively; a
+            # lock taken on the unlinked file excludes nobody, so reopen
+            try:
+                if os.path.samestat(os.fstat(fd), os.stat(lock_path)):
+                    break
+            except FileNotFoundError:
+                pass
+            os.close(fd)
+        try:
+            yield True
+        finally:
+            os.close(fd)
+
+    def checkout_path(self, project_key, revision):
+        return os.path.join(self.path, '{}_{}'.format(project_key, revision))
+
+    def checkout(self, project_key, revision, destination, populate):
+        """
+        Copy the checkout of `revision` to `destination`, calling
+        `populate(path)` to create it in the store first if needed.
+        Returns the TreeCopier used, for its statistics.
+        """
+        path = self.checkout_path(project_key, revision)
+        if not os.path.isdir(path):
+            with self.lock(project_key):
+                if not os.path.isdir(path):
+                    tmp = tempfile.mkdtemp(prefix='.tmp_', dir=self.path)
+                    try:
+                        populate(os.path.join(tmp, 'checkout'))
+                        os.rename(os.path.join(tmp, 'checkout'), path)
+                    finally:
+                        shutil.rmtree(tmp, ignore_errors=True)
+                    logger.debug('Stored checkout {}'.format(path))
+        copier = TreeCopier(self.mode)
+        with self.lock(project_key, shared=True):
+            if not os.path.isdir(path):
+                # evicted between populating and locking; rare enough to
+                # just populate the destination directly
+                populate(destination)
+                return copier
+            os.utime(path)
+            copier.copy_tree(path, destination)
+        self.evict(project_key, keep=self.keep)
+        return copier
+
+    def evict(self, project_key, keep=0):
+        """
+        Remove all but the `keep` most recently used checkouts of a project,
+        unless a checkout of that project is being copied right now.
+        """
+        if not os.path.isdir(self.path):
+            return
+        prefix = '{}_'.format(project_key)
+        entries = [os.path.join(self.path, name) for name in os.listdir(self.path) if name.startswith(prefix) and not name.endswith('.lock')]
+        if keep and len(entries) <= keep:
+            return
+        with self.lock(project_key, blocking=False) as acquired:
+            if not acquired:
+                return
+            entries.sort(key=lambda p: os.path.getmtime(p), reverse=True)
+            for entry in entries[keep:]:
+                shutil.rmtree(entry, ignore_errors=True)
+                logger.debug('Evicted checkout {}'.format(entry))
+            if keep == 0:
+                # still held exclusively; lock() notices and reopens
+                os.remove(self.lock_path(project_key))
@@ -2,6 +2,7 @@
 # All Rights Reserved.
 
 # Python
+import copy
 from datetime import timedelta
 import json
 import yaml
@@ -15,7 +16,10 @@ import urllib.parse
 import threading
 import contextlib
 import tempfile
+import time
+import uuid
 import psutil
+from collections import OrderedDict
 from functools import reduce, wraps
 
 from decimal import Decimal
@@ -170,34 +174,239 @@ def get_memoize_cache():
     return cache
 
 
-def memoize(ttl=60, cache_key=None, track_function=False, cache=None):
+class LocalMemoizeCache(object):
+    """
+    Bounded, thread-safe, per-process LRU that sits in front of the cache
+    used by `memoize`, the redis of the node, shared by its processes.
+    Entries carry their own expiration, counted from when this process read
+    the value, so a value can be served locally for up to that long after
+    the shared entry expired or was deleted.
+    """
+
+    def __init__(self, maxsize=None):
+        self._maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def maxsize(self):
+        if self._maxsize is None:
+            from django.conf import settings
+
+            return getattr(settings, 'MEMOIZE_LOCAL_CACHE_SIZE', 1024)
+        return self._maxsize
+
+    def get(self, key):
+        """
+        Return a (hit, value) tuple for `key`.
+        """
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            value, expires = entry
+            if expires <= time.monotonic():
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, ttl):
+        maxsize = self.maxsize
+        if maxsize <= 0 or ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._data if k[0] == prefix]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class MemoizeStats(object):
+    """
+    Process-local hit/miss counters for `memoize`.  Counters are periodically
+    added to this node's subsystem metrics hash in redis; that is done from
+    here (instead of through a `Metrics` instance) because memoized functions
+    are called from processes that have no database connection to look up
+    the local `Instance` with.
+    """
+
+    FIELDS = ('memoize_local_hits', 'memoize_shared_hits', 'memoize_misses', 'memoize_lock_waits')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(self.FIELDS, 0)
+        self._last_flush = time.monotonic()
+
+    def inc(self, field):
+        with self._lock:
+            self._counts[field] += 1
+        self.maybe_flush()
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._counts)
+
+    def maybe_flush(self):
+        from django.conf import settings
+
+        interval = getattr(settings, 'SUBSYSTEM_METRICS_INTERVAL_SAVE_TO_REDIS', 2)
+        if time.monotonic() - self._last_flush < interval:
+            return
+        with self._lock:
+            if time.monotonic() - self._last_flush < interval:
+                return
+            counts, self._counts = self._counts, dict.fromkeys(self.FIELDS, 0)
+            self._last_flush = time.monotonic()
+        try:
+            from awx.main.analytics.subsystem_metrics import add_local_counters
+
+            add_local_counters(counts)
+        except Exception:
+            logger.debug('Could not record memoize metrics', exc_info=True)
+
+
+_memoize_local_cache = LocalMemoizeCache()
+_memoize_stats = MemoizeStats()
+
+
+class NoMemoizeStats(object):
+    def inc(self, field):
+        pass
+
+
+def _memoize_copy(value):
+    # the shared cache hands every caller its own copy of a value, and
+    # some callers change what they are given
+    if isinstance(value, (dict, list, set)):
+        return copy.deepcopy(value)
+    return value
+
+
+def _memoize_generation(cache, function_name, ttl):
+    """
+    Return the current cache generation for a tracked function.  Tracked
+    functions store one cache entry per set of arguments; the generation is
+    part of every entry key, so `memoize_delete` only has to remove the
+    generation to invalidate all of them.
+    """
+    generation = cache.get(function_name)
+    if generation is None:
+        cache.add(function_name, uuid.uuid4().hex, ttl)
+        generation = cache.get(function_name)
+    return generation
+
+
+def _memoize_shared_get(cache, key, ttl, compute, stats):
+    """
+    Read `key` from the shared cache, computing and storing it on a miss.
+    Only one caller per node (the cache is the node's redis) recomputes a
+    missing key; others wait for the value to show up, and compute it
+    themselves as soon as the lock is gone without a value (the caller
+    holding it failed or computed None), or after MEMOIZE_LOCK_TIMEOUT
+    seconds.
+    """
+    from django.conf import settings
+
+    value = cache.get(key)
+    if value is not None:
+        stats.inc('memoize_shared_hits')
+        return value
+
+    lock_timeout = getattr(settings, 'MEMOIZE_LOCK_TIMEOUT', 10)
+    lock_key = '{}-lock'.format(key)
+    if not cache.add(lock_key, 1, lock_timeout):
+        stats.inc('memoize_lock_waits')
+        deadline = time.monotonic() + lock_timeout
+        while True:
+            if time.monotonic() >= deadline:
+                # the process holding the lock took too long (or died);
+                # compute the value ourselves rather than failing the caller
+                lock_key = None
+                break
+            time.sleep(0.05)
+            value = cache.get(key)
+            if value is not None:
+                stats.inc('memoize_shared_hits')
+                return value
+            if cache.add(lock_key, 1, lock_timeout):
+                # released without storing a value; the value may have been
+                # stored between the two calls above
+                value = cache.get(key)
+                if value is not None:
+                    cache.delete(lock_key)
+                    stats.inc('memoize_shared_hits')
+                    return value
+                break
+
+    stats.inc('memoize_misses')
+    try:
+        value = compute()
+        cache.set(key, value, ttl)
+    finally:
+        if lock_key:
+            cache.delete(lock_key)
+    return value
+
+
+def memoize(ttl=60, cache_key=None, track_function=False, cache=None, record_stats=True):
     """
     Decorator to wrap a function and cache its result.
+
+    Results are kept in a bounded per-process LRU in front of the cache
+    shared by the processes of the node; local entries live for at most
+    MEMOIZE_LOCAL_MAX_TTL seconds so that `memoize_delete` is eventually seen
+    by every process of the node that calls it (other nodes keep their
+    values until they expire).  Functions
+    called on hot paths (e.g., for every SQL query) can opt out of the hit
+    and miss counters with `record_stats=False`.
     """
     if cache_key and track_function:
         raise IllegalArgumentError("Can not specify cache_key when track_function is True")
-    cache = cache or get_memoize_cache()
+    shared_cache = cache or get_memoize_cache()
+    stats = _memoize_stats if record_stats else NoMemoizeStats()
 
     def memoize_decorator(f):
+        function_name = slugify("%s" % f.__name__)
+
         @wraps(f)
         def _memoizer(*args, **kwargs):
+            from django.conf import settings
+
             if track_function:
-                cache_dict_key = slugify('%r %r' % (args, kwargs))
-                key = slugify("%s" % f.__name__)
-                cache_dict = cache.get(key) or dict()
-                if cache_dict_key not in cache_dict:
-                    value = f(*args, **kwargs)
-                    cache_dict[cache_dict_key] = value
-                    cache.set(key, cache_dict, ttl)
-                else:
-                    value = cache_dict[cache_dict_key]
+                local_key = (function_name, slugify('%r %r' % (args, kwargs)))
             else:
-                key = cache_key or slugify('%s %r %r' % (f.__name__, args, kwargs))
-                value = cache.get(key)
-                if value is None:
-                    value = f(*args, **kwargs)
-                    cache.set(key, value, ttl)
+                local_key = (cache_key or slugify('%s %r %r' % (f.__name__, args, kwargs)), '')
+
+            hit, value = _memoize_local_cache.get(local_key)
+            if hit:
+                stats.inc('memoize_local_hits')
+                return _memoize_copy(value)
 
+            if track_function:
+                generation = _memoize_generation(shared_cache, function_name, ttl)
+                key = '{}-{}-{}'.format(function_name, generation, local_key[1])
+            else:
+                key = local_key[0]
+            value = _memoize_shared_get(shared_cache, key, ttl, lambda: f(*args, **kwargs), stats)
+            if value is not None:
+                _memoize_local_cache.set(local_key, _memoize_copy(value), min(ttl, getattr(settings, 'MEMOIZE_LOCAL_MAX_TTL', 60)))
             return value
 
         return _memoizer
@@ -206,6 +415,7 @@ def memoize(ttl=60, cache_key=None, track_function=False, cache=None):
 
 
 def memoize_delete(function_name):
+    _memoize_local_cache.delete_prefix(function_name)
     cache = get_memoize_cache()
     return cache.delete(function_name)
 
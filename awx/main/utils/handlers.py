@@ -2,9 +2,14 @@
 # All Rights Reserved.
 
 # Python
+import collections
 import logging
+import logging.handlers
+import os
+import queue
 import sys
-import traceback
+import threading
+import time
 from datetime import datetime
 
 # Django
@@ -16,39 +21,161 @@ from awx.main.exceptions import PostRunError
 
 
 class RSysLogHandler(logging.handlers.SysLogHandler):
+    """
+    Ships log records to rsyslogd, which forwards them to the external log
+    aggregator.
+
+    emit() only formats a record and puts it on a bounded queue; a
+    background thread drains the queue in batches and writes them to the
+    socket.  While rsyslogd is slow or restarting the thread waits and
+    retries, and the queue absorbs the backlog.  Once the queue is full, new
+    records are dropped and counted instead of blocking the process, and the
+    outage is reported on stderr once rather than for every record.
+    """
 
     append_nul = False
 
+    def __init__(self, *args, **kwargs):
+        super(RSysLogHandler, self).__init__(*args, **kwargs)
+        self.pid = None
+        self.queue = None
+        self.stopping = False
+        self.outage = None
+        self.counters = collections.Counter()
+        # not the handler lock, which close() holds while waiting on the sender
+        self.counters_lock = threading.Lock()
+
     def _connect_unixsocket(self, address):
         super(RSysLogHandler, self)._connect_unixsocket(address)
         self.socket.setblocking(False)
 
-    def handleError(self, record):
-        # for any number of reasons, rsyslogd has gone to lunch;
-        # this usually means that it's just been restarted (due to
-        # a configuration change) unfortunately, we can't log that
-        # because...rsyslogd is down (and would just put us back down this
-        # code path)
-        # as a fallback, it makes the most sense to just write the
-        # messages to sys.stderr (which will end up in supervisord logs,
-        # and in containerized installs, cascaded down to pod logs)
-        # because the alternative is blocking the
-        # socket.send() in the Python process, which we definitely don't
-        # want to do)
-        dt = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
-        msg = f'{dt} ERROR rsyslogd was unresponsive: '
-        exc = traceback.format_exc()
+    def count(self, field, value=1):
+        with self.counters_lock:
+            self.counters[field] += value
+
+    def report_metrics(self):
+        with self.counters_lock:
+            counters, self.counters = self.counters, collections.Counter()
+        if not any(counters.values()):
+            return
         try:
-            msg += exc.splitlines()[-1]
+            from awx.main.analytics.subsystem_metrics import add_local_counters
+
+            add_local_counters(counters)
         except Exception:
-            msg += exc
-        msg = '\n'.join([msg, record.msg, ''])
-        sys.stderr.write(msg)
+            # not logged, that would come back here; retried next time
+            with self.counters_lock:
+                self.counters.update(counters)
 
-    def emit(self, msg):
+    def write_stderr(self, message):
+        # rsyslogd is down, so this cannot be logged; stderr ends up in
+        # supervisord logs, and in containerized installs in the pod logs
+        dt = datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+        sys.stderr.write(f'{dt} {message}\n')
+
+    def start_sender(self):
+        # called with the handler lock held; threads do not survive a fork,
+        # so every process starts its own
+        if self.pid == os.getpid():
+            return
+        self.pid = os.getpid()
+        self.queue = queue.Queue(maxsize=getattr(settings, 'LOG_AGGREGATOR_QUEUE_SIZE', 10000))
+        self.counters = collections.Counter()
+        self.counters_lock = threading.Lock()
+        self.stopping = False
+        self.sender = threading.Thread(target=self.send_queued, name='RSysLogHandler', daemon=True)
+        self.sender.start()
+
+    def send_queued(self):
+        interval = getattr(settings, 'SUBSYSTEM_METRICS_INTERVAL_SAVE_TO_REDIS', 2)
+        last_report = time.monotonic()
+        while not (self.stopping and self.queue.empty()):
+            try:
+                batch = [self.queue.get(timeout=interval)]
+            except queue.Empty:
+                batch = []
+            while batch and len(batch) < self.queue.maxsize:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            batch = [msg for msg in batch if msg is not None]  # woken up by close()
+            sent = 0
+            for msg in batch:
+                if not self.send(msg):
+                    break
+                sent += 1
+            self.count('external_logger_records_sent', sent)
+            self.count('external_logger_records_dropped', len(batch) - sent)
+            if time.monotonic() - last_report > interval:
+                self.report_metrics()
+                last_report = time.monotonic()
+        self.report_metrics()
+
+    def send(self, msg):
+        delay = 0.01
+        while True:
+            try:
+                self.socket.send(msg)
+            except BlockingIOError:
+                # rsyslogd is not keeping up; hold on to the message and let
+                # the queue absorb the backlog
+                pass
+            except OSError as e:
+                # for any number of reasons, rsyslogd has gone to lunch;
+                # this usually means that it's just been restarted (due to
+                # a configuration change)
+                if self.outage is None:
+                    self.outage = time.monotonic()
+                    self.write_stderr(f'ERROR rsyslogd was unresponsive: {e}')
+                self.count('external_logger_send_errors')
+                try:
+                    self.socket.close()
+                    self._connect_unixsocket(self.address)
+                except OSError:
+                    pass
+            else:
+                if self.outage is not None:
+                    self.write_stderr('INFO rsyslogd is responsive again after {:.1f} seconds'.format(time.monotonic() - self.outage))
+                    self.outage = None
+                return True
+            if self.stopping:
+                return False
+            time.sleep(delay)
+            delay = min(delay * 2, 1)
+
+    def emit(self, record):
         if not settings.LOG_AGGREGATOR_ENABLED:
             return
-        return super(RSysLogHandler, self).emit(msg)
+        try:
+            msg = self.format(record)
+            if self.ident:
+                msg = self.ident + msg
+            if self.append_nul:
+                msg += '\000'
+            prio = '<%d>' % self.encodePriority(self.facility, self.mapPriority(record.levelname))
+            msg = (prio + msg).encode('utf-8')
+        except Exception:
+            self.handleError(record)
+            return
+        self.start_sender()
+        try:
+            self.queue.put_nowait(msg)
+        except queue.Full:
+            self.count('external_logger_records_dropped')
+        else:
+            self.count('external_logger_records_queued')
+
+    def close(self):
+        if self.queue is not None and self.pid == os.getpid():
+            # send what is queued, without waiting on rsyslogd for long
+            self.stopping = True
+            try:
+                self.queue.put_nowait(None)
+            except queue.Full:
+                pass
+            self.sender.join(timeout=2)
+        super(RSysLogHandler, self).close()
 
 
 class SpecialInventoryHandler(logging.Handler):
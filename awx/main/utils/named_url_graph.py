@@ -21,13 +21,20 @@ NAME_EXCEPTIONS = {"custom_inventory_scripts": "inventory_scripts"}
 
 
 class GraphNode(object):
+    """
+    A model whose objects can be addressed by named URL, and the foreign keys
+    leading to the models whose fields complete it.  Traversals keep their
+    state in local variables, so nodes can be shared between threads.
+    """
+
     def __init__(self, model, fields, adj_list):
         self.model = model
-        self.found = False
-        self.obj = None
         self.fields = fields
         self.adj_list = adj_list
-        self.counter = 0
+        # select_related() paths of the objects generate_named_url() visits
+        self.related_paths = tuple(
+            path for fk_name, next_node in adj_list for path in ((fk_name,) + tuple('%s__%s' % (fk_name, p) for p in next_node.related_paths))
+        )
 
     def _handle_unexpected_model_url_names(self, model_url_name):
         if model_url_name in NAME_EXCEPTIONS:
@@ -43,22 +50,12 @@ class GraphNode(object):
 
     @property
     def named_url_format(self):
-        named_url_components = []
-        stack = [self]
-        current_fk_name = ''
-        while stack:
-            if stack[-1].counter == 0:
-                named_url_component = NAMED_URL_RES_INNER_DILIMITER.join(["<%s>" % (current_fk_name + field) for field in stack[-1].fields])
-                named_url_components.append(named_url_component)
-            if stack[-1].counter >= len(stack[-1].adj_list):
-                stack[-1].counter = 0
-                stack.pop()
-            else:
-                to_append = stack[-1].adj_list[stack[-1].counter][NEXT_NODE]
-                current_fk_name = "%s." % (stack[-1].adj_list[stack[-1].counter][FK_NAME],)
-                stack[-1].counter += 1
-                stack.append(to_append)
-        return NAMED_URL_RES_DILIMITER.join(named_url_components)
+        def components(node, fk_name):
+            yield NAMED_URL_RES_INNER_DILIMITER.join(["<%s>" % (fk_name + field) for field in node.fields])
+            for next_fk_name, next_node in node.adj_list:
+                yield from components(next_node, "%s." % (next_fk_name,))
+
+        return NAMED_URL_RES_DILIMITER.join(components(self, ''))
 
     @property
     def named_url_repr(self):
@@ -80,74 +77,44 @@ class GraphNode(object):
         return text
 
     def generate_named_url(self, obj):
-        self.obj = obj
-        named_url = []
-        stack = [self]
-        while stack:
-            if stack[-1].counter == 0:
-                named_url_item = [self._encode_uri(getattr(stack[-1].obj, field, '')) for field in stack[-1].fields]
-                named_url.append(NAMED_URL_RES_INNER_DILIMITER.join(named_url_item))
-            if stack[-1].counter >= len(stack[-1].adj_list):
-                stack[-1].counter = 0
-                stack[-1].obj = None
-                stack.pop()
-            else:
-                next_ = stack[-1].adj_list[stack[-1].counter]
-                stack[-1].counter += 1
-                next_obj = getattr(stack[-1].obj, next_[FK_NAME], None)
+        def components(node, obj):
+            yield NAMED_URL_RES_INNER_DILIMITER.join([self._encode_uri(getattr(obj, field, '')) for field in node.fields])
+            for fk_name, next_node in node.adj_list:
+                next_obj = getattr(obj, fk_name, None)
                 if next_obj is not None:
-                    next_[NEXT_NODE].obj = next_obj
-                    stack.append(next_[NEXT_NODE])
+                    yield from components(next_node, next_obj)
                 else:
-                    named_url.append('')
-        return NAMED_URL_RES_DILIMITER.join(named_url)
+                    yield ''
+
+        return NAMED_URL_RES_DILIMITER.join(components(self, obj))
+
+    def populate_named_url_query_kwargs(self, kwargs, named_url, ignore_digits=True):
+        if ignore_digits and named_url.isdigit() and int(named_url) > 0:
+            return False
+        named_url = named_url.replace('[%s]' % NAMED_URL_RES_INNER_DILIMITER, NAMED_URL_RES_DILIMITER_ENCODE)
+        named_url_names = named_url.split(NAMED_URL_RES_DILIMITER)
 
-    def _process_top_node(self, named_url_names, kwargs, prefixes, stack, idx):
-        if stack[-1].counter == 0:
+        def populate(node, prefixes, idx):
+            # returns the index of the next name to match, None if invalid
             if idx >= len(named_url_names):
-                return idx, False
+                return None
             if not named_url_names[idx]:
-                stack[-1].counter = 0
-                stack.pop()
-                if prefixes:
-                    prefixes.pop()
-                idx += 1
-                return idx, True
+                return idx + 1
             named_url_parts = named_url_names[idx].split(NAMED_URL_RES_INNER_DILIMITER)
-            if len(named_url_parts) != len(stack[-1].fields):
-                return idx, False
+            if len(named_url_parts) != len(node.fields):
+                return None
             evolving_prefix = '__'.join(prefixes)
-            for attr_name, attr_value in zip(stack[-1].fields, named_url_parts):
+            for attr_name, attr_value in zip(node.fields, named_url_parts):
                 attr_name = ("__%s" % attr_name) if evolving_prefix else attr_name
-                if isinstance(attr_value, str):
-                    attr_value = urllib.parse.unquote(attr_value)
-                kwargs[evolving_prefix + attr_name] = attr_value
+                kwargs[evolving_prefix + attr_name] = urllib.parse.unquote(attr_value)
             idx += 1
-        if stack[-1].counter >= len(stack[-1].adj_list):
-            stack[-1].counter = 0
-            stack.pop()
-            if prefixes:
-                prefixes.pop()
-        else:
-            to_append = stack[-1].adj_list[stack[-1].counter]
-            stack[-1].counter += 1
-            prefixes.append(to_append[FK_NAME])
-            stack.append(to_append[NEXT_NODE])
-        return idx, True
+            for fk_name, next_node in node.adj_list:
+                idx = populate(next_node, prefixes + [fk_name], idx)
+                if idx is None:
+                    return None
+            return idx
 
-    def populate_named_url_query_kwargs(self, kwargs, named_url, ignore_digits=True):
-        if ignore_digits and named_url.isdigit() and int(named_url) > 0:
-            return False
-        named_url = named_url.replace('[%s]' % NAMED_URL_RES_INNER_DILIMITER, NAMED_URL_RES_DILIMITER_ENCODE)
-        named_url_names = named_url.split(NAMED_URL_RES_DILIMITER)
-        prefixes = []
-        stack = [self]
-        idx = 0
-        while stack:
-            idx, is_valid = self._process_top_node(named_url_names, kwargs, prefixes, stack, idx)
-            if not is_valid:
-                return False
-        return idx == len(named_url_names)
+        return populate(self, [], 0) == len(named_url_names)
 
     def add_bindings(self):
         if self.model_url_name not in settings.NAMED_URL_FORMATS:
@@ -301,8 +268,3 @@ def generate_graph(models):
     settings.NAMED_URL_GRAPH = largest_graph
     for node in settings.NAMED_URL_GRAPH.values():
         node.add_bindings()
-
-
-def reset_counters():
-    for node in settings.NAMED_URL_GRAPH.values():
-        node.counter = 0
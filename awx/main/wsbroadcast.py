@@ -1,6 +1,7 @@
 import json
 import logging
 import asyncio
+import time
 
 import aiohttp
 from aiohttp import client_exceptions
@@ -20,9 +21,14 @@ import awx.main.analytics.subsystem_metrics as s_metrics
 logger = logging.getLogger('awx.main.wsbroadcast')
 
 
+# Batches of (group, message) pairs are sent between nodes as a single text
+# frame: this prefix line, then one "<group>\t<message>" line per pair.
+# Messages are already JSON encoded (without raw newlines), so they are framed
+# as-is instead of being JSON encoded a second time.
+BROADCAST_BATCH_PREFIX = 'awx-broadcast-batch\n'
+
+
 def wrap_broadcast_msg(group, message: str):
-    # TODO: Maybe wrap as "group","message" so that we don't need to
-    # encode/decode as json.
     return json.dumps(dict(group=group, message=message), cls=DjangoJSONEncoder)
 
 
@@ -30,6 +36,122 @@ def unwrap_broadcast_msg(payload: dict):
     return (payload['group'], payload['message'])
 
 
+def encode_broadcast_batch(messages):
+    return BROADCAST_BATCH_PREFIX + '\n'.join(f'{group}\t{message}' for group, message in messages)
+
+
+def decode_broadcast_frame(data: str):
+    """
+    Return the (group, message) pairs carried by a frame sent by a remote node.
+    """
+    if data.startswith(BROADCAST_BATCH_PREFIX):
+        pairs = []
+        for line in data[len(BROADCAST_BATCH_PREFIX) :].split('\n'):
+            group, _, message = line.partition('\t')
+            pairs.append((group, message))
+        return pairs
+    # a single message wrapped by wrap_broadcast_msg
+    return [unwrap_broadcast_msg(json.loads(data))]
+
+
+def can_batch(group, message: str):
+    return '\t' not in group and '\n' not in group and '\n' not in message
+
+
+class GroupRateLimiter:
+    """
+    Token bucket per group; `rate` messages per second with bursts of up to
+    `rate` messages.  A rate of 0 disables limiting.
+    """
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.buckets = dict()
+
+    def allow(self, group, now=None):
+        if not self.rate:
+            return True
+        now = now if now is not None else time.monotonic()
+        tokens, last = self.buckets.get(group, (self.rate, now))
+        tokens = min(self.rate, tokens + (now - last) * self.rate)
+        if tokens < 1:
+            self.buckets[group] = (tokens, now)
+            return False
+        self.buckets[group] = (tokens - 1, now)
+        return True
+
+    def forget_idle(self, now=None):
+        # buckets that have refilled completely carry no state worth keeping
+        now = now if now is not None else time.monotonic()
+        for group, (tokens, last) in list(self.buckets.items()):
+            if tokens + (now - last) * self.rate >= self.rate:
+                del self.buckets[group]
+
+
+class BroadcastMessageBuffer:
+    """
+    Collects messages bound for remote nodes so they can be sent as one frame
+    per batching window.  Frames carry the messages in the order they were
+    added, across all groups.  Messages marked as droppable are discarded
+    (and counted) once their group exceeds its rate limit; all other
+    messages are always delivered.
+    """
+
+    def __init__(self, rate_limit=None, max_messages=None):
+        self.limiter = GroupRateLimiter(settings.BROADCAST_WEBSOCKET_GROUP_RATE_LIMIT if rate_limit is None else rate_limit)
+        self.max_messages = max_messages or settings.BROADCAST_WEBSOCKET_BATCH_MAX_MESSAGES
+        self.messages = []
+        self.dropped = 0
+        self.sent = 0
+        self.batches = 0
+
+    def add(self, group, message, droppable=False):
+        if droppable and not self.limiter.allow(group):
+            self.dropped += 1
+            return
+        self.messages.append((group, message))
+
+    @property
+    def size(self):
+        return len(self.messages)
+
+    @property
+    def full(self):
+        return self.size >= self.max_messages
+
+    def drain(self):
+        """
+        Return the frames to send for everything buffered so far.
+        """
+        batch, frames = [], []
+        for group, message in self.messages:
+            if can_batch(group, message):
+                batch.append((group, message))
+            else:
+                # send what was batched so far first, so that nothing is
+                # reordered
+                if batch:
+                    frames.append(encode_broadcast_batch(batch))
+                    batch = []
+                frames.append(wrap_broadcast_msg(group, message))
+        if batch:
+            frames.append(encode_broadcast_batch(batch))
+        self.sent += self.size
+        self.batches += len(frames)
+        self.messages = []
+        self.limiter.forget_idle()
+        return frames
+
+    def pop_counters(self):
+        counters = {
+            'broadcast_websocket_messages_sent': self.sent,
+            'broadcast_websocket_frames_sent': self.batches,
+            'broadcast_websocket_messages_dropped': self.dropped,
+        }
+        self.sent = self.batches = self.dropped = 0
+        return counters
+
+
 def get_broadcast_hosts():
     Instance = apps.get_model('main', 'Instance')
     instances = Instance.objects.exclude(hostname=Instance.objects.me().hostname).order_by('hostname').values('hostname', 'ip_address').distinct()
@@ -132,18 +254,18 @@ class BroadcastWebsocketTask(WebsocketTask):
                 break
             elif msg.type == aiohttp.WSMsgType.TEXT:
                 try:
-                    payload = json.loads(msg.data)
-                except json.JSONDecodeError:
+                    messages = decode_broadcast_frame(msg.data)
+                except (json.JSONDecodeError, KeyError, TypeError):
                     logmsg = "Failed to decode broadcast message"
                     if logger.isEnabledFor(logging.DEBUG):
-                        logmsg = "{} {}".format(logmsg, payload)
+                        logmsg = "{} {}".format(logmsg, msg.data)
                     logger.warn(logmsg)
                     continue
-                (group, message) = unwrap_broadcast_msg(payload)
-                if group == "metrics":
-                    self.subsystem_metrics.store_metrics(message)
-                    continue
-                await self.channel_layer.group_send(group, {"type": "internal.message", "text": message})
+                for (group, message) in messages:
+                    if group == "metrics":
+                        self.subsystem_metrics.store_metrics(message)
+                        continue
+                    await self.channel_layer.group_send(group, {"type": "internal.message", "text": message})
 
 
 class BroadcastWebsocketManager(object):
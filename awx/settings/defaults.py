@@ -69,7 +69,13 @@ DATABASES = {
 IS_K8S = False
 
 RECEPTOR_RELEASE_WORK = True
+# Cancellation of running jobs is pushed to the node running them over
+# pg_notify; as a safety net, the cancel flag of every running job is also
+# polled from the database at this interval (in seconds).
+AWX_CANCEL_POLL_INTERVAL = 30
 AWX_CONTAINER_GROUP_K8S_API_TIMEOUT = 10
+# Seconds a listing of the job pods of a container group cluster and namespace is reused
+AWX_CONTAINER_GROUP_POD_INDEX_TTL = 30
 AWX_CONTAINER_GROUP_DEFAULT_NAMESPACE = os.getenv('MY_POD_NAMESPACE', 'default')
 # Timeout when waiting for pod to enter running state. If the pod is still in pending state , it will be terminated. Valid time units are "s", "m", "h". Example : "5m" , "10s".
 AWX_CONTAINER_GROUP_POD_PENDING_TIMEOUT = "5m"
@@ -240,6 +246,17 @@ SUBSYSTEM_METRICS_INTERVAL_SEND_METRICS = 3
 # Interval in seconds for saving local metrics to redis
 SUBSYSTEM_METRICS_INTERVAL_SAVE_TO_REDIS = 2
 
+# Maximum number of entries in the per-process memoize cache
+MEMOIZE_LOCAL_CACHE_SIZE = 1024
+
+# Maximum number of seconds a memoized value is served from the per-process
+# cache before it is re-read from the shared cache
+MEMOIZE_LOCAL_MAX_TTL = 60
+
+# Number of seconds other callers wait on the process recomputing an expired
+# memoized value before recomputing it themselves
+MEMOIZE_LOCK_TIMEOUT = 10
+
 # The maximum allowed jobs to start on a given task manager cycle
 START_TASK_LIMIT = 100
 
@@ -421,17 +438,24 @@ DEVSERVER_DEFAULT_PORT = '8013'
 os.environ.setdefault('DJANGO_LIVE_TEST_SERVER_ADDRESS', 'localhost:9013-9199')
 
 BROKER_URL = 'unix:///var/run/redis/redis.sock'
+# Periodic tasks run by the dispatcher of every node.  Entries with
+# 'cluster': True run on one node at a time, whichever holds their lease.
 CELERYBEAT_SCHEDULE = {
-    'tower_scheduler': {'task': 'awx.main.tasks.awx_periodic_scheduler', 'schedule': timedelta(seconds=30), 'options': {'expires': 20}},
+    'tower_scheduler': {'task': 'awx.main.tasks.awx_periodic_scheduler', 'schedule': timedelta(seconds=30), 'options': {'expires': 20}, 'cluster': True},
     'cluster_heartbeat': {'task': 'awx.main.tasks.cluster_node_heartbeat', 'schedule': timedelta(seconds=60), 'options': {'expires': 50}},
-    'gather_analytics': {'task': 'awx.main.tasks.gather_analytics', 'schedule': timedelta(minutes=5)},
-    'task_manager': {'task': 'awx.main.scheduler.tasks.run_task_manager', 'schedule': timedelta(seconds=20), 'options': {'expires': 20}},
-    'k8s_reaper': {'task': 'awx.main.tasks.awx_k8s_reaper', 'schedule': timedelta(seconds=60), 'options': {'expires': 50}},
+    'gather_analytics': {'task': 'awx.main.tasks.gather_analytics', 'schedule': timedelta(minutes=5), 'cluster': True},
+    'task_manager': {'task': 'awx.main.scheduler.tasks.run_task_manager', 'schedule': timedelta(seconds=20), 'options': {'expires': 20}, 'cluster': True},
+    'k8s_reaper': {'task': 'awx.main.tasks.awx_k8s_reaper', 'schedule': timedelta(seconds=60), 'options': {'expires': 50}, 'cluster': True},
     'receptor_reaper': {'task': 'awx.main.tasks.awx_receptor_workunit_reaper', 'schedule': timedelta(seconds=60)},
     'send_subsystem_metrics': {'task': 'awx.main.analytics.analytics_tasks.send_subsystem_metrics', 'schedule': timedelta(seconds=20)},
     'cleanup_images': {'task': 'awx.main.tasks.cleanup_execution_environment_images', 'schedule': timedelta(hours=3)},
 }
 
+# A run of a periodic task is skipped while the previous one is still queued
+# or running, for at most this many of the task's intervals (a run whose
+# message was lost with its worker never reports that it finished)
+DISPATCHER_PERIODIC_RUNNING_INTERVALS = 3
+
 # Django Caching Configuration
 DJANGO_REDIS_IGNORE_EXCEPTIONS = True
 CACHES = {'default': {'BACKEND': 'django_redis.cache.RedisCache', 'LOCATION': 'unix:/var/run/redis/redis.sock?db=1'}}
@@ -565,9 +589,36 @@ AWX_ROLES_ENABLED = True
 # Note: This setting may be overridden by database settings.
 AWX_COLLECTIONS_ENABLED = True
 
+# Seconds the per organization counts shown on the dashboard may be out of
+# date; older ones are refreshed and the dashboard counts directly meanwhile.
+DASHBOARD_ROLLUP_MAX_AGE = 120
+
+# Filter large list views (unified jobs, activity stream) using per-user
+# materialized sets of accessible objects, rebuilt when role changes make them
+# stale or when older than AWX_ACCESSIBLE_OBJECTS_MAX_AGE seconds.
+AWX_MATERIALIZE_ACCESSIBLE_OBJECTS = True
+AWX_ACCESSIBLE_OBJECTS_MAX_AGE = 3600
+
+# Also count inventory computed fields one query at a time and log an error
+# when the aggregated counts differ; meant for troubleshooting only.
+AWX_VERIFY_INVENTORY_COMPUTED_FIELDS = False
+
 # Follow symlinks when scanning for playbooks
 AWX_SHOW_PLAYBOOK_LINKS = False
 
+# Jobs running a git project get their copy of the project revision from a
+# store of recently used checkouts instead of cloning it every time.
+# AWX_PROJECT_CHECKOUT_STORE_PATH defaults to a hidden folder in PROJECTS_ROOT.
+# AWX_PROJECT_CHECKOUT_LINK_MODE is one of 'reflink' (copy-on-write clones
+# where the filesystem supports them), 'hardlink' or 'copy'; reflink and
+# hardlink fall back to copy when links cannot be made.  Hardlinked files are
+# shared between jobs, so only use it for playbooks that never modify
+# project files in place.
+AWX_PROJECT_CHECKOUT_STORE_ENABLED = True
+AWX_PROJECT_CHECKOUT_STORE_PATH = None
+AWX_PROJECT_CHECKOUT_STORE_KEEP = 3
+AWX_PROJECT_CHECKOUT_LINK_MODE = 'reflink'
+
 # Applies to any galaxy server
 GALAXY_IGNORE_CERTS = False
 
@@ -600,6 +651,10 @@ INSIGHTS_TRACKING_STATE = False
 AUTOMATION_ANALYTICS_LAST_GATHER = None
 # Last gathered entries for expensive Analytics
 AUTOMATION_ANALYTICS_LAST_ENTRIES = ''
+# Number of analytics table collectors to run at the same time
+AUTOMATION_ANALYTICS_GATHER_WORKERS = 4
+# Seconds a single analytics collector query may run before it is cancelled (0 to disable)
+AUTOMATION_ANALYTICS_STATEMENT_TIMEOUT = 3600
 
 # Default list of modules allowed for ad hoc commands.
 # Note: This setting may be overridden by database settings.
@@ -725,9 +780,17 @@ SCM_EXCLUDE_EMPTY_GROUPS = False
 # Note: These settings may be overridden by database settings.
 ACTIVITY_STREAM_ENABLED = True
 ACTIVITY_STREAM_ENABLED_FOR_INVENTORY_SYNC = False
+# Buffered activity stream entries (see buffer_activity_stream) are written
+# once this many are held, and inserted in batches of this size.
+ACTIVITY_STREAM_BUFFER_SIZE = 1000
 
 CALLBACK_QUEUE = "callback_tasks"
 
+# Job events are pushed to the callback queue in batches of up to this many
+# events, or once the oldest buffered event is this many seconds old.
+CALLBACK_QUEUE_BATCH_SIZE = 100
+CALLBACK_QUEUE_BATCH_MAX_AGE = 0.1
+
 # Note: This setting may be overridden by database settings.
 ORG_ADMINS_CAN_SEE_ALL_USERS = True
 MANAGE_ORGANIZATION_AUTH = True
@@ -752,6 +815,9 @@ LOG_AGGREGATOR_MAX_DISK_USAGE_GB = 1
 LOG_AGGREGATOR_MAX_DISK_USAGE_PATH = '/var/lib/awx'
 LOG_AGGREGATOR_RSYSLOGD_DEBUG = False
 LOG_AGGREGATOR_RSYSLOGD_ERROR_LOG_FILE = '/var/log/tower/rsyslog.err'
+# Number of log records each process holds while rsyslogd is slow or
+# unavailable; records logged once it is full are dropped
+LOG_AGGREGATOR_QUEUE_SIZE = 10000
 
 # The number of retry attempts for websocket session establishment
 # If you're encountering issues establishing websockets in a cluster,
@@ -963,6 +1029,19 @@ BROADCAST_WEBSOCKET_NEW_INSTANCE_POLL_RATE_SECONDS = 10
 # How often websocket process will generate stats
 BROADCAST_WEBSOCKET_STATS_POLL_RATE_SECONDS = 5
 
+# How long messages bound for other nodes are collected before being sent as
+# one batch, and the largest number of messages sent in a single batch
+BROADCAST_WEBSOCKET_BATCH_WINDOW_SECONDS = 0.05
+BROADCAST_WEBSOCKET_BATCH_MAX_MESSAGES = 500
+
+# Maximum number of job event messages per second relayed to other nodes for
+# a single websocket group; events beyond this are dropped (0 means no limit)
+BROADCAST_WEBSOCKET_GROUP_RATE_LIMIT = 100
+
+# How long a websocket connection reuses its user and the object IDs it was
+# already authorized to subscribe to before checking access again
+WEBSOCKET_AUTHORIZATION_CACHE_SECONDS = 30
+
 DJANGO_GUID = {'GUID_HEADER_NAME': 'X-API-Request-Id'}
 
 # Name of the default task queue
@@ -0,0 +1,63 @@
+#! /usr/bin/env awx-python
+
+#
+# Times the unified job and activity stream list queries of a non-superuser,
+# filtering through the role ancestry (the old behavior) and through the
+# user's materialized accessible object set, cold and warm.
+#
+# Generate data first, then pick a user with access to many organizations:
+#
+#   tools/data_generators/rbac_dummy_data_generator.py --preset=medium
+#   tools/scripts/accessible_objects_benchmark.py --username mediumuser-1
+#
+
+import argparse
+import os
+import sys
+from time import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "awx.settings.development")  # noqa
+django.setup()  # noqa
+
+from django.conf import settings  # noqa
+from django.db import connection, reset_queries  # noqa
+
+from awx.main.access import ActivityStreamAccess, UnifiedJobAccess  # noqa
+from awx.main.models import AccessibleObject, User  # noqa
+
+
+def run(label, user, repeat):
+    for name, access_class in (('unified jobs', UnifiedJobAccess), ('activity stream', ActivityStreamAccess)):
+        timings = []
+        for i in range(repeat):
+            reset_queries()
+            start = time()
+            count = access_class(user).get_queryset().count()
+            timings.append(time() - start)
+        print('{:<20} {:<16} {:>8} rows  first {:>8.3f}s  best {:>8.3f}s  {} queries'.format(label, name, count, timings[0], min(timings), len(connection.queries)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--username', required=True, help='non-superuser to list objects as')
+    parser.add_argument('--repeat', type=int, default=5, help='times to run each query')
+    args = parser.parse_args()
+
+    user = User.objects.get(username=args.username)
+    if user.is_superuser:
+        parser.error('superusers are not filtered by RBAC')
+    settings.DEBUG = True  # record queries
+
+    settings.AWX_MATERIALIZE_ACCESSIBLE_OBJECTS = False
+    run('role ancestry', user, args.repeat)
+
+    settings.AWX_MATERIALIZE_ACCESSIBLE_OBJECTS = True
+    AccessibleObject.invalidate_users([user.id])
+    run('materialized', user, args.repeat)
+    print('{} accessible objects materialized for {}'.format(AccessibleObject.objects.filter(user=user).count(), user.username))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
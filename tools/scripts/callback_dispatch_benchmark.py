@@ -0,0 +1,71 @@
+#! /usr/bin/env awx-python
+
+#
+# Measures how many job events per second CallbackQueueDispatcher can publish
+# to redis, one RPUSH per event (the old behavior) and in batches.
+#
+# Events are pushed to a scratch queue that is deleted afterwards; point
+# --broker-url at a local redis, *not* at a production installation.
+#
+
+import argparse
+import os
+import sys
+from time import time
+from uuid import uuid4
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "awx.settings.development")  # noqa
+django.setup()  # noqa
+
+import redis  # noqa
+from django.conf import settings  # noqa
+
+from awx.main.queue import CallbackQueueDispatcher  # noqa
+
+
+def make_event(counter):
+    return {
+        'event': 'runner_on_ok',
+        'counter': counter,
+        'uuid': str(uuid4()),
+        'job_id': 1,
+        'stdout': 'ok: [host-{}]'.format(counter % 1000),
+        'start_line': counter,
+        'end_line': counter + 1,
+        'event_data': {'host': 'host-{}'.format(counter % 1000), 'task': 'debug', 'res': {'msg': 'x' * 200}},
+    }
+
+
+def run(label, events, batch_size, broker_url):
+    queue = 'callback_dispatch_benchmark_{}'.format(uuid4().hex)
+    settings.CALLBACK_QUEUE_BATCH_SIZE = batch_size
+    dispatcher = CallbackQueueDispatcher()
+    dispatcher.connection = redis.Redis.from_url(broker_url)
+    dispatcher.queue = queue
+    try:
+        start = time()
+        for counter in range(events):
+            dispatcher.dispatch(make_event(counter))
+        dispatcher.dispatch({'event': 'EOF', 'final_counter': events, 'job_id': 1})
+        elapsed = time() - start
+        assert dispatcher.connection.llen(queue) == events + 1
+    finally:
+        dispatcher.connection.delete(queue)
+    print('{:<10} batch size {:>5} {:>8} events {:>8.3f}s {:>10.0f} events/sec'.format(label, batch_size, events, elapsed, events / elapsed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--events', type=int, default=50000, help='number of events to publish')
+    parser.add_argument('--batch-size', type=int, default=settings.CALLBACK_QUEUE_BATCH_SIZE, help='batch size to compare against unbatched publishing')
+    parser.add_argument('--broker-url', default=settings.BROKER_URL, help='redis to publish to')
+    args = parser.parse_args()
+
+    run('unbatched', args.events, 1, args.broker_url)
+    run('batched', args.events, args.batch_size, args.broker_url)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
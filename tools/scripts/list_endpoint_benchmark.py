@@ -0,0 +1,109 @@
+#! /usr/bin/env awx-python
+
+#
+# Times the busiest API list views at several page sizes, as a superuser and
+# as a user filtered by RBAC, and reports the best time and the number of
+# queries of each.  The query count should not change with the page size; see
+# awx/main/tests/functional/api/test_list_queries.py.
+#
+# Timings can be saved as a baseline and later runs compared against it, e.g.
+# before and after a change to a serializer or access class:
+#
+#   tools/data_generators/rbac_dummy_data_generator.py --preset=medium
+#   tools/scripts/list_endpoint_benchmark.py --username mediumuser-1 --baseline /tmp/lists.json --save
+#   tools/scripts/list_endpoint_benchmark.py --username mediumuser-1 --baseline /tmp/lists.json
+#
+
+import argparse
+import json
+import os
+import sys
+from time import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "awx.settings.development")  # noqa
+django.setup()  # noqa
+
+from django.db import connection  # noqa
+from django.test.utils import CaptureQueriesContext  # noqa
+from rest_framework.test import APIClient  # noqa
+
+from awx.api.versioning import reverse  # noqa
+from awx.main.models import User  # noqa
+
+ENDPOINTS = (
+    'api:host_list',
+    'api:job_list',
+    'api:job_template_list',
+    'api:inventory_list',
+    'api:unified_job_list',
+    'api:workflow_job_node_list',
+)
+
+
+def run(user, page_sizes, repeat):
+    client = APIClient()
+    client.force_authenticate(user=user)
+    results = {}
+    for endpoint in ENDPOINTS:
+        url = reverse(endpoint)
+        for page_size in page_sizes:
+            timings = []
+            for i in range(repeat):
+                with CaptureQueriesContext(connection) as context:
+                    start = time()
+                    response = client.get(url, {'page_size': page_size, 'order_by': '-id'})
+                    timings.append(time() - start)
+                if response.status_code != 200:
+                    raise RuntimeError('{} returned {}'.format(url, response.status_code))
+            key = '{} {} {}'.format(user.username, endpoint, page_size)
+            results[key] = dict(rows=len(response.data['results']), seconds=min(timings), queries=len(context))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--username', required=True, help='non-superuser to list objects as, besides the first superuser')
+    parser.add_argument('--page-sizes', type=int, nargs='+', default=[10, 50, 200], help='page sizes to request')
+    parser.add_argument('--repeat', type=int, default=5, help='times to request each page, the best is kept')
+    parser.add_argument('--baseline', help='JSON file of earlier timings to compare against')
+    parser.add_argument('--save', action='store_true', help='write these timings to the --baseline file')
+    parser.add_argument('--tolerance', type=float, default=1.25, help='slowdown over the baseline reported as a regression')
+    args = parser.parse_args()
+    if args.save and not args.baseline:
+        parser.error('--save requires --baseline')
+
+    user = User.objects.get(username=args.username)
+    if user.is_superuser:
+        parser.error('superusers are not filtered by RBAC')
+    results = run(User.objects.filter(is_superuser=True).order_by('id').first(), args.page_sizes, args.repeat)
+    results.update(run(user, args.page_sizes, args.repeat))
+
+    baseline = {}
+    if args.baseline and not args.save and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    regressions = 0
+    print('{:<48} {:>6} {:>10} {:>9} {:>10}'.format('endpoint', 'rows', 'seconds', 'queries', 'baseline'))
+    for key, stats in results.items():
+        compared = ''
+        if key in baseline:
+            ratio = stats['seconds'] / max(baseline[key]['seconds'], 1e-6)
+            compared = '{:.2f}x'.format(ratio)
+            if ratio > args.tolerance or stats['queries'] > baseline[key]['queries']:
+                compared += ' !'
+                regressions += 1
+        print('{:<48} {:>6} {:>10.3f} {:>9} {:>10}'.format(key, stats['rows'], stats['seconds'], stats['queries'], compared))
+
+    if args.save:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print('baseline written to {}'.format(args.baseline))
+    elif regressions:
+        print('{} regressions over the baseline'.format(regressions))
+        return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
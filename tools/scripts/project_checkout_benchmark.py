@@ -0,0 +1,73 @@
+#! /usr/bin/env awx-python
+
+#
+# Measures how long it takes to prepare the project folder of N jobs running
+# the same revision of a git project, by cloning the revision for every job
+# (the old behavior) and by copying it out of the checkout store.
+#
+# Usage: project_checkout_benchmark.py /path/to/a/git/checkout --jobs 20
+#
+# Everything is written to a scratch directory that is removed afterwards.
+#
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+from time import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "awx.settings.development")  # noqa
+django.setup()  # noqa
+
+import git  # noqa
+
+from awx.main.tasks import RunProjectUpdate  # noqa
+from awx.main.utils.checkouts import CheckoutStore  # noqa
+
+
+def run(label, jobs, prepare):
+    start = time()
+    for i in range(jobs):
+        prepare(i)
+    elapsed = time() - start
+    print('{:<24} {:>5} jobs {:>8.3f}s {:>8.1f}ms/job'.format(label, jobs, elapsed, elapsed / jobs * 1000))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('repository', help='path to a local git repository')
+    parser.add_argument('--revision', default='HEAD', help='revision to check out')
+    parser.add_argument('--jobs', type=int, default=20, help='number of jobs to prepare')
+    parser.add_argument('--scratch', default=None, help='directory to work in; use one on the filesystem jobs run on')
+    args = parser.parse_args()
+
+    repository = os.path.abspath(args.repository)
+    git_repo = git.Repo(repository)
+    revision = git_repo.rev_parse(args.revision).hexsha
+    scratch = tempfile.mkdtemp(prefix='awx_checkout_benchmark_', dir=args.scratch)
+    try:
+
+        def populate(path):
+            RunProjectUpdate.clone_revision(git_repo, repository, revision, path)
+
+        os.mkdir(os.path.join(scratch, 'clone'))
+        run('clone', args.jobs, lambda i: populate(os.path.join(scratch, 'clone', str(i))))
+
+        for mode in ('reflink', 'hardlink', 'copy'):
+            store = CheckoutStore(path=os.path.join(scratch, 'store_{}'.format(mode)), mode=mode)
+            copiers = []
+
+            def checkout(i):
+                copiers.append(store.checkout('benchmark', revision, os.path.join(scratch, mode, str(i)), populate))
+
+            run('checkout store ({})'.format(mode), args.jobs, checkout)
+            print('{:<24} {} files linked, {} copied'.format('', sum(c.linked for c in copiers), sum(c.copied for c in copiers)))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,85 @@
+#! /usr/bin/env awx-python
+
+#
+# Times the role ancestry maintenance triggered by a role hierarchy change: a
+# team is given, and then loses, admin of an organization, which changes the
+# ancestors of every role under that organization.  Reports the time and the
+# number of queries of each change, and checks the ancestors table against
+# the ancestry computed from scratch afterwards.
+#
+# The changes are made inside a transaction that is rolled back.  Generate
+# data first:
+#
+#   tools/data_generators/rbac_dummy_data_generator.py --preset=medium
+#   tools/scripts/role_ancestry_benchmark.py
+#
+
+import argparse
+import os
+import sys
+from time import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "awx.settings.development")  # noqa
+django.setup()  # noqa
+
+from django.db import connection, transaction  # noqa
+
+from awx.main.models import Organization, Role, Team  # noqa
+
+
+class Rollback(Exception):
+    pass
+
+
+class QueryCounter(object):
+    def __init__(self):
+        self.queries = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+
+def timed(label, fn):
+    counter = QueryCounter()
+    with connection.execute_wrapper(counter):
+        start = time()
+        fn()
+        elapsed = time() - start
+    print('{:<32} {:>10.3f}s {:>6} queries'.format(label, elapsed, counter.queries))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--organization', help='name of the organization to change (defaults to the one with the most roles)')
+    parser.add_argument('--team', help='name of the team to make admin (defaults to a team of another organization)')
+    parser.add_argument('--no-verify', dest='verify', action='store_false', default=True, help='skip checking the ancestors table')
+    args = parser.parse_args()
+
+    if args.organization:
+        org = Organization.objects.get(name=args.organization)
+    else:
+        org = max(Organization.objects.all(), key=lambda o: o.admin_role.descendents.count())
+    if args.team:
+        team = Team.objects.get(name=args.team)
+    else:
+        team = Team.objects.exclude(organization=org).first() or Team.objects.create(name='role-ancestry-benchmark', organization=org)
+    print('{} roles, {} under organization {}'.format(Role.objects.count(), org.admin_role.descendents.count(), org.name))
+
+    try:
+        with transaction.atomic():
+            timed('add team to organization admins', lambda: org.admin_role.parents.add(team.member_role))
+            timed('remove it', lambda: org.admin_role.parents.remove(team.member_role))
+            if args.verify:
+                start = time()
+                missing, extra = Role.verify_role_ancestor_list()
+                print('verified in {:.3f}s: {} missing, {} extra'.format(time() - start, len(missing), len(extra)))
+            raise Rollback()
+    except Rollback:
+        pass
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,215 @@
+#! /usr/bin/env awx-python
+
+#
+# Times one TaskManager cycle against synthetic load: pending jobs spread over
+# job templates whose project and inventory sources update on launch, running
+# workflow jobs with nodes left to spawn, and a number of instances and
+# instance groups.  Reports the time and number of queries of each phase of
+# the cycle, so that scheduling regressions can be compared release to
+# release with the same arguments.
+#
+# All data is created inside a transaction that is rolled back at the end,
+# and every measured cycle starts from the same state.  Jobs are not actually
+# launched (nothing is dispatched until the transaction commits), but do
+# *not* point this at a production installation.
+#
+# Example:
+#
+#   tools/scripts/task_manager_benchmark.py --jobs 2000 --workflows 50 --instances 20 --groups 4
+#
+
+import argparse
+import os
+import sys
+from collections import OrderedDict
+from time import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "awx.settings.development")  # noqa
+django.setup()  # noqa
+
+from django.conf import settings  # noqa
+from django.db import connection, transaction  # noqa
+
+from awx.main.models import (  # noqa
+    Inventory,
+    Instance,
+    InstanceGroup,
+    Job,
+    JobTemplate,
+    Organization,
+    Project,
+    WorkflowJobTemplate,
+)
+from awx.main.scheduler import TaskManager  # noqa
+from awx.main.signals import disable_activity_stream, disable_computed_fields  # noqa
+from awx.main.utils import task_manager_bulk_reschedule  # noqa
+
+PREFIX = 'task-manager-benchmark'
+
+PHASES = (
+    'get_tasks',
+    'after_lock_init',
+    'process_finished_workflow_jobs',
+    'spawn_workflow_graph_jobs',
+    'generate_dependencies',
+    'process_pending_tasks',
+    'start_task',
+)
+
+
+class Rollback(Exception):
+    pass
+
+
+class PhaseTimer(object):
+    """
+    Wraps TaskManager methods to add up the time and queries spent in each.
+    Nested phases (start_task runs inside process_pending_tasks) are
+    counted in both.
+    """
+
+    def __init__(self):
+        self.queries = 0
+        self.stats = OrderedDict((name, dict(calls=0, seconds=0.0, queries=0)) for name in PHASES)
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def instrument(self, task_manager):
+        for name in PHASES:
+            setattr(task_manager, name, self.wrap(name, getattr(task_manager, name)))
+
+    def wrap(self, name, fn):
+        def wrapper(*args, **kwargs):
+            start, queries = time(), self.queries
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                stats = self.stats[name]
+                stats['calls'] += 1
+                stats['seconds'] += time() - start
+                stats['queries'] += self.queries - queries
+
+        return wrapper
+
+
+def seed(args):
+    org = Organization.objects.create(name=PREFIX)
+    groups = [InstanceGroup.objects.create(name='{}-{}'.format(PREFIX, i)) for i in range(args.groups)]
+    for i in range(args.instances):
+        instance = Instance.objects.create(hostname='{}-{}'.format(PREFIX, i), capacity=args.instance_capacity, version='benchmark')
+        groups[i % args.groups].instances.add(instance)
+    for group in groups:
+        org.instance_groups.add(group)
+
+    projects = []
+    for i in range(args.projects):
+        projects.append(
+            Project.objects.create(
+                name='{}-{}'.format(PREFIX, i),
+                organization=org,
+                scm_type='git',
+                scm_url='https://example.org/{}.git'.format(i),
+                scm_update_on_launch=True,
+                scm_update_cache_timeout=0,
+                playbook_files=['site.yml'],
+            )
+        )
+
+    templates = []
+    for i in range(args.templates):
+        inventory = Inventory.objects.create(name='{}-{}'.format(PREFIX, i), organization=org)
+        for j in range(args.inventory_sources):
+            inventory.inventory_sources.create(name='{}-{}-{}'.format(PREFIX, i, j), source='ec2', update_on_launch=True, update_cache_timeout=0)
+        jt = JobTemplate.objects.create(
+            name='{}-{}'.format(PREFIX, i), organization=org, project=projects[i % len(projects)], inventory=inventory, playbook='site.yml'
+        )
+        jt.instance_groups.add(groups[i % len(groups)])
+        templates.append(jt)
+
+    # Job is a multi-table inherited model, so it cannot be bulk created
+    for i in range(args.jobs):
+        jt = templates[i % len(templates)]
+        Job.objects.create(
+            name='{}-{}'.format(PREFIX, i),
+            status='pending',
+            job_template=jt,
+            unified_job_template=jt,
+            inventory=jt.inventory,
+            project=jt.project,
+            organization=org,
+            playbook='site.yml',
+        )
+
+    for i in range(args.workflows):
+        wfjt = WorkflowJobTemplate.objects.create(name='{}-{}'.format(PREFIX, i), organization=org)
+        parent = None
+        for j in range(args.workflow_nodes):
+            node = wfjt.workflow_job_template_nodes.create(unified_job_template=templates[(i + j) % len(templates)])
+            if parent is not None and j % 2:
+                parent.success_nodes.add(node)
+            parent = node
+        workflow_job = wfjt.create_unified_job()
+        workflow_job.status = 'running'
+        workflow_job.save(update_fields=['status'])
+
+
+def cycle(verbose):
+    timer = PhaseTimer()
+    task_manager = TaskManager()
+    timer.instrument(task_manager)
+    with connection.execute_wrapper(timer):
+        start = time()
+        with task_manager_bulk_reschedule():
+            task_manager._schedule()
+        elapsed = time() - start
+    if verbose:
+        print('{:<32} {:>6} {:>10} {:>9}'.format('phase', 'calls', 'seconds', 'queries'))
+        for name, stats in timer.stats.items():
+            print('{:<32} {:>6} {:>10.3f} {:>9}'.format(name, stats['calls'], stats['seconds'], stats['queries']))
+        print('{:<32} {:>6} {:>10.3f} {:>9}'.format('schedule (total)', 1, elapsed, timer.queries))
+    return elapsed, timer.queries
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--jobs', type=int, default=1000, help='number of pending jobs')
+    parser.add_argument('--templates', type=int, default=20, help='number of job templates (and inventories) the jobs are spread over')
+    parser.add_argument('--projects', type=int, default=5, help='number of projects, updated on launch')
+    parser.add_argument('--inventory-sources', type=int, default=1, help='number of inventory sources updated on launch per inventory')
+    parser.add_argument('--workflows', type=int, default=10, help='number of running workflow jobs')
+    parser.add_argument('--workflow-nodes', type=int, default=10, help='number of nodes per workflow job')
+    parser.add_argument('--instances', type=int, default=10, help='number of instances')
+    parser.add_argument('--groups', type=int, default=2, help='number of instance groups the instances are spread over')
+    parser.add_argument('--instance-capacity', type=int, default=100, help='capacity of each instance')
+    parser.add_argument('--runs', type=int, default=3, help='number of cycles to time, each from the same seeded state')
+    args = parser.parse_args()
+
+    # the limit would otherwise hide how process_pending_tasks scales
+    settings.START_TASK_LIMIT = args.jobs + args.workflows * args.workflow_nodes
+
+    timings = []
+    try:
+        with transaction.atomic(), disable_activity_stream(), disable_computed_fields():
+            start = time()
+            seed(args)
+            print('seeded in {:.1f}s'.format(time() - start))
+            for run in range(args.runs):
+                try:
+                    with transaction.atomic():
+                        timings.append(cycle(verbose=(run == 0)))
+                        raise Rollback()
+                except Rollback:
+                    pass
+            raise Rollback()
+    except Rollback:
+        pass
+    seconds = sorted(t[0] for t in timings)
+    print('{} runs: best {:.3f}s median {:.3f}s, {} queries'.format(len(timings), seconds[0], seconds[len(seconds) // 2], timings[0][1]))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#! /usr/bin/env awx-python
+
+#
+# Compares the cost of resolving preferred instance groups and task impact for
+# a large number of pending jobs, per task (as the task manager used to do)
+# and through a single TaskResolver (as it does now).
+#
+# All data is created inside a transaction that is rolled back at the end, so
+# this is safe to run against a development database, but do *not* point it
+# at a production installation.
+#
+
+import argparse
+import os
+import sys
+from time import time
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "awx.settings.development")  # noqa
+django.setup()  # noqa
+
+from django.db import connection, transaction  # noqa
+from django.test.utils import CaptureQueriesContext  # noqa
+
+from awx.main.models import Inventory, InstanceGroup, Job, JobTemplate, Organization, Project  # noqa
+from awx.main.scheduler.task_resolver import TaskResolver  # noqa
+from awx.main.signals import disable_activity_stream, disable_computed_fields  # noqa
+
+
+class Rollback(Exception):
+    pass
+
+
+def seed(jobs, templates):
+    org = Organization.objects.create(name='task-resolver-benchmark')
+    ig = InstanceGroup.objects.create(name='task-resolver-benchmark')
+    org.instance_groups.add(ig)
+    project = Project.objects.create(name='task-resolver-benchmark', organization=org)
+    inventories = [Inventory.objects.create(name='task-resolver-benchmark-{}'.format(i), organization=org) for i in range(templates)]
+    jts = []
+    for i in range(templates):
+        jt = JobTemplate.objects.create(name='task-resolver-benchmark-{}'.format(i), project=project, inventory=inventories[i], organization=org)
+        jt.instance_groups.add(ig)
+        jts.append(jt)
+    # Job is a multi-table inherited model, so it cannot be bulk created
+    for i in range(jobs):
+        jt = jts[i % templates]
+        Job.objects.create(
+            name='task-resolver-benchmark-{}'.format(i),
+            status='pending',
+            job_template=jt,
+            unified_job_template=jt,
+            inventory=jt.inventory,
+            organization=org,
+            project=project,
+        )
+
+
+def measure(label, fn):
+    tasks = list(Job.objects.filter(status='pending', name__startswith='task-resolver-benchmark'))
+    with CaptureQueriesContext(connection) as ctx:
+        start = time()
+        fn(tasks)
+        elapsed = time() - start
+    print('{:<12} {:>6} tasks {:>8.3f}s {:>8} queries'.format(label, len(tasks), elapsed, len(ctx.captured_queries)))
+
+
+def per_task(tasks):
+    for task in tasks:
+        task.preferred_instance_groups
+        task.task_impact
+
+
+def resolved(tasks):
+    resolver = TaskResolver(tasks)
+    for task in tasks:
+        resolver.preferred_instance_groups(task)
+        task.task_impact
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--jobs', type=int, default=5000, help='number of pending jobs to create')
+    parser.add_argument('--templates', type=int, default=10, help='number of job templates (and inventories) the jobs are spread over')
+    args = parser.parse_args()
+
+    try:
+        with transaction.atomic(), disable_activity_stream(), disable_computed_fields():
+            seed(args.jobs, args.templates)
+            measure('per-task', per_task)
+            measure('resolver', resolved)
+            raise Rollback()
+    except Rollback:
+        pass
+
+
+if __name__ == '__main__':
+    sys.exit(main())